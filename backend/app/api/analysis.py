@@ -1,16 +1,41 @@
 # backend/app/api/analysis.py
+import json
+from typing import List, Literal, Optional
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from app.core.config import settings
-from app.services.mota import evaluate_mota_detailed
+from app.services.batch import BatchItem, aggregate, default_workers, iter_batch
+from app.services.mota import evaluate_mota_detailed, sweep_mota
+from app.services.motacache import ann_cache
+from app.services.track_metrics import evaluate_extended
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+# /analysis/sweep 격자 크기 상한 (IoU 개수 x conf 개수)
+MAX_SWEEP_CELLS = 1000
+
+
+class BatchSequenceIn(BaseModel):
+    sequence: str
+    gt_id: str
+    pred_id: str
+
+class BatchIn(BaseModel):
+    items: List[BatchSequenceIn] = Field(..., min_length=1)
+    iou: float = 0.5
+    conf: float = 0.0
+    matcher: Literal["greedy", "hungarian"] = "greedy"
+    workers: Optional[int] = Field(None, ge=1, le=default_workers(), description="기본값/상한: CPU 코어 수")
+    stream: bool = Field(False, description="파일을 통째로 올리지 않는 스트리밍 평가 (아주 긴 시퀀스용)")
+
 @router.get("/idsw_frames")
 def idsw_frames(
     gt_id: str = Query(...),
     pred_id: str = Query(...),
     iou: float = Query(0.5),
     conf: float = Query(0.0),
+    matcher: Literal["greedy", "hungarian"] = Query("greedy"),
 ):
     root = settings.DATA_ROOT / "annotations"
     gt_path = root / f"{gt_id}.txt"
@@ -19,7 +44,8 @@ def idsw_frames(
         raise HTTPException(status_code=404, detail="annotation id not found")
 
     try:
-        mota, stats, frames, details = evaluate_mota_detailed(gt_path, pr_path, iou, conf)
+        mota, stats, frames, details = evaluate_mota_detailed(
+            ann_cache.get_mot(gt_path), ann_cache.get_mot(pr_path), iou, conf, matcher)
     except Exception as e:
         # Convert unexpected errors to HTTPException so FastAPI returns a JSON error
         # and CORS middleware can still attach headers. Also provide useful debug info.
@@ -35,3 +61,91 @@ def idsw_frames(
         "frames": frames,         # IDSW 발생 프레임 번호 배열
         "details": details,       # [{f,tp,fp,fn,idsw,gt,pred}, ...] (모든 프레임 순서대로)
     }
+
+
+@router.get("/metrics")
+def metrics(
+    gt_id: str = Query(...),
+    pred_id: str = Query(...),
+    iou: float = Query(0.5),
+    conf: float = Query(0.0),
+    matcher: Literal["greedy", "hungarian"] = Query("greedy"),
+):
+    """
+    MOTA 와 함께 MOTP, IDF1/IDP/IDR, MT/PT/ML, Frag, HOTA/DetA/AssA/LocA 를 한 번에 계산.
+    (프레임 루프/IoU 행렬 계산은 한 번, IDF1/HOTA 는 그때 모은 희소 후보쌍으로 계산)
+    """
+    root = settings.DATA_ROOT / "annotations"
+    gt_path = root / f"{gt_id}.txt"
+    pr_path = root / f"{pred_id}.txt"
+    if not gt_path.exists() or not pr_path.exists():
+        raise HTTPException(status_code=404, detail="annotation id not found")
+
+    try:
+        return evaluate_extended(ann_cache.get_mot(gt_path), ann_cache.get_mot(pr_path), iou, conf, matcher)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sweep")
+def sweep(
+    gt_id: str = Query(...),
+    pred_id: str = Query(...),
+    ious: List[float] = Query([0.3, 0.4, 0.5, 0.6, 0.7]),
+    confs: List[float] = Query([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]),
+    matcher: Literal["greedy", "hungarian"] = Query("greedy"),
+):
+    """
+    IoU x conf 임계값 격자 전체의 MOTA/TP/FP/FN/IDSW 를 한 번에 계산.
+    프론트는 슬라이더마다 요청하지 않고 이 결과로 히트맵/최적 지점을 바로 그린다.
+    """
+    if not ious or not confs:
+        raise HTTPException(status_code=400, detail="ious and confs must not be empty")
+    if len(ious) * len(confs) > MAX_SWEEP_CELLS:
+        raise HTTPException(status_code=400, detail=f"grid too large (max {MAX_SWEEP_CELLS} cells)")
+
+    root = settings.DATA_ROOT / "annotations"
+    gt_path = root / f"{gt_id}.txt"
+    pr_path = root / f"{pred_id}.txt"
+    if not gt_path.exists() or not pr_path.exists():
+        raise HTTPException(status_code=404, detail="annotation id not found")
+
+    try:
+        total_gt, grid = sweep_mota(
+            ann_cache.get_mot(gt_path), ann_cache.get_mot(pr_path), ious, confs, matcher)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    best = max((cell for row in grid for cell in row), key=lambda c: c["mota"])
+    return {
+        "ious": ious,
+        "confs": confs,
+        "total_gt": total_gt,
+        "grid": grid,             # grid[i][j] ↔ (ious[i], confs[j])
+        "best": best,             # MOTA 최대 지점
+    }
+
+
+@router.post("/batch")
+def batch(payload: BatchIn):
+    """
+    여러 시퀀스를 process pool 로 병렬 평가하고 진행 상황을 NDJSON 으로 스트리밍.
+      {"type":"sequence","done":k,"total":n, "sequence":..., "mota":..., "TP":..., ...}  (완료 순서)
+      {"type":"summary", "sequences":..., "failed":..., "mota":..., "TP":..., ...}      (마지막 줄)
+    """
+    root = settings.DATA_ROOT / "annotations"
+    items = [BatchItem(it.sequence, root / f"{it.gt_id}.txt", root / f"{it.pred_id}.txt")
+             for it in payload.items]
+    missing = sorted({str(p.stem) for it in items for p in (it.gt, it.pred) if not p.exists()})
+    if missing:
+        raise HTTPException(status_code=404, detail={"msg": "annotation id not found", "ids": missing})
+
+    def _stream():
+        results = []
+        for r in iter_batch(items, payload.iou, payload.conf, payload.matcher, payload.workers,
+                            payload.stream, ann_cache.cache_dir):
+            results.append(r)
+            yield json.dumps({"type": "sequence", "done": len(results), "total": len(items), **r}) + "\n"
+        yield json.dumps({"type": "summary", **aggregate(results)}) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
@@ -1,14 +1,24 @@
 # backend/app/api/annotations.py
 from fastapi import APIRouter, UploadFile, Form, File, HTTPException, Body
 from fastapi.responses import JSONResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Literal, List, Dict, Any
 from uuid import uuid4
 from pathlib import Path
 from app.core.config import settings
+from app.services.motacache import ann_cache
+from app.services.coco_loader import coco_columns_from_doc
+from app.services.mapcache import apply_patch
+from app.repos.ann_repo import AnnotationsRepo
 import hashlib
 import json
+import os
 
 router = APIRouter(prefix="", tags=["annotations"])
+ann_repo = AnnotationsRepo(settings.DATA_ROOT)
+
+# 업로드를 디스크로 옮기며 해시하는 단위 (업로드 하나가 메모리에 두는 최대 크기)
+UPLOAD_CHUNK = 1 << 20
 
 @router.post("/annotations")
 async def upload_annotation(kind: Literal["gt","pred"]=Form(...), file: UploadFile=File(...)):
@@ -24,11 +34,33 @@ async def upload_annotation(kind: Literal["gt","pred"]=Form(...), file: UploadFi
     if file_ext not in ['.txt', '.json']:
         file_ext = '.txt'  # default to txt
     
+    # chunk 단위로 임시 파일에 쓰면서 sha256 을 누적 (파일 전체를 메모리에 올리지 않는다)
     dst = dst_dir / f"{ann_id}{file_ext}"
-    content = await file.read()
-    dst.write_bytes(content)
-    sha = hashlib.sha256(content).hexdigest()
-    return JSONResponse({"annotation_id": ann_id, "sha256": sha, "format": file_ext[1:]})
+    tmp = dst_dir / f".{ann_id}{file_ext}.upload"
+    h = hashlib.sha256()
+    try:
+        with tmp.open('wb') as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    sha = h.hexdigest()
+
+    # 같은 내용/kind 가 이미 있으면 그 id (파싱 캐시도 sha 기준이라 그대로 재사용된다)
+    existing = ann_repo.claim(ann_id, kind, sha, str(dst))
+    if existing != ann_id:
+        dst.unlink(missing_ok=True)
+        stored = ann_repo.get(existing)
+        return JSONResponse({"annotation_id": existing, "sha256": sha, "kind": stored["kind"],
+                             "format": Path(stored["src"]).suffix[1:], "deduplicated": True})
+    ann_cache.remember(dst, sha)
+    return JSONResponse({"annotation_id": ann_id, "sha256": sha, "kind": kind, "format": file_ext[1:]})
 
 
 @router.get("/annotations/{annotation_id}")
@@ -46,17 +78,40 @@ async def get_annotation(annotation_id: str):
 
 
 @router.patch("/annotations/{annotation_id}")
-async def update_annotation(annotation_id: str, data: Dict[Any, Any] = Body(...)):
+def update_annotation(annotation_id: str, data: Dict[Any, Any] = Body(...)):
     """Update annotation file (for COCO format)."""
+    # 해시/파싱/재매칭이 들어가므로 async 가 아닌 def (thread pool 에서 실행)
     dst_dir: Path = settings.DATA_ROOT / "annotations"
     ann_path = dst_dir / f"{annotation_id}.json"
     
     if not ann_path.exists():
         raise HTTPException(status_code=404, detail="Annotation not found")
     
-    # Save updated annotations
+    old_sha = ann_cache.sha_of(ann_path)
+    content = json.dumps(data, indent=2)
+    new_sha = hashlib.sha256(content.encode()).hexdigest()
+
+    # Save updated annotations (캐시 갱신이 실패해도 편집은 저장된다)
     with ann_path.open('w') as f:
-        json.dump(data, f, indent=2)
+        f.write(content)
+
+    # 캐시된 mAP 표를 바뀐 (image, category) 그룹만 다시 매칭해 새 내용으로 옮긴다 (디스크 캐시를 지우기 전에).
+    # 컬럼을 만들 수 없는 내용 (정수가 아닌 id 등) 이면 예전 항목을 버리기만 한다
+    new_cols = None
+    try:
+        new_cols = coco_columns_from_doc(data)
+        old_cols = ann_cache.get_cached(old_sha, "coco_cols")
+        if old_cols is not None:
+            apply_patch(old_sha, new_sha, old_cols, new_cols)
+    except Exception as e:
+        print(f"Error updating mAP cache incrementally: {e}")
+
+    # 예전 내용으로 파싱해 둔 캐시 항목 폐기, 새 내용의 sha/컬럼은 바로 등록
+    ann_cache.invalidate(ann_path)
+    ann_cache.remember(ann_path, new_sha)
+    ann_repo.set_sha(annotation_id, new_sha)
+    if new_cols is not None:
+        ann_cache.seed(new_sha, "coco_cols", new_cols)
     
     return {"status": "success", "annotation_id": annotation_id}
 
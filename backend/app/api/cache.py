@@ -0,0 +1,24 @@
+# backend/app/api/cache.py
+from fastapi import APIRouter
+from app.services.mapcache import error_tables, match_tables, pair_tables, pr_tables, summary_tables
+from app.services.motacache import ann_cache
+from app.services import thumbnails
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+@router.get("/stats")
+def cache_stats():
+    """파싱된 annotation 캐시의 hit/miss/eviction 카운터와 사용량."""
+    return ann_cache.stats()
+
+@router.get("/map/stats")
+def map_cache_stats():
+    """mAP 누적 PR 표 / 매칭 표 캐시의 hit/miss/eviction 카운터와 사용량."""
+    return {"pr_tables": pr_tables.stats(), "match_tables": match_tables.stats(),
+            "summary_tables": summary_tables.stats(), "error_tables": error_tables.stats(),
+            "pair_tables": pair_tables.stats()}
+
+@router.get("/thumbnails/stats")
+def thumbnail_stats():
+    """background 축소본 생성 대기 중인 이미지 수."""
+    return {"pending": thumbnails.pending(), "workers": thumbnails.default_workers(), "sizes": thumbnails.SIZES}
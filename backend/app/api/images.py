@@ -1,103 +1,170 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from fastapi.responses import FileResponse
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from pathlib import Path
-from app.core.config import settings
-import shutil
-import uuid
-import json
+from app.services.image_folders import (
+    ImageFile, append_entries, cached_index, commit_folder, create_folder, folder_dir, image_file, list_images,
+    load_index, read_manifest, safe_name, store_file,
+)
+from app.services import thumbnails
+from email.utils import parsedate_to_datetime
+import asyncio
 
 router = APIRouter()
 
+# 브라우저는 캐시를 쓰되 매번 ETag 로 재검증 (304 는 본문 없이 메모리 인덱스만 보고 응답)
+IMAGE_CACHE_CONTROL = "no-cache"
+
+
+def _folder(folder_id: str) -> Path:
+    d = folder_dir(folder_id)
+    if d is None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return d
+
+
+async def _store_batch(folder_id: str, d: Path, images: List[UploadFile], offset: Optional[int]):
+    """
+    batch 의 파일들을 thread pool 에서 동시에 디스크로 쓰고, 다 써진 것만 manifest 에 추가.
+    manifest 에 이미 있는 file_name 은 건너뛴다 (재개). 파일 하나가 실패해도 나머지는 저장된다.
+    저장된 파일의 축소본은 background 로 만들기 시작한다.
+    """
+    done = {e["file_name"] for e in read_manifest(d)}
+    names = [safe_name(img.filename, (offset or 0) + idx) for idx, img in enumerate(images)]
+    todo = [(idx, img, name) for idx, (img, name) in enumerate(zip(images, names)) if name not in done]
+    results = await asyncio.gather(
+        *(run_in_threadpool(store_file, img.file, d / name) for _, img, name in todo), return_exceptions=True)
+
+    stored, failed = [], []
+    for (idx, _, name), res in zip(todo, results):
+        if isinstance(res, BaseException):
+            failed.append({'file_name': name, 'error': str(res)})
+        else:
+            stored.append({'id': None if offset is None else offset + idx + 1,
+                           'file_name': name, 'path': str(d / name), 'sha256': res})
+    stored = append_entries(folder_id, d, stored)
+    thumbnails.schedule(stored)
+    return {
+        'stored': stored,
+        'skipped': [name for name in names if name in done],
+        'failed': failed,
+    }
+
+
 @router.post("/images/folder")
 async def upload_image_folder(images: List[UploadFile] = File(...)):
-    """Upload a folder of images for MAP mode.
-    
-    Supports large batches of images (configurable via multipart settings).
+    """Upload a folder of images for MAP mode in a single request.
+
+    multipart 필드 수 제한(기본 1000) 안의 작은 폴더용. 큰 폴더는 /images/folders 의
+    create -> batch (동시, 재개 가능) -> commit 순서로 올린다.
     """
     if not images:
         raise HTTPException(status_code=400, detail="No images provided")
     
-    folder_id = str(uuid.uuid4())
-    save_dir = settings.DATA_ROOT / "images" / folder_id
-    save_dir.mkdir(parents=True, exist_ok=True)
-    
-    image_list = []
-    for idx, img in enumerate(images):
-        # Handle filename: use only the basename, replace path separators
-        filename = img.filename or f"image_{idx}.jpg"
-        # Replace path separators to avoid directory issues
-        filename = filename.replace('\\', '_').replace('/', '_')
-        
-        dest = save_dir / filename
-        # Ensure parent directory exists (in case of nested paths)
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        
-        try:
-            with dest.open("wb") as f:
-                shutil.copyfileobj(img.file, f)
-            image_list.append({
-                'id': idx + 1,
-                'file_name': filename,
-                'path': str(dest)
-            })
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to save image {filename}: {str(e)}")
-    
-    # Save image list metadata
-    metadata_path = save_dir / "images.json"
-    with metadata_path.open("w") as f:
-        json.dump(image_list, f, indent=2)
-    
-    return {"folder_id": folder_id, "count": len(images), "images": image_list}
+    folder_id = create_folder()
+    d = _folder(folder_id)
+    res = await _store_batch(folder_id, d, images, offset=0)
+    if res['failed']:
+        f = res['failed'][0]
+        raise HTTPException(status_code=500, detail=f"Failed to save image {f['file_name']}: {f['error']}")
+    image_list = await run_in_threadpool(commit_folder, folder_id, d)
+    return {"folder_id": folder_id, "count": len(image_list), "images": image_list}
+
+
+# ---- chunked 업로드: create -> batch (여러 개 동시) -> commit ----
+
+@router.post("/images/folders")
+async def create_image_folder():
+    """빈 이미지 폴더를 만든다. 이후 batch 로 파일을 나눠 올리고 commit 한다."""
+    return {"folder_id": create_folder()}
+
+
+@router.post("/images/folders/{folder_id}/batch")
+async def upload_image_batch(
+    folder_id: str,
+    images: List[UploadFile] = File(...),
+    offset: Optional[int] = Form(None, ge=0, description="batch 첫 파일의 전체 순번 (id = offset + i + 1). 없으면 도착 순"),
+):
+    """
+    이미지 batch 업로드. 같은 폴더에 여러 batch 를 동시에 보내도 된다.
+    이미 받은 file_name 은 건너뛰므로 끊긴 batch 는 그대로 다시 보내면 된다.
+    """
+    d = _folder(folder_id)
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    res = await _store_batch(folder_id, d, images, offset)
+    return {"folder_id": folder_id, **res}
+
+
+@router.get("/images/folders/{folder_id}/status")
+async def image_folder_status(folder_id: str):
+    """지금까지 저장된 파일 (재개할 때 이 목록을 빼고 보낸다)."""
+    d = _folder(folder_id)
+    entries = await run_in_threadpool(read_manifest, d)
+    return {
+        "folder_id": folder_id,
+        "committed": (d / "images.json").exists(),
+        "count": len(entries),
+        "files": [e["file_name"] for e in entries],
+    }
+
+
+@router.post("/images/folders/{folder_id}/commit")
+async def commit_image_folder(folder_id: str):
+    """업로드 완료: manifest 를 images.json 으로 정리. 다시 불러도 된다 (batch 를 더 올린 뒤 등)."""
+    d = _folder(folder_id)
+    image_list = await run_in_threadpool(commit_folder, folder_id, d)
+    return {"folder_id": folder_id, "count": len(image_list), "images": image_list}
 
 
 @router.get("/images/{folder_id}")
 async def get_image_list(folder_id: str):
     """Get list of images in a folder."""
-    folder_dir = settings.DATA_ROOT / "images" / folder_id
-    if not folder_dir.exists():
-        raise HTTPException(status_code=404, detail="Folder not found")
-    
-    metadata_path = folder_dir / "images.json"
-    if metadata_path.exists():
-        with metadata_path.open("r") as f:
-            return json.load(f)
-    
-    # Fallback: scan directory
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
-    images = []
-    for idx, img_path in enumerate(sorted(folder_dir.iterdir())):
-        if img_path.suffix.lower() in image_extensions:
-            images.append({
-                'id': idx + 1,
-                'file_name': img_path.name,
-                'path': str(img_path)
-            })
-    return images
+    d = _folder(folder_id)
+    return await run_in_threadpool(list_images, d)
+
+
+def _not_modified(request: Request, f: ImageFile) -> bool:
+    """If-None-Match (우선) / If-Modified-Since 로 브라우저 캐시가 최신인지."""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+        return "*" in tags or f.etag in tags
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(f.stat.st_mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
 
 
 @router.get("/images/{folder_id}/{image_id}")
-async def get_image(folder_id: str, image_id: str):
-    """Get a specific image file."""
-    folder_dir = settings.DATA_ROOT / "images" / folder_id
-    if not folder_dir.exists():
-        raise HTTPException(status_code=404, detail="Folder not found")
-    
-    # Try to find the image by ID or filename
-    metadata_path = folder_dir / "images.json"
-    if metadata_path.exists():
-        with metadata_path.open("r") as f:
-            images = json.load(f)
-            for img in images:
-                if str(img['id']) == image_id or img['file_name'] == image_id:
-                    img_path = Path(img['path'])
-                    if img_path.exists():
-                        return FileResponse(img_path)
-    
-    # Fallback: try direct filename
-    img_path = folder_dir / image_id
-    if img_path.exists():
-        return FileResponse(img_path)
-    
-    raise HTTPException(status_code=404, detail="Image not found")
+async def get_image(
+    folder_id: str,
+    image_id: str,
+    request: Request,
+    size: Literal["full", "medium", "thumb"] = Query("full", description="full: 원본 / medium: 긴 변 1024 / thumb: 256 (JPEG)"),
+):
+    """
+    Get a specific image file (id or file_name).
+    폴더 인덱스는 메모리에 한 번 올려 두고 (업로드/commit 때 무효화) 요청마다 메타데이터를 읽지 않는다.
+    ETag/Last-Modified 를 주고 조건부 요청이 맞으면 304, Range 요청은 FileResponse 가 처리한다.
+    size 축소본은 캐시에 없으면 그 자리에서 만들고, 만들 수 없는 형식이면 원본을 준다.
+    """
+    index = cached_index(folder_id)
+    if index is None:
+        index = await run_in_threadpool(load_index, folder_id, _folder(folder_id))
+    f = index.lookup(image_id)
+    if f is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size != "full":
+        sha = index.sha.get(str(f.path)) or await run_in_threadpool(index.file_sha, f)
+        variant = await thumbnails.get_variant(f.path, sha, size)
+        if variant is not None:
+            f = image_file(variant) or f
+    headers = {"ETag": f.etag, "Last-Modified": f.last_modified, "Cache-Control": IMAGE_CACHE_CONTROL}
+    if _not_modified(request, f):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(f.path, headers=headers, stat_result=f.stat)
@@ -1,10 +1,13 @@
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query
 from pathlib import Path
-from typing import Optional
+from typing import Literal
 from ..core.settings import Settings
-from ..services.map import calculate_map, evaluate_map
-from ..services.coco_loader import load_coco_annotations, load_predictions
-from ..services.mota import load_mot
+from ..services.coco_loader import id_code, original_id
+from ..services.map import calculate_map_coco, evaluate_map
+from ..services.map_curves import compact_pr_curves
+from ..services.mapcache import get_error_table, get_match_table, get_pr_table, get_summary_table
+from ..services.motacache import ann_cache
 
 router = APIRouter()
 settings = Settings()
@@ -14,74 +17,229 @@ def calculate_map_metrics(
     gt_id: str = Query(..., description="GT annotation ID"),
     pred_id: str = Query(..., description="Prediction annotation ID"),
     iou: float = Query(0.5, ge=0.05, le=0.95, description="IoU threshold"),
-    conf: float = Query(0.0, ge=0.0, le=1.0, description="Confidence threshold")
+    conf: float = Query(0.0, ge=0.0, le=1.0, description="Confidence threshold"),
+    mode: Literal["voc", "coco"] = Query("voc", description="voc: AP@iou (all-point) / coco: AP@[.5:.95] (101-point)"),
+    curve: Literal["full", "grid", "rle"] = Query("full", description="pr_curves: full / recall grid / plateau 압축"),
+    curve_points: int = Query(101, ge=2, le=1001, description="curve=grid 의 recall 점 수"),
+    encoding: Literal["json", "f32"] = Query("json", description="pr_curves 배열: JSON list / base64 float32 (LE)")
 ):
-    """Calculate mAP metrics for given GT and prediction annotations."""
+    """
+    Calculate mAP metrics for given GT and prediction annotations.
+    mode=coco 면 iou 는 무시하고 AP50/AP75/AP@[.5:.95] 를 한 번에 계산한다.
+    COCO json 이면 summary 에 pycocotools summarize() 지표 (crowd/area range/maxDets 반영) 를 함께 준다.
+    COCO json 은 (파일 내용, mode, iou) 별 누적 PR 표를 캐시하므로 conf 만 바뀐 요청은 다시 매칭하지 않는다.
+    curve/encoding 으로 pr_curves 를 줄여 보낼 수 있다 (services/map_curves.py).
+    """
     gt_path = Path(settings.DATA_ROOT) / "annotations" / f"{gt_id}.json"
     pred_path = Path(settings.DATA_ROOT) / "annotations" / f"{pred_id}.json"
     
     # Try COCO format first
     if gt_path.exists() and pred_path.exists():
-        images, gt_annotations_by_img, categories = load_coco_annotations(gt_path)
-        pred_annotations_by_img = load_predictions(pred_path)
+        # 스트리밍 파싱한 컬럼 (두 번째부터는 mmap 으로 열기만 한다)
+        gt_cols = ann_cache.get_coco(gt_path)
+        pred_cols = ann_cache.get_coco(pred_path)
+        if gt_cols is None or pred_cols is None:
+            # MOT 로 넘어가면 같은 id 의 .txt 가 없어 엉뚱한 404 가 된다
+            raise HTTPException(status_code=400, detail="Failed to parse COCO annotation files")
+
+        images, categories = gt_cols.images, gt_cols.categories
+        mAP, detail = get_pr_table(gt_path, pred_path, mode, iou).evaluate(conf, curves_as_arrays=True)
+        # 곡선은 원래 category id 로 (정수가 아닌 id 는 내부 code 로 매칭한다)
+        pr_curves = {original_id(categories, c): v for c, v in detail.get('pr_curves', {}).items()}
         
-        if images is not None and gt_annotations_by_img is not None and pred_annotations_by_img is not None:
-            # Flatten annotations for mAP calculation
-            gt_anns = []
-            for img_id, anns in gt_annotations_by_img.items():
-                gt_anns.extend(anns)
-            
-            pred_anns = []
-            for img_id, anns in pred_annotations_by_img.items():
-                pred_anns.extend(anns)
-            
-            mAP, detail = calculate_map(gt_anns, pred_anns, categories, iou, conf)
-            
-            # Format response with category names
-            class_aps = {}
-            for cat_id, ap in detail['APs'].items():
-                cat_name = categories.get(cat_id, {}).get('name', f'class_{cat_id}')
-                class_aps[cat_name] = ap
-            
-            return {
-                'mAP': mAP,
-                'class_aps': class_aps,
-                'pr_curves': detail.get('pr_curves', {}),
-                'num_categories': len(categories),
-                'num_images': len(images)
-            }
+        # Format response with category names
+        class_aps = {}
+        for cat_id, ap in detail['APs'].items():
+            cat_name = categories.get(cat_id, {}).get('name', f'class_{cat_id}')
+            class_aps[cat_name] = ap
+        
+        resp = {
+            'mAP': mAP,
+            'mode': mode,
+            'class_aps': class_aps,
+            'pr_curves': compact_pr_curves(pr_curves, curve, curve_points, encoding),
+            'curve': curve,
+            'encoding': encoding,
+            'num_categories': len(categories),
+            'num_images': len(images)
+        }
+        if mode == "coco":
+            resp.update(AP=detail.get('AP'), AP50=detail.get('AP50'), AP75=detail.get('AP75'))
+            resp['summary'] = get_summary_table(gt_path, pred_path).evaluate(conf)
+        return resp
     
     # Fallback to MOT format for backward compatibility
     gt_path_txt = Path(settings.DATA_ROOT) / "annotations" / f"{gt_id}.txt"
     pred_path_txt = Path(settings.DATA_ROOT) / "annotations" / f"{pred_id}.txt"
     
     if gt_path_txt.exists() and pred_path_txt.exists():
-        gt_frames = load_mot(gt_path_txt)
-        pred_frames = load_mot(pred_path_txt)
+        gt_tab = ann_cache.get_mot(gt_path_txt)
+        pred_tab = ann_cache.get_mot(pred_path_txt)
         
-        gt_boxes = []
-        pred_boxes = []
-        for f, boxes in gt_frames.items():
-            for b in boxes:
-                gt_boxes.append({
-                    'image_id': f,
-                    'category': 'default',
-                    'bbox': [b[1], b[2], b[3], b[4]]
-                })
-        for f, boxes in pred_frames.items():
-            for b in boxes:
-                pred_boxes.append({
-                    'image_id': f,
-                    'category': 'default',
-                    'bbox': [b[1], b[2], b[3], b[4]],
-                    'score': b[5] if len(b) > 5 else 1.0
-                })
+        gt_boxes = [
+            {'image_id': f, 'category': 'default', 'bbox': box}
+            for f, box in zip(gt_tab.frame.tolist(), gt_tab.boxes.tolist())
+        ]
+        pred_boxes = [
+            {'image_id': f, 'category': 'default', 'bbox': box, 'score': sc}
+            for f, box, sc in zip(pred_tab.frame.tolist(), pred_tab.boxes.tolist(), pred_tab.conf.tolist())
+        ]
         
+        if mode == "coco":
+            mAP, detail = calculate_map_coco(
+                [{'image_id': b['image_id'], 'category_id': 0, 'bbox': b['bbox']} for b in gt_boxes],
+                [{'image_id': b['image_id'], 'category_id': 0, 'bbox': b['bbox'], 'score': b['score']} for b in pred_boxes],
+                {0: {'name': 'default'}}, conf)
+            return {
+                'mAP': mAP,
+                'mode': mode,
+                'AP': detail.get('AP'),
+                'AP50': detail.get('AP50'),
+                'AP75': detail.get('AP75'),
+                'class_aps': {'default': mAP},
+                'pr_curves': compact_pr_curves(detail.get('pr_curves', {}), curve, curve_points, encoding),
+                'curve': curve,
+                'encoding': encoding
+            }
+
         mAP, detail = evaluate_map(gt_boxes, pred_boxes, iou_thr=iou)
         return {
             'mAP': mAP,
+            'mode': mode,
             'class_aps': {'default': mAP},
             'detail': detail
         }
     
     raise HTTPException(status_code=404, detail="Annotation files not found")
+
+
+# ---- drill-down: 매칭 표 (services/map_matches.py) 로 image / category 별 TP/FP/FN box ----
+
+def _coco_inputs(gt_id: str, pred_id: str, mode: str, iou: float):
+    gt_path = Path(settings.DATA_ROOT) / "annotations" / f"{gt_id}.json"
+    pred_path = Path(settings.DATA_ROOT) / "annotations" / f"{pred_id}.json"
+    if not gt_path.exists() or not pred_path.exists():
+        raise HTTPException(status_code=404, detail="Annotation files not found")
+    gt_cols = ann_cache.get_coco(gt_path)
+    pred_cols = ann_cache.get_coco(pred_path)
+    matches = get_match_table(gt_path, pred_path, mode, iou)
+    if gt_cols is None or pred_cols is None or matches is None:
+        raise HTTPException(status_code=400, detail="Failed to parse COCO annotation files")
+    return gt_cols, pred_cols, matches
+
+
+def _boxes(cols, rows, categories, images, score=True, gt_rows=None, ious=None, gt_cols=None):
+    out = []
+    for i, r in enumerate(rows.tolist()):
+        cat = int(cols.category_id[r])
+        ann_id = int(cols.ann_id[r])
+        box = {
+            'id': ann_id if ann_id >= 0 else None,
+            'image_id': original_id(images, int(cols.image_id[r])),
+            'category_id': original_id(categories, cat),
+            'category': categories.get(cat, {}).get('name', f'class_{cat}'),
+            'bbox': cols.bbox[r].tolist(),
+        }
+        if score:
+            box['score'] = float(cols.score[r])
+        if gt_rows is not None:
+            g = int(gt_rows[i])
+            gid = int(gt_cols.ann_id[g])
+            box['gt_id'] = gid if gid >= 0 else None
+            box['gt_bbox'] = gt_cols.bbox[g].tolist()
+            box['iou'] = float(ious[i])
+        out.append(box)
+    return out
+
+
+def _drilldown(gt_cols, pred_cols, res, offset=0, limit=None):
+    end = None if limit is None else offset + limit
+    cats, imgs = gt_cols.categories, gt_cols.images
+    return {
+        'counts': {'tp': int(res['tp'].size), 'fp': int(res['fp'].size), 'fn': int(res['fn'].size)},
+        'tp': _boxes(pred_cols, res['tp'][offset:end], cats, imgs, gt_rows=res['tp_gt'][offset:end],
+                     ious=res['tp_iou'][offset:end], gt_cols=gt_cols),
+        'fp': _boxes(pred_cols, res['fp'][offset:end], cats, imgs),
+        'fn': _boxes(gt_cols, res['fn'][offset:end], cats, imgs, score=False),
+    }
+
+
+@router.get("/image")
+def map_image_matches(
+    gt_id: str = Query(..., description="GT annotation ID"),
+    pred_id: str = Query(..., description="Prediction annotation ID"),
+    image_id: str = Query(..., description="COCO image id (정수가 아니어도 된다)"),
+    iou: float = Query(0.5, ge=0.05, le=0.95, description="IoU threshold (coco: nearest of .50:.95)"),
+    conf: float = Query(0.0, ge=0.0, le=1.0, description="Confidence threshold"),
+    mode: Literal["voc", "coco"] = Query("voc")
+):
+    """image 하나의 TP/FP(pred, score 순)/FN(GT) box. 매칭 표는 (파일 내용, mode, iou) 별로 한 번만 만든다."""
+    gt_cols, pred_cols, matches = _coco_inputs(gt_id, pred_id, mode, iou)
+    k = matches.threshold_index(iou)
+    code = id_code(image_id)
+    res = matches.image_rows(code, conf, k)
+    if res is None:
+        if code not in gt_cols.images:
+            raise HTTPException(status_code=404, detail=f"image {image_id} not found")
+        empty = np.empty(0, dtype=np.int64)
+        res = {'tp': empty, 'tp_gt': empty, 'tp_iou': np.empty(0), 'fp': empty, 'fn': empty}
+    return {
+        'image_id': original_id(gt_cols.images, code),
+        'image': gt_cols.images.get(code),
+        'mode': mode,
+        'iou': round(float(matches.a['thrs'][k]), 4),
+        'conf': conf,
+        **_drilldown(gt_cols, pred_cols, res),
+    }
+
+
+@router.get("/category")
+def map_category_matches(
+    gt_id: str = Query(..., description="GT annotation ID"),
+    pred_id: str = Query(..., description="Prediction annotation ID"),
+    category_id: str = Query(..., description="COCO category id (정수가 아니어도 된다)"),
+    iou: float = Query(0.5, ge=0.05, le=0.95, description="IoU threshold (coco: nearest of .50:.95)"),
+    conf: float = Query(0.0, ge=0.0, le=1.0, description="Confidence threshold"),
+    mode: Literal["voc", "coco"] = Query("voc"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000, description="tp/fp/fn 각각 최대 개수")
+):
+    """category 하나의 TP/FP(score 순)/FN(image 순) box. counts 는 전체, 목록은 offset/limit 로 잘라서."""
+    gt_cols, pred_cols, matches = _coco_inputs(gt_id, pred_id, mode, iou)
+    k = matches.threshold_index(iou)
+    code = id_code(category_id)
+    res = matches.category_rows(code, conf, k)
+    if res is None:
+        raise HTTPException(status_code=404, detail=f"category {category_id} not found")
+    cat = gt_cols.categories.get(code, {})
+    return {
+        'category_id': original_id(gt_cols.categories, code),
+        'category': cat.get('name', f'class_{category_id}'),
+        'mode': mode,
+        'iou': round(float(matches.a['thrs'][k]), 4),
+        'conf': conf,
+        'offset': offset,
+        'limit': limit,
+        **_drilldown(gt_cols, pred_cols, res, offset, limit),
+    }
+
+
+@router.get("/analysis")
+def map_error_analysis(
+    gt_id: str = Query(..., description="GT annotation ID"),
+    pred_id: str = Query(..., description="Prediction annotation ID"),
+    iou: float = Query(0.5, ge=0.1, le=0.95, description="Foreground IoU threshold (t_f)"),
+    conf: float = Query(0.0, ge=0.0, le=1.0, description="Confidence threshold")
+):
+    """
+    오류 분석: FP 를 cls/loc/both/dupe/bkg, FN 을 cls/loc/both/missed 로 분류 (TIDE) 하고
+    class confusion matrix (행 GT, 열 pred, 마지막은 background) 를 만든다. 표는 (파일 내용, iou) 별로 캐시.
+    """
+    gt_path = Path(settings.DATA_ROOT) / "annotations" / f"{gt_id}.json"
+    pred_path = Path(settings.DATA_ROOT) / "annotations" / f"{pred_id}.json"
+    if not gt_path.exists() or not pred_path.exists():
+        raise HTTPException(status_code=404, detail="Annotation files not found")
+    table = get_error_table(gt_path, pred_path, iou)
+    if table is None:
+        raise HTTPException(status_code=400, detail="Failed to parse COCO annotation files")
+    return {'conf': conf, **table.evaluate(conf)}
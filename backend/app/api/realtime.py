@@ -2,13 +2,18 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import json
 from app.core.config import settings
-from app.services.mota import evaluate_mota, evaluate_mota_detailed
+from app.services.mota import MATCHERS
+from app.services.motacache import ann_cache
+from app.services.mota_session import PreviewSession
 
 router = APIRouter(prefix="/ws", tags=["ws"])
 
 @router.websocket("/preview")
 async def ws_preview(ws: WebSocket):
     await ws.accept()
+    # 연결마다 평가 상태를 유지: 같은 (gt, pred, matcher) 면 바뀐 프레임만 다시 계산
+    session = None
+    session_key = None
     try:
         while True:
             raw = await ws.receive_text()
@@ -22,12 +27,19 @@ async def ws_preview(ws: WebSocket):
             pred_id = payload.get("pred_id")
             iou_thr = payload.get("iou", 0.5)
             conf_thr= payload.get("conf", 0.0)
+            matcher = payload.get("matcher", "greedy")
+            edits   = payload.get("edits") or None   # [{frame,id,x,y,w,h,conf}] pred 박스 수정
+            extended = bool(payload.get("extended", False))   # MOTP/IDF1/HOTA 등도 함께
 
             try:    iou_thr = float(iou_thr)
             except: iou_thr = 0.5
             try:    conf_thr = float(conf_thr)
             except: conf_thr = 0.0
 
+            if matcher not in MATCHERS:
+                await ws.send_text(json.dumps({"error":f"matcher must be one of {list(MATCHERS)}"}))
+                continue
+
             if not gt_id or not pred_id:
                 await ws.send_text(json.dumps({"error":"gt_id/pred_id required"}))
                 continue
@@ -39,15 +51,27 @@ async def ws_preview(ws: WebSocket):
                 await ws.send_text(json.dumps({"error":"annotation id not found"}))
                 continue
 
-            # use detailed evaluator to get idsw frames for the preview websocket
-            mota, stats, _idsw_frames, _details = evaluate_mota_detailed(gt_path, pr_path, iou_thr, conf_thr)
+            # 파일 내용(sha)이 바뀌었으면 세션을 새로 만든다
+            key = (ann_cache.sha_of(gt_path), ann_cache.sha_of(pr_path), matcher)
+            if session is None or key != session_key:
+                session = PreviewSession(ann_cache.get_mot(gt_path), ann_cache.get_mot(pr_path), matcher)
+                session_key = key
+            try:
+                res = session.update(iou_thr, conf_thr, edits)
+            except (KeyError, TypeError, ValueError) as e:
+                await ws.send_text(json.dumps({"error":f"invalid edits: {e}"}))
+                continue
+            stats = res["stats"]
             resp = {
-                "MOTA": mota,
+                "MOTA": res["mota"],
                 "TP": stats["TP"],
                 "FP": stats["FP"],
                 "FN": stats["FN"],
                 "IDSW": stats["IDSW"],
+                "recomputed": res["recomputed"],   # 이번 메시지에서 다시 매칭한 프레임 수
             }
+            if extended:
+                resp["extended"] = session.extended()
             await ws.send_text(json.dumps(resp))
     except WebSocketDisconnect:
         pass
@@ -3,8 +3,10 @@ from fastapi import APIRouter, Query, HTTPException
 from app.core.config import settings
 from app.repos.ann_repo import AnnotationsRepo
 from app.services.overlay_stream import slice_tracks
+from app.services.mota import MotTable
+from app.services.motacache import ann_cache
 from pathlib import Path
-import csv
+import numpy as np
 
 router = APIRouter()
 repo = AnnotationsRepo(settings.DATA_ROOT)
@@ -13,34 +15,31 @@ def _parse_mot_slice_from_file(path: Path, f0: int, f1: int):
     """
     아주 일반적인 MOT txt(csv) 포맷:
       frame, id, x, y, w, h, conf, -1, -1, -1
-    를 파싱해서 프론트가 기대하는 구조로 변환한다.
+    를 컬럼 배열(MotTable)로 읽고 frame offset index 로 [f0, f1] 구간만 잘라
+    프론트가 기대하는 구조로 변환한다.
     반환 형태:
       { "tracks": [ { "id": <int>, "frames": [ {"f": <int>, "bbox":[x,y,w,h], "conf": <float>} ... ] } ... ] }
     """
-    tracks: dict[int, list[dict]] = {}
-    with path.open("r", encoding="utf-8") as fp:
-        reader = csv.reader(fp)
-        for row in reader:
-            if not row:
-                continue
-            try:
-                fr = int(float(row[0]))
-                tid = int(float(row[1]))
-                x = float(row[2]); y = float(row[3]); w = float(row[4]); h = float(row[5])
-                conf = float(row[6]) if len(row) > 6 and row[6] not in ("", None) else 1.0
-            except Exception:
-                # 행이 이상하면 스킵
-                continue
-            if fr < min(f0, f1) or fr > max(f0, f1):
-                continue
-            tracks.setdefault(tid, []).append({
-                "f": fr,
-                "bbox": [x, y, w, h],
-                "conf": conf,
-            })
-    # id 순서 안정화
-    out = {"tracks": [{"id": k, "frames": sorted(v, key=lambda a: a["f"])} for k, v in sorted(tracks.items())]}
-    return out
+    table = ann_cache.get_mot(path)
+    return _tracks_from_table(table, f0, f1)
+
+def _tracks_from_table(table: MotTable, f0: int, f1: int):
+    lo, hi = min(f0, f1), max(f0, f1)
+    s, e = table.range_span(lo, hi)
+    # 행은 이미 frame 순이므로 id 로 stable 정렬하면 (id, frame) 순서가 된다
+    order = np.argsort(table.ids[s:e], kind="stable") + s
+    ids = table.ids[order].tolist()
+    frs = table.frame[order].tolist()
+    boxes = table.boxes[order].tolist()
+    confs = table.conf[order].tolist()
+    out = []
+    cur = None
+    for tid, fr, box, conf in zip(ids, frs, boxes, confs):
+        if cur is None or cur["id"] != tid:
+            cur = {"id": tid, "frames": []}
+            out.append(cur)
+        cur["frames"].append({"f": fr, "bbox": box, "conf": conf})
+    return {"tracks": out}
 
 @router.get("/tracks")
 def get_tracks_compat(
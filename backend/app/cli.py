@@ -0,0 +1,81 @@
+# backend/app/cli.py
+"""
+명령행 도구.
+
+    cd backend && python -m app.cli batch manifest.json --iou 0.5 --matcher hungarian
+
+manifest:
+  - JSON: [{"sequence": "MOT17-02", "gt": "MOT17-02/gt.txt", "pred": "trk/MOT17-02.txt"}, ...]
+          또는 [["MOT17-02", "MOT17-02/gt.txt", "trk/MOT17-02.txt"], ...]
+  - 그 외(csv/txt): 한 줄에 sequence,gt,pred  ('#' 주석 허용)
+상대 경로는 manifest 파일 위치 기준. 진행 상황은 시퀀스가 끝날 때마다 stdout 에 NDJSON 으로 출력한다.
+파싱 캐시는 --cache-dir 을 준 경우에만 그 디렉터리에 쓴다 (서버의 DATA_ROOT/cache 는 건드리지 않는다).
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+from app.services.batch import BatchItem, aggregate, default_workers, iter_batch
+from app.services.mota import MATCHERS
+
+
+def load_manifest(path: Path) -> List[BatchItem]:
+    base = path.parent
+    if path.suffix.lower() == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            raw = json.load(f)
+        rows = [(r["sequence"], r["gt"], r["pred"]) if isinstance(r, dict) else tuple(r) for r in raw]
+    else:
+        with path.open("r", encoding="utf-8", newline="") as f:
+            rows = [tuple(c.strip() for c in r) for r in csv.reader(f)
+                    if r and not r[0].lstrip().startswith("#")]
+    items = []
+    for row in rows:
+        if len(row) != 3:
+            raise ValueError(f"manifest row must be (sequence, gt, pred): {row!r}")
+        seq, gt, pred = row
+        items.append(BatchItem(str(seq), base / gt, base / pred))
+    return items
+
+
+def _cmd_batch(args) -> int:
+    items = load_manifest(Path(args.manifest))
+    missing = [str(p) for it in items for p in (it.gt, it.pred) if not p.exists()]
+    if missing:
+        print(f"missing files: {missing}", file=sys.stderr)
+        return 2
+
+    results = []
+    for r in iter_batch(items, args.iou, args.conf, args.matcher, args.workers, args.stream, args.cache_dir):
+        results.append(r)
+        print(json.dumps({"type": "sequence", "done": len(results), "total": len(items), **r}), flush=True)
+    summary = aggregate(results)
+    print(json.dumps({"type": "summary", **summary}), flush=True)
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("batch", help="evaluate MOTA for every (sequence, gt, pred) in a manifest")
+    p.add_argument("manifest")
+    p.add_argument("--iou", type=float, default=0.5)
+    p.add_argument("--conf", type=float, default=0.0)
+    p.add_argument("--matcher", choices=MATCHERS, default="greedy")
+    p.add_argument("--workers", type=int, default=None, help=f"process pool size (default: {default_workers()})")
+    p.add_argument("--stream", action="store_true",
+                   help="bounded-memory streaming evaluation (for very long sequences)")
+    p.add_argument("--cache-dir", type=Path, default=None,
+                   help="keep parsed annotations in this directory across runs (default: no cache)")
+    p.set_defaults(func=_cmd_batch)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
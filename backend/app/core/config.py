@@ -6,9 +6,19 @@ class Settings:
     APP_NAME: str = "tracker-eval-backend"
     DATA_ROOT: Path = Path(os.environ.get("DATA_ROOT", "/app/appdata")).resolve()
     CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "http://localhost:5173").split(",")
+    # 파싱된 annotation 메모리 캐시 예산 (bytes)
+    ANN_CACHE_MAX_BYTES: int = int(os.environ.get("ANN_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # mAP 누적 PR 표 메모리 캐시 예산 (bytes)
+    MAP_CACHE_MAX_BYTES: int = int(os.environ.get("MAP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # category 분할 병렬 매칭: worker 수 (0 이면 CPU 코어 수), 이보다 pred 가 적으면 단일 프로세스
+    MAP_WORKERS: int = int(os.environ.get("MAP_WORKERS", "0"))
+    MAP_PARALLEL_MIN_PREDS: int = int(os.environ.get("MAP_PARALLEL_MIN_PREDS", "200000"))
+    # 이미지 축소본(thumb/medium) background 생성 worker 수 (0 이면 CPU 코어 수의 절반)
+    THUMB_WORKERS: int = int(os.environ.get("THUMB_WORKERS", "0"))
 
     def ensure_dirs(self):
         (self.DATA_ROOT / "annotations").mkdir(parents=True, exist_ok=True)
+        (self.DATA_ROOT / "cache").mkdir(parents=True, exist_ok=True)
 
 settings = Settings()
 settings.ensure_dirs()
@@ -1,9 +1,6 @@
 # backend/app/main.py
-# Increase multipart form limits BEFORE importing FastAPI/Starlette
-# This allows uploading up to 10,000 images in a single request
-import os
-os.environ['STARLETTE_MAX_FIELDS'] = '10000'
-
+# 큰 이미지 폴더는 /images/folders 의 batch 업로드로 나눠 받으므로 multipart 필드 수 제한은 기본값 그대로
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
@@ -15,8 +12,18 @@ from app.api.images import router as images_router
 
 from app.api.analysis import router as analysis_router
 from app.api.map_metrics import router as map_metrics_router
+from app.api.cache import router as cache_router
+from app.services import thumbnails
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 남은 축소본 작업을 기다리지 않고 종료 (없는 크기는 다음 요청 때 만든다)
+    thumbnails.shutdown()
+
 
-app = FastAPI(title=settings.APP_NAME)
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,4 +46,5 @@ app.include_router(tracks_router)
 app.include_router(export_router)
 app.include_router(analysis_router)
 app.include_router(map_metrics_router, prefix="/map")
-app.include_router(images_router)
\ No newline at end of file
+app.include_router(images_router)
+app.include_router(cache_router)
\ No newline at end of file
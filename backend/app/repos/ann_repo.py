@@ -1,10 +1,13 @@
 import os, json
-from .database import SimpleKV
+from .database import get_db, new_id
 
 class AnnotationsRepo:
     def __init__(self, data_root: str):
         self.root = data_root
-        self.kv = SimpleKV(data_root, "annotations")
+        self.db = get_db(data_root)
+        self.db.migrate_json("annotations", lambda c, data: c.executemany(
+            "INSERT OR IGNORE INTO annotations (id, kind, sha, src) VALUES (?, ?, ?, ?)",
+            [(k, v.get("kind"), v.get("sha"), v.get("src")) for k, v in data.items() if v.get("sha")]))
         os.makedirs(os.path.join(self.root, "annotations"), exist_ok=True)
 
     def ensure_dir(self, sha: str):
@@ -13,31 +16,52 @@ class AnnotationsRepo:
         return d
 
     def register(self, kind: str, sha: str, src_path: str):
-        data = self.kv.read_all()
-        # reuse id if exists
-        for k,v in data.items():
-            if v.get("sha")==sha:
-                return k
-        ann_id = self.kv.new_id()
-        data[ann_id] = {"kind":kind, "sha":sha, "src":src_path}
-        self.kv.write_all(data)
+        with self.db.tx() as c:
+            # reuse id if exists (조회와 삽입이 같은 트랜잭션이라 동시 업로드도 id 하나)
+            row = c.execute("SELECT id FROM annotations WHERE sha = ? LIMIT 1", (sha,)).fetchone()
+            if row:
+                return row["id"]
+            ann_id = new_id()
+            c.execute("INSERT INTO annotations (id, kind, sha, src) VALUES (?, ?, ?, ?)",
+                      (ann_id, kind, sha, src_path))
         return ann_id
 
+    def claim(self, ann_id: str, kind: str, sha: str, src_path: str):
+        """
+        업로드 파일 등록 (content-addressed). 같은 sha + 같은 kind + 같은 확장자 파일이 이미 있으면 그 id,
+        없으면 ann_id 로 등록하고 ann_id 를 돌려준다. 조회와 삽입이 한 트랜잭션이라 동시 업로드도 id 하나.
+        kind 가 다르면 (같은 파일을 gt 와 pred 로) 합치지 않고 따로 등록한다.
+        """
+        ext = os.path.splitext(src_path)[1]
+        with self.db.tx() as c:
+            for row in c.execute("SELECT id, src FROM annotations WHERE sha = ? AND kind = ?", (sha, kind)).fetchall():
+                src = row["src"] or ""
+                if os.path.splitext(src)[1] == ext and os.path.exists(src):
+                    return row["id"]
+            c.execute("INSERT INTO annotations (id, kind, sha, src) VALUES (?, ?, ?, ?)",
+                      (ann_id, kind, sha, src_path))
+        return ann_id
+
+    def set_sha(self, ann_id: str, sha: str):
+        """파일 내용이 바뀌었을 때 (PATCH)."""
+        with self.db.tx() as c:
+            c.execute("UPDATE annotations SET sha = ? WHERE id = ?", (sha, ann_id))
+
     def exists_by_sha(self, sha: str)->bool:
-        data = self.kv.read_all()
-        return any(v.get("sha")==sha for v in data.values())
+        return self.get_id_by_sha(sha) is not None
 
     def get_id_by_sha(self, sha: str):
-        data = self.kv.read_all()
-        for k,v in data.items():
-            if v.get("sha")==sha:
-                return k
-        return None
+        row = self.db.conn().execute("SELECT id FROM annotations WHERE sha = ? LIMIT 1", (sha,)).fetchone()
+        return row["id"] if row else None
+
+    def get(self, ann_id: str):
+        row = self.db.conn().execute("SELECT kind, sha, src FROM annotations WHERE id = ?", (ann_id,)).fetchone()
+        return dict(row) if row else None
 
     def read_normalized(self, ann_id: str):
-        data = self.kv.read_all().get(ann_id)
+        data = self.get(ann_id)
         if not data: return None
         p = os.path.join(self.root, "annotations", data["sha"], "normalized.json")
         if not os.path.exists(p): return None
         with open(p, "r", encoding="utf-8") as f:
-            return json.load(f)
\ No newline at end of file
+            return json.load(f)
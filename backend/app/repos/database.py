@@ -1,17 +1,97 @@
-import os, json, uuid
+# backend/app/repos/database.py
+"""
+SQLite (WAL) 저장소. data_root/db/app.sqlite3 하나에 테이블별로 기록한다.
 
-class SimpleKV:
-    def __init__(self, root: str, name: str):
-        self.path = os.path.join(root, "db", f"{name}.json")
+예전 SimpleKV 는 db/<name>.json 전체를 매번 읽고 다시 써서 조회가 레코드 수에 비례하고
+동시 요청의 쓰기가 유실될 수 있었다. 여기서는 sha / id 인덱스로 조회하고,
+읽고-쓰는 작업은 BEGIN IMMEDIATE 트랜잭션 하나로 묶는다. db/<name>.json 이 있으면 처음 열 때 한 번 옮긴다.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    id   TEXT PRIMARY KEY,
+    kind TEXT,
+    sha  TEXT NOT NULL,
+    src  TEXT
+);
+CREATE INDEX IF NOT EXISTS annotations_sha ON annotations(sha);
+CREATE TABLE IF NOT EXISTS runs (
+    id                 TEXT PRIMARY KEY,
+    gt_annotation_id   TEXT,
+    pred_annotation_id TEXT,
+    iou_threshold      REAL,
+    project_id         TEXT
+);
+CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY);
+"""
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class Database:
+    """연결은 스레드마다 하나 (FastAPI 의 sync endpoint 는 threadpool 에서 돈다)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, "db", "app.sqlite3")
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        if not os.path.exists(self.path):
-            with open(self.path, "w") as f:
-                json.dump({}, f)
-    def read_all(self):
-        with open(self.path, "r") as f:
-            return json.load(f)
-    def write_all(self, data):
-        with open(self.path, "w") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    def new_id(self):
-        return uuid.uuid4().hex[:12]
\ No newline at end of file
+        self._local = threading.local()
+        self.conn().executescript(SCHEMA)
+
+    def conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            c.row_factory = sqlite3.Row
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+    @contextmanager
+    def tx(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션. 처음부터 write lock 을 잡아 읽고-쓰는 사이에 다른 쓰기가 끼지 않는다."""
+        c = self.conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        c.execute("COMMIT")
+
+    def migrate_json(self, name: str, insert: Callable[[sqlite3.Connection, Dict[str, dict]], None]) -> None:
+        """db/<name>.json (SimpleKV) 을 한 번만 옮기고 파일은 <name>.json.migrated 로 이름을 바꾼다."""
+        src = os.path.join(self.root, "db", f"{name}.json")
+        with self.tx() as c:
+            if c.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone():
+                return
+            if os.path.exists(src):
+                with open(src, "r", encoding="utf-8") as f:
+                    insert(c, json.load(f))
+            c.execute("INSERT INTO migrations (name) VALUES (?)", (name,))
+        if os.path.exists(src):
+            os.replace(src, src + ".migrated")
+
+
+_dbs: Dict[str, Database] = {}
+_dbs_lock = threading.Lock()
+
+
+def get_db(root: str) -> Database:
+    """data_root 마다 Database 하나."""
+    key = os.path.abspath(str(root))
+    with _dbs_lock:
+        db = _dbs.get(key)
+        if db is None:
+            db = _dbs[key] = Database(str(root))
+        return db
@@ -1,28 +1,33 @@
 import os, json
-from .database import SimpleKV
+from .database import get_db, new_id
+
+_RUN_FIELDS = ("gt_annotation_id", "pred_annotation_id", "iou_threshold", "project_id")
 
 class RunsRepo:
     def __init__(self, data_root: str):
         self.root = data_root
-        self.kv = SimpleKV(data_root, "runs")
+        self.db = get_db(data_root)
+        self.db.migrate_json("runs", lambda c, data: c.executemany(
+            "INSERT OR IGNORE INTO runs (id, gt_annotation_id, pred_annotation_id, iou_threshold, project_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(k, *(v.get(f) for f in _RUN_FIELDS)) for k, v in data.items()]))
 
     def create(self, run: dict):
-        run_id = self.kv.new_id()
-        data = self.kv.read_all()
-        data[run_id] = {
-            "gt_annotation_id": run.gt_annotation_id,
-            "pred_annotation_id": run.pred_annotation_id,
-            "iou_threshold": run.iou_threshold,
-            "project_id": run.project_id,
-        }
-        self.kv.write_all(data)
+        run_id = new_id()
+        with self.db.tx() as c:
+            c.execute("INSERT INTO runs (id, gt_annotation_id, pred_annotation_id, iou_threshold, project_id) "
+                      "VALUES (?, ?, ?, ?, ?)",
+                      (run_id, run.gt_annotation_id, run.pred_annotation_id, run.iou_threshold, run.project_id))
         return run_id
 
     def get(self, run_id: str):
-        return self.kv.read_all().get(run_id)
+        row = self.db.conn().execute(
+            "SELECT gt_annotation_id, pred_annotation_id, iou_threshold, project_id FROM runs WHERE id = ?",
+            (run_id,)).fetchone()
+        return dict(row) if row else None
 
     def save_metrics(self, run_id: str, metrics: dict):
         run_dir = os.path.join(self.root, "runs", run_id)
         os.makedirs(run_dir, exist_ok=True)
         with open(os.path.join(run_dir, "metrics.json"), "w") as f:
-            json.dump(metrics, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
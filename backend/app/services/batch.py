@@ -0,0 +1,121 @@
+# backend/app/services/batch.py
+"""
+여러 시퀀스(MOT17/MOT20 처럼 시퀀스마다 GT/Pred 한 쌍)를 process pool 로 병렬 평가.
+
+manifest 는 (sequence, gt, pred) 목록이고, 결과는 끝나는 순서대로 하나씩 yield 한다.
+합산 결과는 시퀀스별 카운트를 더해 MOTA = 1 - (FN + FP + IDSW) / total_gt 로 다시 계산한다.
+파싱 캐시는 cache_dir 을 준 경우에만 쓴다 (서버는 ann_cache.cache_dir, CLI 는 --cache-dir). 없으면 매번 파싱한다.
+"""
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.mota import MotTable, check_matcher, evaluate_mota, load_mot
+from app.services.mota_stream import evaluate_mota_stream
+
+_COUNT_KEYS = ("TP", "FP", "FN", "IDSW", "total_gt")
+
+
+class BatchItem(NamedTuple):
+    sequence: str
+    gt: Path
+    pred: Path
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+# 프로세스별 AnnotationCache.get_mot (cache_dir 마다 하나)
+_loaders: Dict[Path, Callable[[Path], MotTable]] = {}
+
+
+def _mot_loader(cache_dir: Optional[Path]) -> Callable[[Path], MotTable]:
+    """cache_dir 이 없으면 캐시 없이 파싱. 서버의 캐시 디렉터리면 서버의 ann_cache 를 그대로 쓴다."""
+    if cache_dir is None:
+        return load_mot
+    # motacache 는 import 할 때 서버 캐시 디렉터리를 만들므로 캐시를 쓸 때만 import
+    from app.services.motacache import AnnotationCache, ann_cache
+    cache_dir = Path(cache_dir)
+    if cache_dir == ann_cache.cache_dir:
+        return ann_cache.get_mot
+    if cache_dir not in _loaders:
+        _loaders[cache_dir] = AnnotationCache(cache_dir, settings.ANN_CACHE_MAX_BYTES).get_mot
+    return _loaders[cache_dir]
+
+
+def evaluate_sequence(item: BatchItem, iou_thr: float, conf_thr: float, matcher: str,
+                      stream: bool = False, cache_dir: Optional[Path] = None) -> dict:
+    """
+    시퀀스 하나 평가 (worker 프로세스에서 실행). 실패는 예외 대신 error 필드로 돌려준다.
+    stream=True 면 파일을 통째로 올리지 않는 evaluate_mota_stream 사용 (아주 긴 시퀀스용).
+    """
+    t0 = time.perf_counter()
+    try:
+        if stream:
+            mota, stats = evaluate_mota_stream(item.gt, item.pred, iou_thr, conf_thr, matcher)
+        else:
+            load = _mot_loader(cache_dir)
+            mota, stats = evaluate_mota(load(item.gt), load(item.pred), iou_thr, conf_thr, matcher)
+    except Exception as e:
+        return {"sequence": item.sequence, "error": f"{type(e).__name__}: {e}"}
+    return {
+        "sequence": item.sequence,
+        "mota": mota,
+        **stats,
+        "total_gt": stats["TP"] + stats["FN"],
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def iter_batch(
+    items: List[BatchItem],
+    iou_thr: float,
+    conf_thr: float = 0.0,
+    matcher: str = "greedy",
+    workers: Optional[int] = None,
+    stream: bool = False,
+    cache_dir: Optional[Path] = None,
+) -> Iterator[dict]:
+    """시퀀스 결과를 완료 순서대로 yield. workers 기본값은 CPU 코어 수."""
+    check_matcher(matcher)
+    if not items:
+        return
+    workers = max(1, min(workers or default_workers(), len(items)))
+    if workers == 1:
+        for item in items:
+            yield evaluate_sequence(item, iou_thr, conf_thr, matcher, stream, cache_dir)
+        return
+
+    # 서버 프로세스는 스레드를 쓰므로 fork 대신 spawn 으로 worker 를 띄운다
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(evaluate_sequence, item, iou_thr, conf_thr, matcher, stream, cache_dir)
+                   for item in items]
+        try:
+            for fut in as_completed(futures):
+                yield fut.result()
+        finally:
+            # 클라이언트가 중간에 끊으면 아직 시작 안 한 시퀀스는 버린다
+            for fut in futures:
+                fut.cancel()
+
+
+def aggregate(results: Iterable[dict]) -> dict:
+    """시퀀스별 카운트를 합산하고 전체 MOTA 를 다시 계산 (실패한 시퀀스는 제외)."""
+    totals = dict.fromkeys(_COUNT_KEYS, 0)
+    done = failed = 0
+    for r in results:
+        if "error" in r:
+            failed += 1
+            continue
+        done += 1
+        for k in _COUNT_KEYS:
+            totals[k] += r[k]
+    mota = 1.0
+    if totals["total_gt"] > 0:
+        mota = 1.0 - (totals["FN"] + totals["FP"] + totals["IDSW"]) / float(totals["total_gt"])
+    return {"sequences": done, "failed": failed, "mota": mota, **totals}
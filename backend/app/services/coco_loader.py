@@ -1,9 +1,14 @@
 """COCO format annotation loader for MAP mode."""
+import hashlib
 import json
+import re
+from array import array
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from collections import defaultdict
 
+import numpy as np
+
 
 def load_coco_annotations(filepath: Path) -> Tuple[Optional[Dict], Optional[Dict], Optional[Dict]]:
     """
@@ -73,6 +78,244 @@ def load_predictions(filepath: Path) -> Optional[Dict[int, List[Dict]]]:
         return None
 
 
+# ---- 스트리밍 컬럼 로더 -------------------------------------------------------------
+# 파일을 _READ_CHUNK 씩 읽으며 annotation 을 하나씩 decode 해 컬럼 버퍼(array)에 쌓는다.
+# 한 번에 메모리에 있는 dict 는 annotation 하나뿐이라 수 GB 짜리 결과 파일도 컬럼 크기만큼만 쓴다.
+
+_READ_CHUNK = 1 << 20
+_WS = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+# images 표에 남기는 필드 (segmentation 등 큰 필드는 버린다)
+_IMAGE_FIELDS = ("id", "file_name", "width", "height")
+
+
+def id_code(value: Any) -> int:
+    """
+    COCO image/category id -> int64 code. 정수 (또는 정수 문자열) 는 그 값,
+    그 밖의 id ("img_001" 등) 는 문자열 해시로 만든 음수 code 라 GT/결과 파일을 따로 읽어도 같은 id 는 같은 code.
+    """
+    if type(value) is int:
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    text = str(value)
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    h = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    return -2 - (h & ((1 << 62) - 1))   # -1 (없음) 과 겹치지 않게
+
+
+def original_id(table: Dict[int, Dict], code: int) -> Any:
+    """images/categories 표에서 code 의 원래 id (표에 없으면 code 그대로)."""
+    return table.get(code, {}).get("id", code)
+
+
+class CocoColumns(NamedTuple):
+    """
+    COCO GT/결과 파일의 컬럼 형태. GT 의 score 는 1.0, 결과 파일의 iscrowd 는 0.
+    image_id/category_id 는 id_code() 값이고, 원래 id 는 images/categories 표의 "id" 에 남는다.
+    """
+    ann_id: np.ndarray       # int64 (없으면 -1)
+    image_id: np.ndarray     # int64
+    category_id: np.ndarray  # int64
+    bbox: np.ndarray         # (N, 4) float64 xywh
+    score: np.ndarray        # float64
+    area: np.ndarray         # float64 (없으면 w*h)
+    iscrowd: np.ndarray      # uint8
+    images: Dict[int, Dict]       # image code -> {id, file_name, width, height}
+    categories: Dict[int, Dict]   # category code -> category
+
+
+COCO_ARRAY_FIELDS = CocoColumns._fields[:7]
+
+
+def take_rows(cols: CocoColumns, rows: np.ndarray) -> CocoColumns:
+    """행 부분집합 (lookup 표는 그대로 공유)."""
+    return cols._replace(**{name: np.asarray(getattr(cols, name)[rows]) for name in COCO_ARRAY_FIELDS})
+
+
+class _JsonStream:
+    """파일을 조금씩 읽으며 JSON 값을 하나씩 꺼낸다 (배열/객체는 원소 단위로 순회)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(_READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 버퍼 끝에서 잘린 숫자일 수 있다
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def _close(self, end: str) -> bool:
+        c = self.peek()
+        self.pos += 1
+        if c == end:
+            return True
+        if c != ",":
+            raise ValueError(f"expected ',' or {end!r} at offset {self.pos - 1}")
+        return False
+
+    def items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._close("]"):
+                return
+
+    def members(self) -> Iterator[str]:
+        """객체의 key 를 yield. 호출 측이 값(value()/items())을 소비해야 다음 key 로 넘어간다."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self._close("}"):
+                return
+
+
+class _ColumnBuilder:
+    def __init__(self, default_score: float):
+        self.default_score = default_score
+        self.ann_id = array("q")
+        self.image_id = array("q")
+        self.category_id = array("q")
+        self.bbox = array("d")
+        self.score = array("d")
+        self.area = array("d")
+        self.iscrowd = array("B")
+
+    def add(self, ann: Dict) -> None:
+        bbox = ann.get("bbox")
+        image_id = ann.get("image_id")
+        category_id = ann.get("category_id")
+        if image_id is None or category_id is None or not bbox or len(bbox) != 4:
+            return
+        x, y, w, h = (float(c) for c in bbox)
+        ann_id = ann.get("id")
+        self.ann_id.append(ann_id if type(ann_id) is int else -1 if ann_id is None else id_code(ann_id))
+        self.image_id.append(image_id if type(image_id) is int else id_code(image_id))
+        self.category_id.append(category_id if type(category_id) is int else id_code(category_id))
+        self.bbox.extend((x, y, w, h))
+        score = ann.get("score")
+        self.score.append(self.default_score if score is None else float(score))
+        area = ann.get("area")
+        self.area.append(w * h if area is None else float(area))
+        self.iscrowd.append(1 if ann.get("iscrowd") else 0)
+
+    def build(self, images: Dict, categories: Dict) -> CocoColumns:
+        def col(buf, dtype):
+            return np.frombuffer(buf, dtype=dtype) if len(buf) else np.empty(0, dtype=dtype)
+        return CocoColumns(
+            col(self.ann_id, np.int64), col(self.image_id, np.int64), col(self.category_id, np.int64),
+            col(self.bbox, np.float64).reshape(-1, 4), col(self.score, np.float64),
+            col(self.area, np.float64), col(self.iscrowd, np.uint8),
+            images, categories,
+        )
+
+
+def coco_columns_from_doc(doc: Any) -> CocoColumns:
+    """이미 메모리에 있는 COCO 문서(dict 또는 결과 list)를 CocoColumns 로 (PATCH 본문 등)."""
+    images: Dict[int, Dict] = {}
+    categories: Dict[int, Dict] = {}
+    if isinstance(doc, list):
+        cols = _ColumnBuilder(default_score=0.0)
+        anns = doc
+    else:
+        cols = _ColumnBuilder(default_score=1.0)
+        anns = doc.get("annotations", [])
+        for img in doc.get("images", []):
+            images[id_code(img["id"])] = {k: img[k] for k in _IMAGE_FIELDS if k in img}
+        for cat in doc.get("categories", []):
+            categories[id_code(cat["id"])] = cat
+    for ann in anns:
+        cols.add(ann)
+    return cols.build(images, categories)
+
+
+def load_coco_columns(filepath: Path) -> Optional[CocoColumns]:
+    """
+    COCO GT 파일({"images", "annotations", "categories"}) 또는 결과 파일([{...}, ...])을
+    스트리밍으로 읽어 CocoColumns 로. 정수가 아닌 image_id/category_id 는 id_code() 로. 실패하면 None.
+    """
+    if not filepath.exists():
+        print(f"Error: annotation file not found - {filepath}")
+        return None
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            js = _JsonStream(f)
+            images: Dict[int, Dict] = {}
+            categories: Dict[int, Dict] = {}
+            if js.peek() == "[":
+                cols = _ColumnBuilder(default_score=0.0)
+                for ann in js.items():
+                    cols.add(ann)
+            else:
+                cols = _ColumnBuilder(default_score=1.0)
+                for key in js.members():
+                    if key == "annotations":
+                        for ann in js.items():
+                            cols.add(ann)
+                    elif key == "images":
+                        for img in js.items():
+                            images[id_code(img["id"])] = {k: img[k] for k in _IMAGE_FIELDS if k in img}
+                    elif key == "categories":
+                        for cat in js.items():
+                            categories[id_code(cat["id"])] = cat
+                    else:
+                        js.value()   # info, licenses 등
+            if js.peek():
+                raise ValueError("trailing data after top-level value")
+        res = cols.build(images, categories)
+        print(f"COCO columns loaded: {res.image_id.size} boxes, {len(images)} images, {len(categories)} categories")
+        return res
+    except Exception as e:
+        print(f"Error loading COCO annotation file: {e}")
+        return None
+
+
 def get_image_path(image_info: Dict, image_dir: Path) -> Optional[Path]:
     """Get image file path from image info and directory."""
     if not image_info or 'file_name' not in image_info:
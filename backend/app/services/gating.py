@@ -1,20 +1,9 @@
 import numpy as np
+from app.utils.iou import iou_matrix as _batch_iou
 
-def iou_matrix(gts, preds):
-    # gts/preds: list of [x,y,w,h]
-    def iou(a,b):
-        ax1, ay1, ax2, ay2 = a[0],a[1],a[0]+a[2],a[1]+a[3]
-        bx1, by1, bx2, by2 = b[0],b[1],b[0]+b[2],b[1]+b[3]
-        iw = max(0, min(ax2,bx2)-max(ax1,bx1))
-        ih = max(0, min(ay2,by2)-max(ay1,by1))
-        inter = iw*ih
-        union = a[2]*a[3]+b[2]*b[3]-inter
-        return inter/union if union>0 else 0.0
-    M = np.zeros((len(gts), len(preds)), dtype=float)
-    for i,ga in enumerate(gts):
-        for j,pb in enumerate(preds):
-            M[i,j] = iou(ga, pb)
-    return M
+def iou_matrix(gts, preds, dtype=np.float64):
+    # gts/preds: list of [x,y,w,h] 또는 (N,4) 배열
+    return _batch_iou(gts, preds, dtype=dtype)
 
 def gate_matrix(M, thr):
     G = M.copy()
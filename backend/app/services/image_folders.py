@@ -0,0 +1,257 @@
+# backend/app/services/image_folders.py
+"""
+MAP 모드 이미지 폴더 저장소.
+
+폴더 하나 = DATA_ROOT/images/<folder_id>/ (이미지 파일 + manifest).
+  manifest.jsonl : 파일이 디스크에 다 써진 뒤 한 줄씩 append ({id, file_name, path, sha256}).
+                   업로드가 중간에 끊겨도 여기 적힌 파일은 온전하므로 재개 시 건너뛴다.
+  images.json    : commit 때 manifest 를 id 순으로 정리해 한 번 쓴다 (예전 형식, 읽기 전용 경로 호환).
+파일은 .<name>.<uuid>.part 로 쓴 뒤 os.replace 로 옮기므로 반쯤 쓴 파일이 이름을 차지하지 않는다.
+
+이미지 조회용 FolderIndex (id/file_name -> path + stat 기반 ETag) 는 폴더별로 한 번 만들어 메모리에 두고
+(LRU, INDEX_MAX_FOLDERS 개), 그 폴더에 파일이 추가되거나 commit 되면 버린다.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from email.utils import formatdate
+from pathlib import Path
+from typing import BinaryIO, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+MANIFEST = "manifest.jsonl"
+METADATA = "images.json"
+_COPY_CHUNK = 1 << 20
+INDEX_MAX_FOLDERS = 64
+
+# manifest append 는 폴더별로 직렬화 (동시 batch 요청이 같은 폴더에 쓴다)
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock(folder_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(folder_id, threading.Lock())
+
+
+def folder_dir(folder_id: str) -> Optional[Path]:
+    """폴더 경로 (없거나 이름이 이상하면 None)."""
+    if not folder_id or "/" in folder_id or "\\" in folder_id or folder_id in (".", ".."):
+        return None
+    d = settings.DATA_ROOT / "images" / folder_id
+    return d if d.is_dir() else None
+
+
+def create_folder() -> str:
+    folder_id = str(uuid.uuid4())
+    d = settings.DATA_ROOT / "images" / folder_id
+    d.mkdir(parents=True, exist_ok=True)
+    (d / MANIFEST).touch()
+    return folder_id
+
+
+def safe_name(filename: Optional[str], idx: int) -> str:
+    """상대 경로의 구분자를 '_' 로 (하위 디렉터리를 만들지 않는다)."""
+    name = (filename or f"image_{idx}.jpg").replace('\\', '_').replace('/', '_')
+    if name in ("", ".", "..") or name.startswith(".") or name in (MANIFEST, METADATA):
+        name = f"_{name}"
+    return name
+
+
+def store_file(src: BinaryIO, dest: Path) -> str:
+    """src 를 dest 로 복사 (임시 파일 -> rename) 하며 sha256 을 돌려준다. 블로킹이므로 thread pool 에서 부른다."""
+    # 같은 이름을 동시에 쓰는 요청 (재전송한 batch 가 진행 중인 것과 겹침 등) 끼리 임시 파일을 공유하지 않는다
+    tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+    h = hashlib.sha256()
+    try:
+        with tmp.open("wb") as f:
+            for chunk in iter(lambda: src.read(_COPY_CHUNK), b""):
+                h.update(chunk)
+                f.write(chunk)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return h.hexdigest()
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_manifest(d: Path) -> List[Dict]:
+    """manifest 의 항목 (같은 file_name 은 마지막 것). 마지막 줄이 잘려 있으면 무시한다."""
+    entries: Dict[str, Dict] = {}
+    path = d / MANIFEST
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                e = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[e["file_name"]] = e
+    return list(entries.values())
+
+
+def append_entries(folder_id: str, d: Path, entries: List[Dict]) -> List[Dict]:
+    """
+    저장이 끝난 파일들을 manifest 에 추가. id 가 없는 항목은 폴더의 마지막 id 다음 번호를 받는다.
+    이미 있는 file_name 은 기존 항목을 그대로 돌려준다 (재개한 batch 가 같은 파일을 다시 보낸 경우).
+    """
+    with _lock(folder_id):
+        known = {e["file_name"]: e for e in read_manifest(d)}
+        next_id = max((int(e["id"]) for e in known.values()), default=0) + 1
+        out, lines = [], []
+        for e in entries:
+            if e["file_name"] in known:
+                out.append(known[e["file_name"]])
+                continue
+            if e.get("id") is None:
+                e = {**e, "id": next_id}
+            next_id = max(next_id, int(e["id"]) + 1)
+            known[e["file_name"]] = e
+            out.append(e)
+            lines.append(json.dumps(e) + "\n")
+        if lines:
+            with (d / MANIFEST).open("a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            invalidate_index(folder_id)
+        return out
+
+
+def commit_folder(folder_id: str, d: Path) -> List[Dict]:
+    """manifest 를 id 순 images.json 으로 정리하고 남은 임시 파일을 지운다."""
+    with _lock(folder_id):
+        images = sorted(read_manifest(d), key=lambda e: int(e["id"]))
+        tmp = d / f".{METADATA}.part"
+        with tmp.open("w") as f:
+            json.dump(images, f, indent=2)
+        os.replace(tmp, d / METADATA)
+        for p in d.glob(".*.part"):
+            p.unlink(missing_ok=True)
+        invalidate_index(folder_id)
+    return images
+
+
+def list_images(d: Path) -> List[Dict]:
+    """commit 된 폴더는 images.json, 업로드 중이면 manifest, 둘 다 없으면 디렉터리 scan."""
+    metadata_path = d / METADATA
+    if metadata_path.exists():
+        with metadata_path.open("r") as f:
+            return json.load(f)
+    if (d / MANIFEST).exists():
+        return sorted(read_manifest(d), key=lambda e: int(e["id"]))
+    images = []
+    for idx, img_path in enumerate(sorted(d.iterdir())):
+        if img_path.suffix.lower() in IMAGE_EXTENSIONS:
+            images.append({'id': idx + 1, 'file_name': img_path.name, 'path': str(img_path)})
+    return images
+
+
+# ---- 조회 인덱스 ------------------------------------------------------------------
+
+class ImageFile(NamedTuple):
+    path: Path
+    stat: os.stat_result
+    etag: str
+    last_modified: str
+
+
+class FolderIndex:
+    """
+    폴더 하나의 id -> path, file_name -> path (+ path -> sha256).
+    stat/ETag 는 처음 요청된 파일만 계산해 둔다.
+    """
+
+    def __init__(self, d: Path, images: List[Dict]):
+        self.dir = d
+        self.by_id = {str(e['id']): e['path'] for e in images}
+        self.by_name = {e['file_name']: e['path'] for e in images}
+        self.sha = {e['path']: e['sha256'] for e in images if e.get('sha256')}
+        self._files: Dict[str, Optional[ImageFile]] = {}
+
+    def path_of(self, key: str) -> Optional[str]:
+        return self.by_id.get(key) or self.by_name.get(key)
+
+    def lookup(self, key: str) -> Optional[ImageFile]:
+        """id 또는 file_name (메타데이터에 없으면 폴더 안의 같은 이름 파일). 없으면 None."""
+        try:
+            return self._files[key]
+        except KeyError:
+            pass
+        path = self.path_of(key)
+        f = image_file(Path(path)) if path else None
+        if f is None and not key.startswith(".") and key not in (MANIFEST, METADATA):
+            f = image_file(self.dir / key)
+        if f is not None:   # 없는 key 는 담지 않는다 (임의 key 요청으로 커지지 않게)
+            self._files[key] = f
+        return f
+
+    def file_sha(self, f: ImageFile) -> str:
+        """내용 sha256 (sha 없이 올라온 예전 폴더면 한 번 읽어 계산, 블로킹)."""
+        key = str(f.path)
+        sha = self.sha.get(key)
+        if sha is None:
+            sha = self.sha[key] = sha256_file(f.path)
+        return sha
+
+
+def image_file(path: Path) -> Optional[ImageFile]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if not path.is_file():
+        return None
+    # starlette FileResponse 와 같은 식 (헤더가 겹쳐도 값이 같다)
+    etag_base = f"{st.st_mtime}-{st.st_size}"
+    etag = f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+    return ImageFile(path, st, etag, formatdate(st.st_mtime, usegmt=True))
+
+
+_indexes: "OrderedDict[str, FolderIndex]" = OrderedDict()
+_indexes_guard = threading.Lock()
+# 폴더별 변경 횟수: 인덱스를 읽는 도중 업로드가 끼어들면 (오래된) 결과를 캐시에 넣지 않는다
+_generation: Dict[str, int] = {}
+
+
+def cached_index(folder_id: str) -> Optional[FolderIndex]:
+    with _indexes_guard:
+        idx = _indexes.get(folder_id)
+        if idx is not None:
+            _indexes.move_to_end(folder_id)
+        return idx
+
+
+def load_index(folder_id: str, d: Path) -> FolderIndex:
+    """메타데이터를 한 번 읽어 인덱스를 만들고 캐시한다 (블로킹, thread pool 에서)."""
+    with _indexes_guard:
+        gen = _generation.get(folder_id, 0)
+    idx = FolderIndex(d, list_images(d))
+    with _indexes_guard:
+        if _generation.get(folder_id, 0) != gen:
+            return idx
+        _indexes[folder_id] = idx
+        _indexes.move_to_end(folder_id)
+        while len(_indexes) > INDEX_MAX_FOLDERS:
+            _indexes.popitem(last=False)
+    return idx
+
+
+def invalidate_index(folder_id: str) -> None:
+    with _indexes_guard:
+        _generation[folder_id] = _generation.get(folder_id, 0) + 1
+        _indexes.pop(folder_id, None)
@@ -1,54 +1,282 @@
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Iterator, List, Dict, NamedTuple, Tuple, Optional
 import numpy as np
 from collections import defaultdict
 
+from app.services.coco_loader import CocoColumns
+from app.utils.iou import iou_matrix, iou_pairs
+
+# match_by_image 가 한 번에 IoU 를 계산하는 (pred, gt) 쌍 수 상한
+MATCH_MAX_PAIRS = 4_000_000
+# coco 매칭 결과에서 crowd GT 에 매칭된 pred (TP/FP 어느 쪽에도 세지 않는다)
+IGNORED = -2
+
+# COCO 평가 (pycocotools 와 같은 값): IoU .50:.05:.95, recall 101 점 보간
+COCO_IOU_THRS = np.linspace(.5, 0.95, int(np.round((0.95 - .5) / .05)) + 1, endpoint=True)
+COCO_REC_THRS = np.linspace(.0, 1.00, int(np.round((1.00 - .0) / .01)) + 1, endpoint=True)
+
 
 def calculate_iou(box1: List[float], box2: List[float]) -> float:
     """
     Calculate IoU between two bounding boxes.
     Box format: [xmin, ymin, width, height]
     """
-    x1_1, y1_1, w1, h1 = box1
-    x1_2, y1_2 = x1_1 + w1, y1_1 + h1
-    x2_1, y2_1, w2, h2 = box2
-    x2_2, y2_2 = x2_1 + w2, y2_1 + h2
-    
-    # Calculate intersection coordinates
-    xi_1 = max(x1_1, x2_1)
-    yi_1 = max(y1_1, y2_1)
-    xi_2 = min(x1_2, x2_2)
-    yi_2 = min(y1_2, y2_2)
-    
-    # Calculate intersection area
-    inter_width = max(0, xi_2 - xi_1)
-    inter_height = max(0, yi_2 - yi_1)
-    inter_area = inter_width * inter_height
-    
-    # Calculate each box area
-    area1 = w1 * h1
-    area2 = w2 * h2
-    
-    # Calculate union area
-    union_area = area1 + area2 - inter_area
-    
-    if union_area == 0:
-        return 0.0
-    
-    return inter_area / union_area
+    return float(iou_matrix([box1], [box2])[0, 0])
 
 
 def voc_ap(rec, prec):
     """Compute VOC AP given precision and recall."""
     rec = np.concatenate(([0.], rec, [1.]))
     prec = np.concatenate(([0.], prec, [0.]))
-    for i in range(prec.size - 1, 0, -1):
-        prec[i - 1] = np.maximum(prec[i - 1], prec[i])
+    prec = np.maximum.accumulate(prec[::-1])[::-1]   # 오른쪽부터 단조 감소 envelope
     i = np.where(rec[1:] != rec[:-1])[0]
     ap = np.sum((rec[i + 1] - rec[i]) * prec[i + 1])
     return ap
 
 
+class DetColumns(NamedTuple):
+    """COCO 박스 목록을 컬럼 배열로. image/cat 은 정수 코드 (같은 코드 표를 GT/Pred 가 공유)."""
+    image: np.ndarray   # int64
+    cat: np.ndarray     # int64
+    boxes: np.ndarray   # (N, 4) xywh
+    score: np.ndarray   # float64 (GT 는 1.0)
+    crowd: Optional[np.ndarray] = None   # GT 의 iscrowd (bool, coco 매칭에서만 쓴다). 없으면 모두 0
+
+
+def _code(value, table: Dict) -> int:
+    code = table.get(value)
+    if code is None:
+        code = table[value] = len(table)
+    return code
+
+
+def to_columns(anns: List[Dict], img_codes: Dict, cat_codes: Dict) -> DetColumns:
+    """image_id 가 없는 항목은 모두 같은 이미지(None)로 본다."""
+    n = len(anns)
+    return DetColumns(
+        np.fromiter((_code(a.get('image_id'), img_codes) for a in anns), dtype=np.int64, count=n),
+        np.fromiter((_code(a.get('category_id'), cat_codes) for a in anns), dtype=np.int64, count=n),
+        np.array([a['bbox'] for a in anns], dtype=np.float64).reshape(-1, 4),
+        np.fromiter((a.get('score', 0) for a in anns), dtype=np.float64, count=n),
+        np.fromiter((bool(a.get('iscrowd', 0)) for a in anns), dtype=bool, count=n),
+    )
+
+
+def _codes(gt_values: np.ndarray, pr_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    values, inv = np.unique(np.concatenate([gt_values, pr_values]), return_inverse=True)
+    inv = inv.astype(np.int64)
+    return inv[:gt_values.size], inv[gt_values.size:], dict(zip(values.tolist(), range(values.size)))
+
+
+def coco_det_columns(gt: CocoColumns, pr: CocoColumns) -> Tuple[DetColumns, DetColumns, Dict, Dict]:
+    """
+    CocoColumns (GT, 결과) -> 코드 표를 공유하는 DetColumns 쌍 + (img_codes, cat_codes).
+    to_columns 와 같은 역할이지만 annotation dict 를 거치지 않는다 (코드는 id 정렬 순).
+    """
+    g_img, p_img, img_codes = _codes(np.asarray(gt.image_id), np.asarray(pr.image_id))
+    g_cat, p_cat, cat_codes = _codes(np.asarray(gt.category_id), np.asarray(pr.category_id))
+    return (DetColumns(g_img, g_cat, np.asarray(gt.bbox), np.asarray(gt.score), np.asarray(gt.iscrowd).astype(bool)),
+            DetColumns(p_img, p_cat, np.asarray(pr.bbox), np.asarray(pr.score)),
+            img_codes, cat_codes)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """[starts[i], ends[i]) 구간들을 이어 붙인 인덱스 배열."""
+    lens = ends - starts
+    total = int(lens.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shift = np.repeat(starts - np.r_[0, np.cumsum(lens)[:-1]], lens)
+    return np.arange(total, dtype=np.int64) + shift
+
+
+def _group_pairs(gt: DetColumns, pr: DetColumns, max_pairs: int) -> Iterator[Tuple[np.ndarray, ...]]:
+    """
+    같은 (image, category) 의 모든 (pred, gt) 쌍과 IoU 를 pred 순으로 펼쳐 max_pairs 단위로 내보낸다.
+    yield (chunk, cnt, pi, gj, ov): chunk 의 pred 마다 그룹 GT 가 입력 순서로 cnt 개씩 이어진다.
+    """
+    if pr.boxes.shape[0] == 0 or gt.boxes.shape[0] == 0:
+        return
+    n_cat = int(max(gt.cat.max(), pr.cat.max())) + 1
+    g_key = gt.image * n_cat + gt.cat
+    p_key = pr.image * n_cat + pr.cat
+    g_ord = np.argsort(g_key, kind="stable")           # 그룹 안에서는 입력 순서 유지 (동점 처리)
+    g_sorted = g_key[g_ord]
+    g_start = np.searchsorted(g_sorted, p_key, side="left")
+    g_end = np.searchsorted(g_sorted, p_key, side="right")
+    cnt = g_end - g_start
+    cand = np.nonzero(cnt)[0]
+    # 쌍 수가 max_pairs 를 넘지 않도록 pred 를 나눠 처리
+    csum = np.cumsum(cnt[cand])
+    cuts = np.searchsorted(csum, np.arange(max_pairs, int(csum[-1]) if csum.size else 0, max_pairs), side="right")
+    for chunk in np.split(cand, cuts):
+        if chunk.size == 0:
+            continue
+        c_cnt = cnt[chunk]
+        pi = np.repeat(chunk, c_cnt)
+        gj = g_ord[_ranges(g_start[chunk], g_end[chunk])]
+        yield chunk, c_cnt, pi, gj, iou_pairs(pr.boxes[pi], gt.boxes[gj])
+
+
+def match_by_image(gt: DetColumns, pr: DetColumns, iou_threshold: float = 0.5,
+                   max_pairs: int = MATCH_MAX_PAIRS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (image, category) 그룹 안에서만 GT/Pred 를 매칭한다 (VOC greedy).
+
+    예측은 score 내림차순(동점이면 입력 순서)으로, 같은 그룹 GT 중 IoU 최대인 GT 를 고른다.
+    그 GT 가 아직 매칭되지 않았고 IoU >= iou_threshold 이면 TP, 아니면 FP.
+    모든 그룹의 IoU 행렬을 (pred, gt) 쌍 목록으로 펼쳐 max_pairs 단위로 한 번에 계산한다.
+
+    반환: (order, tp, gt_idx)
+      order : score 내림차순 pred 인덱스
+      tp    : order 순서의 TP 여부 (bool)
+      gt_idx: order 순서의 매칭된 GT 인덱스 (-1: FP)
+    """
+    P = pr.boxes.shape[0]
+    order = np.argsort(-pr.score, kind="stable")
+    best_gt = np.full(P, -1, dtype=np.int64)
+    best_iou = np.zeros(P)
+    for chunk, c_cnt, pi, gj, ov in _group_pairs(gt, pr, max_pairs):
+        seg = np.r_[0, np.cumsum(c_cnt)[:-1]]
+        vmax = np.maximum.reduceat(ov, seg)
+        # 최댓값을 갖는 첫 GT (np.argmax 와 같은 동점 처리)
+        local = np.arange(ov.size) - np.repeat(seg, c_cnt)
+        first = np.minimum.reduceat(np.where(ov == np.repeat(vmax, c_cnt), local, ov.size), seg)
+        hit = vmax > 0
+        best_iou[chunk] = vmax
+        best_gt[chunk[hit]] = gj[seg[hit] + first[hit]]
+
+    # score 순서로 처음 자기 GT 를 차지한 pred 만 TP (이후 같은 GT 를 고른 pred 는 FP)
+    j = best_gt[order]
+    ok = (j >= 0) & (best_iou[order] >= iou_threshold)
+    tp = np.zeros(P, dtype=bool)
+    cand = np.nonzero(ok)[0]
+    _, first = np.unique(j[cand], return_index=True)
+    tp[cand[first]] = True
+    gt_idx = np.where(tp, j, -1)
+    return order, tp, gt_idx
+
+
+def _crowd(gt: DetColumns) -> Optional[np.ndarray]:
+    return gt.crowd if gt.crowd is not None and gt.crowd.any() else None
+
+
+def match_coco_pairs(gt: DetColumns, pr: DetColumns, iou_thrs: np.ndarray = COCO_IOU_THRS,
+                     max_pairs: int = MATCH_MAX_PAIRS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """match_coco 가 쓰는 (pred, gt, IoU) 쌍 (crowd GT 는 inter / area(pred)). area range 별 평가와 나눠 쓴다."""
+    thrs = np.minimum(np.asarray(iou_thrs, dtype=np.float64), 1 - 1e-10)
+    return coco_pairs(gt, pr, float(thrs.min()), max_pairs, _crowd(gt))
+
+
+def match_coco(gt: DetColumns, pr: DetColumns, iou_thrs: np.ndarray = COCO_IOU_THRS,
+               max_pairs: int = MATCH_MAX_PAIRS,
+               pairs: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    (image, category) 그룹 안에서 모든 IoU threshold 에 대해 한 번에 COCO greedy 매칭.
+
+    예측은 score 내림차순으로, 아직 매칭되지 않은 GT 중 IoU >= t 이고 IoU 가 가장 큰 GT 를 가져간다
+    (동점이면 뒤쪽 GT, pycocotools 와 같음). IoU 는 쌍마다 한 번만 계산한다 (coco_greedy 참고).
+    crowd GT 는 무시 GT 로 후순위 매칭하고, 거기에 매칭된 pred 는 IGNORED.
+    pairs 를 주면 (match_coco_pairs 결과) IoU 를 다시 계산하지 않는다.
+
+    반환: (T, P) 매칭된 GT 인덱스 (-1: FP, IGNORED: crowd 에 매칭), pred 는 입력 순서.
+    """
+    thrs = np.minimum(np.asarray(iou_thrs, dtype=np.float64), 1 - 1e-10)
+    crowd = _crowd(gt)
+    if pairs is None:
+        pairs = match_coco_pairs(gt, pr, thrs, max_pairs)
+    matched = coco_greedy(pairs, score_rank(pr.score), thrs, pr.boxes.shape[0], gt.boxes.shape[0],
+                          None if crowd is None else crowd.astype(np.int8), crowd)
+    if crowd is not None:
+        matched[(matched >= 0) & crowd[np.maximum(matched, 0)]] = IGNORED
+    return matched
+
+
+def score_rank(score: np.ndarray) -> np.ndarray:
+    """pred 별 score 내림차순 순위 (동점이면 입력 순서)."""
+    rank = np.empty(score.size, dtype=np.int64)
+    rank[np.argsort(-score, kind="stable")] = np.arange(score.size)
+    return rank
+
+
+def coco_pairs(gt: DetColumns, pr: DetColumns, min_iou: float, max_pairs: int = MATCH_MAX_PAIRS,
+               crowd: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """IoU >= min_iou 인 같은 그룹 (pred, gt, IoU) 쌍. crowd (GT 별 bool) 가 있으면 crowd GT 는 inter / area(pred)."""
+    keep_p, keep_g, keep_ov = [], [], []
+    for _, _, pi, gj, ov in _group_pairs(gt, pr, max_pairs):
+        if crowd is not None:
+            c = crowd[gj]
+            if c.any():
+                ov[c] = iou_pairs(pr.boxes[pi[c]], gt.boxes[gj[c]], crowd=True)
+        ok = ov >= min_iou
+        keep_p.append(pi[ok]); keep_g.append(gj[ok]); keep_ov.append(ov[ok])
+    if not keep_p:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(keep_p), np.concatenate(keep_g), np.concatenate(keep_ov)
+
+
+def coco_greedy(pairs: Tuple[np.ndarray, np.ndarray, np.ndarray], rank: np.ndarray, thrs: np.ndarray,
+                P: int, G: int, gt_ignore: Optional[np.ndarray] = None,
+                crowd: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    coco_pairs 결과로 threshold 별 greedy 매칭을 한 번에 푼다. threshold 마다 (pred, gt) 를 별개의 노드로 보고
+    라운드 단위로 확정한다: 각 pred 는 남은 후보 중 1순위 GT 를 제안하고, 그 GT 를 후보로 가진 미확정 pred 중
+    가장 앞선 pred 의 제안이면 확정. 매 라운드 그룹마다 최소 하나는 확정되므로 순차 greedy 와 같은 결과.
+
+    gt_ignore 가 있으면 무시 GT 는 무시하지 않는 GT 가 하나도 남지 않았을 때만 고르고,
+    crowd GT 는 여러 pred 가 함께 매칭할 수 있다 (pycocotools evaluateImg 와 같음).
+    반환: (T, P) 매칭된 GT 인덱스 (-1: FP), pred 는 입력 순서.
+    """
+    T = thrs.size
+    matched = np.full((T, P), -1, dtype=np.int64)
+    pi, gj, ov = pairs
+    if ov.size == 0:
+        return matched
+
+    # threshold 별로 펼침: 노드 키 dkey = t*P + rank, gkey = t*G + g
+    n_t = (ov[:, None] >= thrs[None, :]).sum(axis=1)   # thrs 는 오름차순 -> 앞에서부터 n_t 개
+    t = _ranges(np.zeros_like(n_t), n_t)
+    src = np.repeat(np.arange(ov.size), n_t)
+    pd = t * P + rank[pi[src]]
+    pg = t * G + gj[src]
+    pov = ov[src]
+    # pred 별 선호 순서: (무시 GT 는 뒤로) IoU 내림차순, 동점이면 뒤쪽 GT
+    tier = np.zeros(pd.size, dtype=np.int8) if gt_ignore is None else gt_ignore[gj[src]]
+    srt = np.lexsort((-pg, -pov, tier, pd))
+    pd, pg = pd[srt], pg[srt]
+    shared = np.zeros(T * G, dtype=bool) if crowd is None else np.tile(crowd, T)
+
+    det_gt = np.full(T * P, -1, dtype=np.int64)   # dkey -> gkey
+    det_done = np.zeros(T * P, dtype=bool)
+    gt_used = np.zeros(T * G, dtype=bool)
+    earliest = np.empty(T * G, dtype=np.int64)
+    while pd.size:
+        # 각 미확정 pred 의 1순위 후보 (pd 는 정렬되어 있으므로 그룹의 첫 원소)
+        top = np.flatnonzero(np.r_[True, pd[1:] != pd[:-1]])
+        earliest[pg] = T * P
+        np.minimum.at(earliest, pg, pd)
+        acc = top[(earliest[pg[top]] == pd[top]) | shared[pg[top]]]
+        det_gt[pd[acc]] = pg[acc]
+        det_done[pd[acc]] = True
+        gt_used[pg[acc]] = ~shared[pg[acc]]
+        alive = ~(det_done[pd] | gt_used[pg])
+        pd, pg = pd[alive], pg[alive]
+
+    hit = np.flatnonzero(det_gt >= 0)
+    t, r = np.divmod(hit, P)
+    by_rank = np.argsort(rank)
+    matched[t, by_rank[r]] = det_gt[hit] - t * G
+    return matched
+
+
+def _pr_from_tp(tp: np.ndarray, nd: int):
+    tp_cumsum = np.cumsum(tp, dtype=np.float64)
+    fp_cumsum = np.cumsum(~tp, dtype=np.float64)
+    rec = tp_cumsum / (nd + 1e-10)
+    prec = tp_cumsum / (tp_cumsum + fp_cumsum + 1e-10)
+    return prec, rec
+
+
 def get_pr_arrays(gt_annotations: List[Dict], pred_annotations: List[Dict], 
                   category_id: Optional[int] = None, iou_threshold: float = 0.5):
     """
@@ -74,45 +302,212 @@ def get_pr_arrays(gt_annotations: List[Dict], pred_annotations: List[Dict],
         return None, None, 0
     if not preds:
         return np.array([0.]), np.array([0.]), len(gt)
-    if not gt:
-        tp = np.zeros(len(preds))
-        fp = np.ones(len(preds))
-        nd = 0
-    else:
-        # Sort predictions by score descending
-        preds = sorted(preds, key=lambda x: x.get('score', 0), reverse=True)
-        
-        nd = len(gt)
-        tp = np.zeros(len(preds))
-        fp = np.zeros(len(preds))
-        gt_matched = np.zeros(len(gt))
-        
-        for i, pred in enumerate(preds):
-            best_iou = 0.0
-            best_gt_idx = -1
-            pred_cat_id = pred.get('category_id')
-            
-            for j, gt_ann in enumerate(gt):
-                if gt_ann.get('category_id') == pred_cat_id:
-                    iou = calculate_iou(pred['bbox'], gt_ann['bbox'])
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_gt_idx = j
-            
-            if best_gt_idx != -1 and best_iou >= iou_threshold and not gt_matched[best_gt_idx]:
-                tp[i] = 1.
-                gt_matched[best_gt_idx] = 1
+
+    img_codes: Dict = {}
+    cat_codes: Dict = {}
+    _, tp, _ = match_by_image(to_columns(gt, img_codes, cat_codes),
+                              to_columns(preds, img_codes, cat_codes), iou_threshold)
+    return (*_pr_from_tp(tp, len(gt)), len(gt))
+
+
+def _image_rank(img_codes: Dict) -> np.ndarray:
+    """image 코드 -> image id 정렬 순위 (pycocotools 는 정렬된 imgIds 순으로 누적). 정렬 불가면 등장 순서."""
+    keys = list(img_codes)
+    try:
+        return np.argsort(np.argsort(np.array(keys, dtype=object), kind="stable"), kind="stable")
+    except TypeError:
+        return np.arange(len(keys))
+
+
+def _coco_precision(tp_sum: np.ndarray, npig: int, fp_sum: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    (T, nd) 누적 TP -> (T, 101) 보간 precision (pycocotools accumulate 와 같음).
+    fp_sum 을 안 주면 TP 가 아닌 pred 는 모두 FP (무시 pred 가 있으면 따로 누적해 넘긴다).
+    """
+    q = np.zeros((tp_sum.shape[0], COCO_REC_THRS.size))
+    nd = tp_sum.shape[1]
+    if nd == 0:
+        return q
+    if fp_sum is None:
+        fp_sum = np.arange(1, nd + 1, dtype=np.float64) - tp_sum
+    rc = tp_sum / npig
+    prec = tp_sum / (fp_sum + tp_sum + np.spacing(1))
+    prec = np.maximum.accumulate(prec[:, ::-1], axis=1)[:, ::-1]
+    for k in range(tp_sum.shape[0]):
+        inds = np.searchsorted(rc[k], COCO_REC_THRS, side='left')
+        ok = inds < nd
+        q[k, ok] = prec[k, inds[ok]]
+    return q
+
+
+class CategoryPR(NamedTuple):
+    score: np.ndarray   # 누적 순서의 score (내림차순)
+    tp: np.ndarray      # (T, nd) 누적 TP 수 (int32)
+    num_gt: int
+    fp: Optional[np.ndarray] = None   # (T, nd) 누적 FP 수. None 이면 TP 가 아닌 pred 는 모두 FP
+
+
+def category_pr(score: np.ndarray, matched: np.ndarray, num_gt: int) -> CategoryPR:
+    """누적 순서로 고른 pred 의 score / (T, nd) 매칭 결과로 CategoryPR (IGNORED pred 가 있을 때만 fp 를 따로 둔다)."""
+    fp = None
+    if (matched == IGNORED).any():
+        fp = np.cumsum(matched == -1, axis=1, dtype=np.int32)
+    return CategoryPR(score, np.cumsum(matched >= 0, axis=1, dtype=np.int32), num_gt, fp)
+
+
+class PRTable:
+    """
+    category/IoU threshold 별로 score 순 누적 TP 를 들고 있는 표.
+
+    greedy 매칭에서 각 pred 의 결과는 자기보다 score 가 높은 pred 에만 의존하므로,
+    confidence threshold 를 올리는 것은 목록의 꼬리를 자르는 것과 같다.
+    evaluate(conf) 는 다시 매칭하지 않고 이진 탐색 + slice 로 calculate_map(_coco) 와 같은 결과를 낸다.
+    """
+
+    def __init__(self, mode: str, iou_thrs: np.ndarray, categories: Dict, per_cat: Dict):
+        self.mode = mode
+        self.iou_thrs = np.asarray(iou_thrs, dtype=np.float64)
+        self.categories = categories
+        self.per_cat: Dict[object, CategoryPR] = per_cat
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.score.nbytes + c.tp.nbytes + (0 if c.fp is None else c.fp.nbytes) for c in self.per_cat.values())
+
+    @staticmethod
+    def _cut(c: CategoryPR, conf: float) -> int:
+        return int(np.searchsorted(-c.score, -conf, side='right'))   # score >= conf 인 pred 수
+
+    def evaluate(self, confidence_threshold: float = 0.0, curves_as_arrays: bool = False) -> Tuple[float, Dict]:
+        """curves_as_arrays 면 pr_curves 의 배열을 list 로 바꾸지 않는다 (map_curves 로 줄여서 보낼 때)."""
+        out = (lambda arr: arr) if curves_as_arrays else (lambda arr: arr.tolist())
+        if self.mode == "coco":
+            return self._evaluate_coco(confidence_threshold, out)
+        return self._evaluate_voc(confidence_threshold, out)
+
+    def _evaluate_voc(self, conf: float, out) -> Tuple[float, Dict]:
+        aps = {}
+        pr_curves = {}
+        for category_id, c in self.per_cat.items():
+            n = self._cut(c, conf)
+            if n == 0 and c.num_gt == 0:
+                continue   # GT 도 pred 도 없는 category
+            if n == 0:
+                prec, rec = np.array([0.]), np.array([0.])
             else:
-                fp[i] = 1.
-    
-    # Calculate precision and recall
-    tp_cumsum = np.cumsum(tp)
-    fp_cumsum = np.cumsum(fp)
-    
-    rec = tp_cumsum / (nd + 1e-10)
-    prec = tp_cumsum / (tp_cumsum + fp_cumsum + 1e-10)
-    
-    return prec, rec, nd
+                tp_cumsum = c.tp[0, :n].astype(np.float64)
+                fp_cumsum = np.arange(1, n + 1, dtype=np.float64) - tp_cumsum
+                rec = tp_cumsum / (c.num_gt + 1e-10)
+                prec = tp_cumsum / (tp_cumsum + fp_cumsum + 1e-10)
+            aps[category_id] = voc_ap(rec, prec)
+            pr_curves[category_id] = {
+                'precision': out(prec),
+                'recall': out(rec),
+                'num_gt': c.num_gt
+            }
+
+        mean_ap = np.mean(list(aps.values())) if aps else 0.0
+        return mean_ap, {
+            'APs': aps,
+            'categories': list(self.categories.keys()),
+            'pr_curves': pr_curves
+        }
+
+    def _evaluate_coco(self, conf: float, out) -> Tuple[float, Dict]:
+        iou_thrs = self.iou_thrs
+        aps, aps_by_iou, pr_curves = {}, {}, {}
+        for category_id, c in self.per_cat.items():
+            if c.num_gt == 0:
+                continue   # GT 가 없는 category 는 COCO 에서도 제외
+            n = self._cut(c, conf)
+            q = _coco_precision(c.tp[:, :n].astype(np.float64), c.num_gt,
+                                None if c.fp is None else c.fp[:, :n].astype(np.float64))
+            per_iou = q.mean(axis=1)
+            aps[category_id] = float(per_iou.mean())
+            aps_by_iou[category_id] = per_iou.tolist()
+            pr_curves[category_id] = {
+                'recall': out(COCO_REC_THRS),
+                'precision': out(q[0]),
+                'precision_by_iou': {f"{t:.2f}": out(row) for t, row in zip(iou_thrs, q)},
+                'num_gt': c.num_gt
+            }
+
+        def _at(thr):
+            k = np.flatnonzero(np.isclose(iou_thrs, thr))
+            if not aps or k.size == 0:
+                return None
+            return float(np.mean([v[k[0]] for v in aps_by_iou.values()]))
+
+        mean_ap = float(np.mean(list(aps.values()))) if aps else 0.0
+        return mean_ap, {
+            'AP': mean_ap,
+            'AP50': _at(0.5),
+            'AP75': _at(0.75),
+            'APs': aps,
+            'APs_by_iou': aps_by_iou,
+            'iou_thresholds': iou_thrs.tolist(),
+            'categories': list(self.categories.keys()),
+            'pr_curves': pr_curves
+        }
+
+
+def match_columns(gt: DetColumns, pr: DetColumns, mode: str = "voc", iou_thrs: np.ndarray = COCO_IOU_THRS,
+                  pairs: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    """
+    (T, P) 매칭된 GT 인덱스 (-1: FP, IGNORED: crowd 에 매칭, pred 는 입력 순서).
+    mode="voc": iou_thrs[0] 하나로 VOC greedy (iscrowd 무시) / "coco": 전체로 COCO greedy (pairs 는 coco 만).
+    매칭은 (image, category) 그룹 안에서만 일어나므로 category 로 나눈 부분집합에 따로 돌려도 결과가 같다.
+    """
+    if mode == "coco":
+        return match_coco(gt, pr, iou_thrs, pairs=pairs)
+    order, _, gt_idx = match_by_image(gt, pr, float(iou_thrs[0]))
+    matched = np.empty((1, pr.score.size), dtype=np.int64)
+    matched[0, order] = gt_idx
+    return matched
+
+
+def table_from_matches(gt: DetColumns, pr: DetColumns, matched: np.ndarray, img_codes: Dict, cat_codes: Dict,
+                       categories: Dict, mode: str, iou_thrs: np.ndarray) -> PRTable:
+    """match_columns 결과를 category 별 score 순 누적 TP 로 정리한다 (coco 의 crowd GT 는 GT 수에서 뺀다)."""
+    idx = np.arange(pr.score.size)
+    if mode == "coco":
+        # 누적 순서: score 내림차순, 동점이면 image id 순, 같은 이미지 안에서는 입력 순서
+        order = np.lexsort((idx, _image_rank(img_codes)[pr.image], -pr.score, pr.cat))
+    else:
+        order = np.lexsort((idx, -pr.score, pr.cat))
+    real = gt.cat if mode != "coco" or gt.crowd is None else gt.cat[~gt.crowd]
+    n_gt = np.bincount(real, minlength=len(cat_codes))
+    bounds = np.searchsorted(pr.cat[order], np.arange(len(cat_codes) + 1))
+
+    per_cat = {}
+    for category_id in categories:
+        code = cat_codes.get(category_id)
+        if code is None:
+            continue   # GT 도 pred 도 없는 category
+        sel = order[bounds[code]:bounds[code + 1]]
+        per_cat[category_id] = category_pr(pr.score[sel], matched[:, sel], int(n_gt[code]))
+    return PRTable(mode, iou_thrs, categories, per_cat)
+
+
+def table_thresholds(mode: str, iou_threshold: float, iou_thrs: np.ndarray = COCO_IOU_THRS) -> np.ndarray:
+    if mode == "coco":
+        return np.asarray(iou_thrs, dtype=np.float64)
+    return np.array([iou_threshold], dtype=np.float64)
+
+
+def build_pr_table(gt_annotations: List[Dict], pred_annotations: List[Dict], categories: Dict,
+                   mode: str = "voc", iou_threshold: float = 0.5,
+                   iou_thrs: np.ndarray = COCO_IOU_THRS) -> PRTable:
+    """
+    전체 pred 를 한 번 매칭해 PRTable 을 만든다 (confidence 필터는 evaluate 에서).
+    mode="voc": iou_threshold 하나, VOC greedy / mode="coco": iou_thrs 전체, COCO greedy.
+    """
+    img_codes: Dict = {}
+    cat_codes: Dict = {}
+    gt = to_columns(gt_annotations, img_codes, cat_codes)
+    pr = to_columns(pred_annotations, img_codes, cat_codes)
+    thrs = table_thresholds(mode, iou_threshold, iou_thrs)
+    return table_from_matches(gt, pr, match_columns(gt, pr, mode, thrs), img_codes, cat_codes, categories, mode, thrs)
 
 
 def calculate_map(gt_annotations: List[Dict], pred_annotations: List[Dict], 
@@ -134,41 +529,34 @@ def calculate_map(gt_annotations: List[Dict], pred_annotations: List[Dict],
     # Filter predictions by confidence threshold
     pred_annotations = [p for p in pred_annotations if p.get('score', 0) >= confidence_threshold]
     
-    aps = {}
-    pr_curves = {}
-    
     if not categories:
         print("Warning: No categories provided")
         return 0.0, {}
-    
-    for category_id, category_info in categories.items():
-        gt_cat = [ann for ann in gt_annotations if ann.get('category_id') == category_id]
-        preds_cat = [pred for pred in pred_annotations if pred.get('category_id') == category_id]
-        
-        if not gt_cat and not preds_cat:
-            continue
-        
-        prec, rec, nd = get_pr_arrays(gt_cat, preds_cat, category_id, iou_threshold)
-        
-        if prec is None or rec is None:
-            ap = 0.0
-        else:
-            ap = voc_ap(rec, prec)
-        
-        aps[category_id] = ap
-        pr_curves[category_id] = {
-            'precision': prec.tolist() if prec is not None else [],
-            'recall': rec.tolist() if rec is not None else [],
-            'num_gt': nd
-        }
-    
-    mean_ap = np.mean(list(aps.values())) if aps else 0.0
-    
-    return mean_ap, {
-        'APs': aps, 
-        'categories': list(categories.keys()),
-        'pr_curves': pr_curves
-    }
+
+    # 전체 데이터를 한 번만 컬럼으로 바꾸고 (image, category) 단위로 한 번에 매칭
+    table = build_pr_table(gt_annotations, pred_annotations, categories, "voc", iou_threshold)
+    return table.evaluate(confidence_threshold)
+
+
+def calculate_map_coco(gt_annotations: List[Dict], pred_annotations: List[Dict],
+                       categories: Dict, confidence_threshold: float = 0.0,
+                       iou_thrs: np.ndarray = COCO_IOU_THRS) -> Tuple[float, Dict]:
+    """
+    COCO 방식 mAP@[.50:.95] (101 점 보간 AP, pycocotools 의 bbox 평가와 같은 값).
+
+    IoU 는 (image, category) 쌍마다 한 번만 계산하고 10개 threshold 매칭을 한 번에 한다.
+    GT 가 없는 category 는 평균에서 제외.
+
+    Returns:
+        Tuple of (AP@[.5:.95], dict with AP50/AP75/AP, per-class APs and 101-point PR curves)
+    """
+    pred_annotations = [p for p in pred_annotations if p.get('score', 0) >= confidence_threshold]
+    if not categories:
+        print("Warning: No categories provided")
+        return 0.0, {}
+
+    table = build_pr_table(gt_annotations, pred_annotations, categories, "coco", iou_thrs=iou_thrs)
+    return table.evaluate(confidence_threshold)
 
 
 def evaluate_map(gt_boxes: List[Dict], pred_boxes: List[Dict], iou_thr: float = 0.5):
@@ -183,8 +571,10 @@ def evaluate_map(gt_boxes: List[Dict], pred_boxes: List[Dict], iou_thr: float =
     
     # Convert to category_id format
     cat_to_id = {cat: idx for idx, cat in enumerate(categories)}
-    gt_with_id = [{'category_id': cat_to_id[g['category']], 'bbox': g['bbox']} for g in gt_boxes]
-    pred_with_id = [{'category_id': cat_to_id[p['category']], 'bbox': p['bbox'], 'score': p['score']} for p in pred_boxes]
+    gt_with_id = [{'image_id': g.get('image_id'), 'category_id': cat_to_id[g['category']], 'bbox': g['bbox']}
+                  for g in gt_boxes]
+    pred_with_id = [{'image_id': p.get('image_id'), 'category_id': cat_to_id[p['category']], 'bbox': p['bbox'],
+                     'score': p['score']} for p in pred_boxes]
     
     mAP, detail = calculate_map(gt_with_id, pred_with_id, {cat_to_id[cat]: {'name': cat} for cat in categories}, iou_thr)
     
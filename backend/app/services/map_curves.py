@@ -0,0 +1,80 @@
+# backend/app/services/map_curves.py
+"""
+/map/calculate 의 pr_curves 줄이기.
+
+VOC 곡선은 category 마다 pred 수만큼 점이 있어 pred 가 많으면 JSON 이 수 MB 가 된다.
+  curve="grid"  : recall grid (points 개) 위의 보간 precision (오른쪽 최대값, COCO 101 점과 같은 방식).
+                  크기는 category 수 x points 로 고정.
+  curve="rle"   : recall 이나 precision 이 그대로인 구간(plateau)의 안쪽 점을 버리고 양 끝만 남긴다.
+                  남긴 점의 원래 위치는 index 로 준다. 구간은 축에 평행한 선분이라 그린 곡선과 AP 는 그대로다.
+  encoding="f32": 배열을 little-endian float32 (index 는 int32) 바이트의 base64 문자열로.
+"""
+import base64
+from typing import Dict
+
+import numpy as np
+
+def grid_precision(recall: np.ndarray, precision: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """recall 이 grid[j] 이상이 되는 첫 점부터의 최대 precision (없으면 0)."""
+    out = np.zeros(grid.size)
+    if recall.size == 0:
+        return out
+    env = np.maximum.accumulate(precision[::-1])[::-1]
+    # VOC recall 은 tp / (num_gt + 1e-10) 이라 1.0 에 못 미친다 -> 그만큼의 오차는 같은 recall 로 본다
+    idx = np.searchsorted(recall, grid - 1e-9, side='left')
+    ok = idx < recall.size
+    out[ok] = env[idx[ok]]
+    return out
+
+
+def _flat(a: np.ndarray) -> np.ndarray:
+    return (a[1:-1] == a[:-2]) & (a[1:-1] == a[2:])
+
+
+def plateau_keep(recall: np.ndarray, *precisions: np.ndarray) -> np.ndarray:
+    """
+    남길 점의 index. recall 이 양 옆과 같거나, 모든 precision 곡선에서 precision 이 양 옆과 같은
+    (plateau 안쪽) 점은 뺀다. 양 끝은 항상 남긴다.
+    """
+    n = recall.size
+    if n <= 2:
+        return np.arange(n)
+    inner = np.ones(n - 2, dtype=bool)
+    for p in precisions:
+        inner &= _flat(p)
+    inner |= _flat(recall)
+    return np.flatnonzero(np.r_[True, ~inner, True])
+
+
+def _encode(arr: np.ndarray, encoding: str, dtype=np.float32):
+    if encoding == "f32":
+        return base64.b64encode(np.ascontiguousarray(arr, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()).decode()
+    return arr.tolist()
+
+
+def compact_curve(curve: Dict, kind: str = "full", points: int = 101, encoding: str = "json") -> Dict:
+    """pr_curves 의 category 항목 하나 (precision/recall[/precision_by_iou], num_gt) 를 줄인다."""
+    rec = np.asarray(curve['recall'], dtype=np.float64)
+    prec = np.asarray(curve['precision'], dtype=np.float64)
+    by_iou = {k: np.asarray(v, dtype=np.float64) for k, v in curve.get('precision_by_iou', {}).items()}
+    res = {'num_gt': curve.get('num_gt')}
+    if kind == "grid":
+        grid = np.linspace(0.0, 1.0, points)
+        prec = grid_precision(rec, prec, grid)
+        by_iou = {k: grid_precision(rec, v, grid) for k, v in by_iou.items()}
+        rec = grid
+    elif kind == "rle":
+        # precision_by_iou 의 행들도 같은 점을 남겨야 하므로 모두 함께 본다
+        keep = plateau_keep(rec, prec, *by_iou.values())
+        res['index'] = _encode(keep, encoding, np.int32)
+        rec, prec = rec[keep], prec[keep]
+        by_iou = {k: v[keep] for k, v in by_iou.items()}
+    res['recall'] = _encode(rec, encoding)
+    res['precision'] = _encode(prec, encoding)
+    if by_iou:
+        res['precision_by_iou'] = {k: _encode(v, encoding) for k, v in by_iou.items()}
+    return res
+
+
+def compact_pr_curves(pr_curves: Dict, kind: str = "full", points: int = 101, encoding: str = "json") -> Dict:
+    return {c: compact_curve(curve, kind, points, encoding) for c, curve in pr_curves.items()}
@@ -0,0 +1,162 @@
+# backend/app/services/map_errors.py
+"""
+검출 오류 분석 (TIDE 방식 오류 유형 + class confusion matrix).
+
+이미지마다 class 를 무시한 (pred, GT) IoU 쌍을 한 번만 계산하고 (coco_pairs),
+  - class 를 맞춘 쌍만으로 greedy 매칭 -> TP / FP
+  - class 를 무시한 greedy 매칭 -> confusion matrix
+  - pred 별 같은 class / 다른 class GT 와의 최대 IoU -> FP 오류 유형
+를 모두 같은 쌍 목록에서 구한다. 매칭은 score 순 greedy 라 confidence threshold 는 evaluate 의 마스크다.
+
+FP 유형 (TIDE 순서, t_f = iou, t_b = BG_IOU):
+  bkg : 모든 GT 와 IoU < t_b
+  cls : 다른 class GT 와 IoU >= t_f
+  dupe: 같은 class GT 와 IoU >= t_f (그 GT 는 더 높은 score pred 가 이미 매칭)
+  loc : 같은 class GT 와 t_b <= IoU < t_f
+  both: 다른 class GT 와 t_b <= IoU < t_f
+FN (매칭되지 않은 GT) 은 그 GT 를 가리키는 cls/loc/both FP 가 있으면 그 유형 (score 가 가장 높은 FP 기준),
+없으면 missed. crowd GT 는 평가하지 않고, crowd 영역(IoA >= t_f)에 떨어진 FP 는 세지 않는다.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.coco_loader import CocoColumns
+from app.services.map import coco_det_columns, coco_greedy, coco_pairs, score_rank
+
+BG_IOU = 0.1
+FP_TYPES = ("cls", "loc", "both", "dupe", "bkg")
+FN_TYPES = ("cls", "loc", "both", "missed")
+
+# pred 별 오류 코드 (FP_TYPES 인덱스, TP 와 무시 pred 는 -1)
+_CLS, _LOC, _BOTH, _DUPE, _BKG = range(len(FP_TYPES))
+
+
+def _best(pi: np.ndarray, gj: np.ndarray, ov: np.ndarray, P: int) -> Tuple[np.ndarray, np.ndarray]:
+    """pred 별 최대 IoU 와 그 GT (동점이면 앞쪽 GT). 쌍이 없으면 0 / -1."""
+    best_ov = np.zeros(P)
+    best_g = np.full(P, -1, dtype=np.int64)
+    if pi.size:
+        srt = np.lexsort((gj, -ov, pi))
+        first = srt[np.r_[True, pi[srt][1:] != pi[srt][:-1]]]
+        best_ov[pi[first]] = ov[first]
+        best_g[pi[first]] = gj[first]
+    return best_ov, best_g
+
+
+class ErrorTable:
+    """pred/GT 별 분석 결과. evaluate(conf) 는 다시 매칭하지 않고 집계만 한다."""
+
+    def __init__(self, iou: float, categories: Dict, arrays: Dict[str, np.ndarray]):
+        self.iou = iou
+        self.categories = categories
+        self.a = arrays
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self.a.values())
+
+    def _labels(self) -> List:
+        seen = np.unique(np.concatenate([self.a["p_cat"], self.a["g_cat"]])).tolist()
+        return list(self.categories) + [c for c in seen if c not in self.categories]
+
+    def evaluate(self, confidence_threshold: float = 0.0) -> Dict:
+        a = self.a
+        keep = a["score"] >= confidence_threshold
+        labels = self._labels()
+        K = len(labels)
+        lab = np.asarray(labels, dtype=np.int64)
+        srt = np.argsort(lab)
+        p_code = srt[np.searchsorted(lab[srt], a["p_cat"])]
+        g_code = srt[np.searchsorted(lab[srt], a["g_cat"])]
+        real = a["g_real"]
+
+        # FP 유형 (pred class 기준)
+        err = np.where(keep, a["error"], -1)
+        fp_by_cat = np.zeros((K, len(FP_TYPES)), dtype=np.int64)
+        ok = err >= 0
+        np.add.at(fp_by_cat, (p_code[ok], err[ok]), 1)
+        tp = keep & a["tp"]
+        tp_by_cat = np.bincount(p_code[tp], minlength=K)
+
+        # FN 유형 (GT class 기준): 가리키는 cls/loc/both FP 중 score 가 가장 높은 것
+        fn = real & (a["g_tp_score"] < confidence_threshold)
+        fn_type = np.full(fn.size, FN_TYPES.index("missed"), dtype=np.int64)
+        cover = np.flatnonzero(ok & (err <= _BOTH))
+        cover = cover[np.argsort(-a["score"][cover], kind="stable")]
+        tgt, first = np.unique(a["target"][cover], return_index=True)
+        fn_type[tgt] = err[cover[first]]   # _CLS/_LOC/_BOTH 는 FN_TYPES 에서도 같은 인덱스
+        fn_by_cat = np.zeros((K, len(FN_TYPES)), dtype=np.int64)
+        np.add.at(fn_by_cat, (g_code[fn], fn_type[fn]), 1)
+
+        # confusion matrix: 행 GT class, 열 pred class, 마지막 행/열은 background
+        conf_m = np.zeros((K + 1, K + 1), dtype=np.int64)
+        hit = keep & (a["agn_gt"] >= 0)
+        pk = tp | (keep & (a["error"] >= 0))   # crowd 영역에 떨어진 미매칭 pred 는 background 로 세지 않는다
+        np.add.at(conf_m, (g_code[a["agn_gt"][hit]], p_code[hit]), 1)
+        np.add.at(conf_m, (np.full(int((pk & ~hit).sum()), K), p_code[pk & ~hit]), 1)
+        miss = real & (a["g_agn_score"] < confidence_threshold)
+        np.add.at(conf_m, (g_code[miss], np.full(int(miss.sum()), K)), 1)
+
+        def name(c):
+            return self.categories.get(c, {}).get('name', f'class_{c}')
+
+        per_category = {}
+        for i, c in enumerate(labels):
+            row = {"tp": int(tp_by_cat[i]), "fp": {t: int(v) for t, v in zip(FP_TYPES, fp_by_cat[i])},
+                   "fn": {t: int(v) for t, v in zip(FN_TYPES, fn_by_cat[i])}}
+            if row["tp"] or any(row["fp"].values()) or any(row["fn"].values()):
+                per_category[name(c)] = row
+        return {
+            "iou": self.iou,
+            "bg_iou": BG_IOU,
+            "tp": int(tp.sum()),
+            "fp": {t: int(v) for t, v in zip(FP_TYPES, fp_by_cat.sum(axis=0))},
+            "fn": {t: int(v) for t, v in zip(FN_TYPES, fn_by_cat.sum(axis=0))},
+            "per_category": per_category,
+            "confusion": {"labels": [name(c) for c in labels] + ["background"], "matrix": conf_m.tolist()},
+        }
+
+
+def build_error_table(gt_cols: CocoColumns, pr_cols: CocoColumns, iou: float = 0.5) -> ErrorTable:
+    """GT/결과 CocoColumns 에서 ErrorTable (IoU 는 이미지별로 한 번만)."""
+    gt, pr, _, _ = coco_det_columns(gt_cols, pr_cols)
+    P, G = pr.score.size, gt.score.size
+    crowd = np.asarray(gt_cols.iscrowd).astype(bool)
+    thr = np.array([min(float(iou), 1 - 1e-10)])
+    # class 를 무시하고 이미지 단위로 묶은 쌍 (IoU >= BG_IOU 만 의미가 있다)
+    agn = lambda cols: cols._replace(cat=np.zeros_like(cols.cat))
+    pi, gj, ov = coco_pairs(agn(gt), agn(pr), BG_IOU, crowd=crowd)
+    same = gt.cat[gj] == pr.cat[pi]
+    real = ~crowd[gj]
+    rank = score_rank(pr.score)
+
+    s = same & real
+    tp_gt = coco_greedy((pi[s], gj[s], ov[s]), rank, thr, P, G)[0]
+    agn_gt = coco_greedy((pi[real], gj[real], ov[real]), rank, thr, P, G)[0]
+    s_ov, s_g = _best(pi[s], gj[s], ov[s], P)
+    d = ~same & real
+    d_ov, d_g = _best(pi[d], gj[d], ov[d], P)
+    c = same & ~real
+    crowd_ov, _ = _best(pi[c], gj[c], ov[c], P)
+
+    tp = tp_gt >= 0
+    fp = ~tp & (crowd_ov < thr[0])
+    error = np.select(
+        [~fp, np.maximum(s_ov, d_ov) < BG_IOU, d_ov >= thr[0], s_ov >= thr[0], s_ov >= BG_IOU],
+        [-1, _BKG, _CLS, _DUPE, _LOC], default=_BOTH).astype(np.int8)
+    target = np.select([(error == _CLS) | (error == _BOTH), (error == _DUPE) | (error == _LOC)], [d_g, s_g], -1)
+
+    def gt_score(m):
+        out = np.full(G, -np.inf)
+        hit = np.flatnonzero(m >= 0)
+        out[m[hit]] = pr.score[hit]
+        return out
+
+    return ErrorTable(float(iou), gt_cols.categories, {
+        "score": np.asarray(pr.score, dtype=np.float64),
+        "p_cat": np.asarray(pr_cols.category_id), "g_cat": np.asarray(gt_cols.category_id),
+        "g_real": ~crowd,
+        "tp": tp, "error": error, "target": target.astype(np.int64),
+        "agn_gt": agn_gt, "g_tp_score": gt_score(tp_gt), "g_agn_score": gt_score(agn_gt),
+    })
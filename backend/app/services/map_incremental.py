@@ -0,0 +1,163 @@
+# backend/app/services/map_incremental.py
+"""
+annotation PATCH 뒤 mAP 캐시(PRTable/MatchTable)의 부분 갱신.
+
+1. diff_columns: 예전/새 CocoColumns 를 (image, category) 그룹 단위로 비교 (그룹 안 행 순서까지).
+   바뀐 그룹 목록과, 그대로인 그룹의 예전 행 -> 새 행 대응(row_map)을 만든다.
+2. update_tables: 어느 쪽(GT/Pred)에서든 바뀐 그룹만 다시 매칭하고, 나머지 pred 의 매칭 결과는
+   row_map 으로 옮긴다 (매칭은 그룹 안에서만 일어나므로 결과가 전체 재평가와 같다).
+   PRTable 은 바뀐 그룹이 있는 category 의 누적 표만 새로 만들고 나머지는 그대로 재사용한다.
+"""
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from app.services.coco_loader import CocoColumns, take_rows
+from app.services.map import IGNORED, CategoryPR, PRTable, _ranges, category_pr, coco_det_columns, match_columns
+from app.services.map_matches import MatchTable
+from app.utils.iou import iou_pairs
+
+
+class ColumnDiff(NamedTuple):
+    dirty: np.ndarray     # (K, 2) 바뀐 (image_id, category_id) 그룹
+    row_map: np.ndarray   # 예전 행 -> 새 행 (-1: 바뀐 그룹에 속하거나 삭제)
+
+    @property
+    def unchanged(self) -> bool:
+        return self.dirty.shape[0] == 0 and bool(np.all(self.row_map == np.arange(self.row_map.size)))
+
+
+def identity_diff(cols: CocoColumns) -> ColumnDiff:
+    return ColumnDiff(np.empty((0, 2), dtype=np.int64), np.arange(cols.image_id.size))
+
+
+def _group_keys(old: CocoColumns, new: CocoColumns):
+    """두 컬럼의 (image, category) 를 공통 int64 키로, 그리고 키 목록."""
+    img = np.concatenate([old.image_id, new.image_id])
+    cat = np.concatenate([old.category_id, new.category_id])
+    img_ids, ic = np.unique(img, return_inverse=True)
+    cat_ids, cc = np.unique(cat, return_inverse=True)
+    key = ic.reshape(-1).astype(np.int64) * cat_ids.size + cc.reshape(-1)
+    return key, img_ids, cat_ids
+
+
+def diff_columns(old: CocoColumns, new: CocoColumns) -> ColumnDiff:
+    """행 수가 같고 (id, bbox, score, area, iscrowd) 가 순서대로 같은 그룹만 '그대로'로 본다."""
+    key, img_ids, cat_ids = _group_keys(old, new)
+    n_old = old.image_id.size
+    groups, inv = np.unique(key, return_inverse=True)
+    inv = inv.reshape(-1)
+    K = groups.size
+    o_ord = np.argsort(inv[:n_old], kind="stable")   # 그룹 안에서는 파일 순서
+    n_ord = np.argsort(inv[n_old:], kind="stable")
+    cnt_o = np.bincount(inv[:n_old], minlength=K)
+    cnt_n = np.bincount(inv[n_old:], minlength=K)
+    bad = cnt_o != cnt_n
+
+    same = np.flatnonzero(~bad & (cnt_o > 0))
+    cnt = cnt_o[same]
+    start_o = np.r_[0, np.cumsum(cnt_o)[:-1]][same]
+    start_n = np.r_[0, np.cumsum(cnt_n)[:-1]][same]
+    ro = o_ord[_ranges(start_o, start_o + cnt)]
+    rn = n_ord[_ranges(start_n, start_n + cnt)]
+    neq = np.zeros(ro.size, dtype=bool)
+    for name in ("ann_id", "score", "area", "iscrowd"):
+        neq |= np.asarray(getattr(old, name))[ro] != np.asarray(getattr(new, name))[rn]
+    neq |= np.any(np.asarray(old.bbox)[ro] != np.asarray(new.bbox)[rn], axis=1)
+    grp = np.repeat(same, cnt)
+    bad[grp[neq]] = True
+
+    row_map = np.full(n_old, -1, dtype=np.int64)
+    keep = ~bad[grp]
+    row_map[ro[keep]] = rn[keep]
+    dirty = groups[bad]
+    return ColumnDiff(np.stack([img_ids[dirty // cat_ids.size], cat_ids[dirty % cat_ids.size]], axis=1), row_map)
+
+
+def _pair_codes(cols_list, dirty: np.ndarray):
+    """각 컬럼의 (image, category) 와 dirty 그룹을 같은 int64 키로."""
+    imgs = [np.asarray(c.image_id) for c in cols_list]
+    cats = [np.asarray(c.category_id) for c in cols_list]
+    img_ids = np.unique(np.concatenate(imgs + [dirty[:, 0]]))
+    cat_ids = np.unique(np.concatenate(cats + [dirty[:, 1]]))
+    def key(img, cat):
+        return np.searchsorted(img_ids, img) * cat_ids.size + np.searchsorted(cat_ids, cat)
+    return [key(i, c) for i, c in zip(imgs, cats)], key(dirty[:, 0], dirty[:, 1])
+
+
+def _inverse(row_map: np.ndarray, n_new: int) -> np.ndarray:
+    inv = np.full(n_new, -1, dtype=np.int64)
+    ok = row_map >= 0
+    inv[row_map[ok]] = np.flatnonzero(ok)
+    return inv
+
+
+def _category_pr(m: MatchTable, new_pr: CocoColumns, matched: np.ndarray, mode: str, i: int,
+                 n_gt: int) -> CategoryPR:
+    a = m.a
+    sel = np.asarray(a["p_cat_rows"][a["p_cat_off"][i]:a["p_cat_off"][i + 1]])   # score 내림차순, 동점은 행 순
+    if mode == "coco" and sel.size:
+        # pycocotools 누적 순서: 동점이면 image id 순, 같은 이미지 안에서는 입력 순서
+        score = a["pr_score"][sel]
+        sel = sel[np.lexsort((sel, np.asarray(new_pr.image_id)[sel], -score))]
+    return category_pr(np.asarray(a["pr_score"][sel]), matched[:, sel], n_gt)
+
+
+def update_tables(table: PRTable, matches: MatchTable, new_gt: CocoColumns, new_pr: CocoColumns,
+                  gt_diff: ColumnDiff, pr_diff: ColumnDiff) -> Tuple[PRTable, MatchTable]:
+    """예전 (table, matches) 에 GT/Pred diff 를 반영한 새 표. 새 표는 전체 재평가 결과와 같다."""
+    mode = matches.mode
+    thrs = np.asarray(matches.a["thrs"])
+    T, P = thrs.size, new_pr.image_id.size
+    dirty = np.unique(np.concatenate([gt_diff.dirty, pr_diff.dirty]).reshape(-1, 2), axis=0)
+    (g_key, p_key), d_key = _pair_codes([new_gt, new_pr], dirty)
+    dirty_g = np.isin(g_key, d_key)
+    dirty_p = np.isin(p_key, d_key)
+
+    # 그대로인 그룹: 예전 매칭 결과를 새 행 번호로 옮긴다
+    p_old = _inverse(pr_diff.row_map, P)
+    dirty_p |= p_old < 0
+    clean = np.flatnonzero(~dirty_p)
+    matched = np.full((T, P), -1, dtype=np.int64)
+    iou = np.zeros((T, P), dtype=np.float32)
+    old_m = np.asarray(matches.a["matched"][:, p_old[clean]], dtype=np.int64)
+    matched[:, clean] = np.where(old_m >= 0, gt_diff.row_map[np.maximum(old_m, 0)], old_m)
+    iou[:, clean] = matches.a["iou"][:, p_old[clean]]
+
+    # 바뀐 그룹만 다시 매칭
+    p_rows = np.flatnonzero(dirty_p)
+    g_rows = np.flatnonzero(dirty_g)
+    if p_rows.size:
+        sub_gt, sub_pr = take_rows(new_gt, g_rows), take_rows(new_pr, p_rows)
+        sg, sp, _, _ = coco_det_columns(sub_gt, sub_pr)
+        m = match_columns(sg, sp, mode, thrs) if g_rows.size else np.full((T, p_rows.size), -1)
+        for k in range(T):
+            hit = np.flatnonzero(m[k] >= 0)
+            matched[k, p_rows[hit]] = g_rows[m[k, hit]]
+            matched[k, p_rows[m[k] == IGNORED]] = IGNORED
+            iou[k, p_rows[hit]] = iou_pairs(sp.boxes[hit], sg.boxes[m[k, hit]])
+
+    new_m = MatchTable.from_matches(new_gt, new_pr, matched, iou, thrs, mode, prev=matches,
+                                    keep_pred=pr_diff.unchanged, keep_gt=gt_diff.unchanged)
+
+    # PRTable: 바뀐 그룹이 있거나 category 안 pred 순서가 바뀐 category 만 새로 만든다
+    dirty_cats = set(dirty[:, 1].tolist())
+    if clean.size:
+        cats = np.asarray(new_pr.category_id)[clean]
+        o = np.lexsort((clean, cats))
+        moved = (np.diff(p_old[clean][o]) < 0) & (cats[o][1:] == cats[o][:-1])
+        dirty_cats.update(cats[o][1:][moved].tolist())
+    a = new_m.a
+    cat_pos = {v: i for i, v in enumerate(a["cat_ids"].tolist())}
+    per_cat = {}
+    for category_id in new_gt.categories:
+        i = cat_pos.get(category_id)
+        if i is None:
+            continue   # GT 도 pred 도 없는 category
+        prev = table.per_cat.get(category_id)
+        if prev is not None and category_id not in dirty_cats:
+            per_cat[category_id] = prev
+        else:
+            n_gt = int(a["g_cat_off"][i + 1] - a["g_cat_off"][i])
+            per_cat[category_id] = _category_pr(new_m, new_pr, matched, mode, i, n_gt)
+    return PRTable(mode, thrs, new_gt.categories, per_cat), new_m
@@ -0,0 +1,163 @@
+# backend/app/services/map_matches.py
+"""
+mAP 매칭 결과 표: pred 마다 (image, category, 매칭된 GT, IoU) 와 image/category 인덱스.
+
+confidence 를 올리면 목록 꼬리만 잘리므로 (greedy 매칭은 score 가 더 높은 pred 에만 의존)
+표 하나로 모든 conf 에 답한다:
+  pred : score >= conf 이고 matched >= 0 이면 TP, -1 이면 FP (coco 에서 crowd GT 에 매칭된 IGNORED 는 어느 쪽도 아님)
+  GT   : 자기를 매칭한 pred 의 score(gt_score) < conf 이면 FN (coco 의 crowd GT 는 인덱스에 넣지 않는다)
+image/category 별 행 목록은 offset 배열로 두고, id -> 위치는 첫 조회 때 dict 로 만들어 상수 시간에 찾는다.
+행 번호는 CocoColumns 의 행 (box/id 는 그쪽에서 꺼낸다).
+"""
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.coco_loader import CocoColumns
+from app.services.map import DetColumns
+from app.utils.iou import iou_pairs
+
+MATCH_ARRAYS = (
+    "thrs",                                                  # (T,) IoU threshold
+    "pr_score",                                              # (P,)
+    "matched",                                               # (T, P) int32 GT 행 (-1: FP, -2: IGNORED)
+    "iou",                                                   # (T, P) float32 매칭 IoU (FP 는 0)
+    "gt_score",                                              # (T, G) 매칭한 pred 의 score (-inf: 미매칭)
+    "img_ids", "p_img_rows", "p_img_off", "g_img_rows", "g_img_off",
+    "cat_ids", "p_cat_rows", "p_cat_off", "g_cat_rows", "g_cat_off",
+)
+# 저장 형식 버전 (다르면 load 가 실패하고 호출 측이 다시 매칭한다). 2: coco crowd GT 를 IGNORED 로
+MATCH_FORMAT = 2
+
+
+def _index(keys: np.ndarray, ids: np.ndarray, *tie_breaks: np.ndarray, rows: Optional[np.ndarray] = None,
+           keep: Optional[np.ndarray] = None):
+    """
+    keys(id) 별로 묶은 행 순서와 offset. 묶음 안에서는 tie_breaks (lexsort 의 앞쪽 키) 순.
+    rows 를 주면 (행 내용이 그대로인 쪽) 정렬은 건너뛰고 offset 만 ids 기준으로 다시 계산한다.
+    keep (bool) 을 주면 그 행만 넣는다.
+    """
+    code = np.searchsorted(ids, keys)
+    if rows is None:
+        rows = np.lexsort((np.arange(keys.size), *tie_breaks, code))
+        if keep is not None:
+            rows = rows[keep[rows]]
+    off = np.searchsorted(code[rows], np.arange(ids.size + 1))
+    return rows, off
+
+
+class MatchTable:
+    def __init__(self, mode: str, arrays: Dict[str, np.ndarray]):
+        self.mode = mode
+        self.a = arrays
+        self._img_pos: Optional[Dict[int, int]] = None
+        self._cat_pos: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def build(cls, gt_cols: CocoColumns, pr_cols: CocoColumns, gt: DetColumns, pr: DetColumns,
+              matched: np.ndarray, thrs: np.ndarray, mode: str) -> "MatchTable":
+        """gt/pr 은 gt_cols/pr_cols 와 같은 행 순서의 DetColumns, matched 는 match_columns 결과."""
+        T, P = matched.shape[0], pr.score.size
+        iou = np.zeros((T, P), dtype=np.float32)
+        for k in range(T):
+            d = np.flatnonzero(matched[k] >= 0)
+            iou[k, d] = iou_pairs(pr.boxes[d], gt.boxes[matched[k, d]])
+        return cls.from_matches(gt_cols, pr_cols, matched, iou, thrs, mode)
+
+    @classmethod
+    def from_matches(cls, gt_cols: CocoColumns, pr_cols: CocoColumns, matched: np.ndarray, iou: np.ndarray,
+                     thrs: np.ndarray, mode: str, prev: Optional["MatchTable"] = None,
+                     keep_pred: bool = False, keep_gt: bool = False) -> "MatchTable":
+        """
+        매칭 결과 + IoU 로 표를 만든다. keep_pred/keep_gt 면 그쪽 행이 prev 와 같다고 보고
+        (PATCH 로 다른 쪽만 바뀐 경우) prev 의 정렬 순서를 재사용한다.
+        """
+        score = np.asarray(pr_cols.score, dtype=np.float64)
+        gt_score = np.full((matched.shape[0], gt_cols.image_id.size), -np.inf)
+        for k in range(matched.shape[0]):
+            d = np.flatnonzero(matched[k] >= 0)
+            gt_score[k, matched[k, d]] = score[d]
+
+        g_img, p_img = np.asarray(gt_cols.image_id), np.asarray(pr_cols.image_id)
+        g_cat, p_cat = np.asarray(gt_cols.category_id), np.asarray(pr_cols.category_id)
+        img_ids = np.unique(np.concatenate([g_img, p_img]))
+        cat_ids = np.unique(np.concatenate([g_cat, p_cat]))
+        pa = prev.a if prev is not None and keep_pred else {}
+        ga = prev.a if prev is not None and keep_gt else {}
+        # pred 는 score 내림차순, GT 는 (category 인덱스에서는 image 순) 입력 순서
+        p_img_rows, p_img_off = _index(p_img, img_ids, -score, rows=pa.get("p_img_rows"))
+        p_cat_rows, p_cat_off = _index(p_cat, cat_ids, -score, rows=pa.get("p_cat_rows"))
+        # coco 의 crowd GT 는 FN 도 GT 수도 아니다
+        keep = ~np.asarray(gt_cols.iscrowd).astype(bool) if mode == "coco" else None
+        g_img_rows, g_img_off = _index(g_img, img_ids, rows=ga.get("g_img_rows"), keep=keep)
+        g_cat_rows, g_cat_off = _index(g_cat, cat_ids, g_img, rows=ga.get("g_cat_rows"), keep=keep)
+        return cls(mode, {
+            "thrs": np.asarray(thrs, dtype=np.float64), "pr_score": score,
+            "matched": matched.astype(np.int32), "iou": np.asarray(iou, dtype=np.float32), "gt_score": gt_score,
+            "img_ids": img_ids, "p_img_rows": p_img_rows, "p_img_off": p_img_off,
+            "g_img_rows": g_img_rows, "g_img_off": g_img_off,
+            "cat_ids": cat_ids, "p_cat_rows": p_cat_rows, "p_cat_off": p_cat_off,
+            "g_cat_rows": g_cat_rows, "g_cat_off": g_cat_off,
+        })
+
+    # ---- 저장 ----
+    def save(self, dst: Path) -> None:
+        dst.mkdir(parents=True, exist_ok=True)
+        for name in MATCH_ARRAYS:
+            np.save(dst / f"{name}.npy", np.ascontiguousarray(self.a[name]))
+        with open(dst / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "format": MATCH_FORMAT}, f)
+
+    @classmethod
+    def load(cls, src: Path) -> "MatchTable":
+        with open(src / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != MATCH_FORMAT:
+            raise ValueError(f"match table format {meta.get('format')} != {MATCH_FORMAT}")
+        return cls(meta["mode"], {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in MATCH_ARRAYS})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self.a.values())
+
+    # ---- 조회 ----
+    def threshold_index(self, iou: float) -> int:
+        """가장 가까운 IoU threshold 의 행 (voc 는 항상 0)."""
+        return int(np.argmin(np.abs(np.asarray(self.a["thrs"]) - iou)))
+
+    def _split(self, p_rows: np.ndarray, g_rows: np.ndarray, conf: float, k: int) -> Dict[str, np.ndarray]:
+        a = self.a
+        p_rows = p_rows[a["pr_score"][p_rows] >= conf]
+        m = np.asarray(a["matched"][k, p_rows])
+        hit = m >= 0
+        return {
+            "tp": p_rows[hit],
+            "tp_gt": m[hit].astype(np.int64),
+            "tp_iou": np.asarray(a["iou"][k, p_rows[hit]]),
+            "fp": p_rows[m == -1],
+            "fn": g_rows[a["gt_score"][k, g_rows] < conf],
+        }
+
+    def image_rows(self, image_id: int, conf: float, k: int) -> Optional[Dict[str, np.ndarray]]:
+        """image 의 TP/FP(pred 행, score 순)/FN(GT 행). box 가 하나도 없는 image 면 None."""
+        if self._img_pos is None:
+            self._img_pos = {v: i for i, v in enumerate(self.a["img_ids"].tolist())}
+        i = self._img_pos.get(image_id)
+        if i is None:
+            return None
+        a = self.a
+        return self._split(np.asarray(a["p_img_rows"][a["p_img_off"][i]:a["p_img_off"][i + 1]]),
+                           np.asarray(a["g_img_rows"][a["g_img_off"][i]:a["g_img_off"][i + 1]]), conf, k)
+
+    def category_rows(self, category_id: int, conf: float, k: int) -> Optional[Dict[str, np.ndarray]]:
+        """category 의 TP/FP(pred 행, score 순)/FN(GT 행, image 순)."""
+        if self._cat_pos is None:
+            self._cat_pos = {v: i for i, v in enumerate(self.a["cat_ids"].tolist())}
+        i = self._cat_pos.get(category_id)
+        if i is None:
+            return None
+        a = self.a
+        return self._split(np.asarray(a["p_cat_rows"][a["p_cat_off"][i]:a["p_cat_off"][i + 1]]),
+                           np.asarray(a["g_cat_rows"][a["g_cat_off"][i]:a["g_cat_off"][i + 1]]), conf, k)
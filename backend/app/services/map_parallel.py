@@ -0,0 +1,187 @@
+# backend/app/services/map_parallel.py
+"""
+category 분할 병렬 mAP 매칭 (LVIS 처럼 category 가 많은 데이터용).
+
+매칭은 (image, category) 그룹 안에서만 일어나므로, GT/Pred 컬럼을 category 순으로 한 번 정렬해
+연속 구간(shard)으로 나누고 shard 마다 worker 프로세스에서 match_columns 를 돌린다.
+입력 컬럼과 결과(매칭된 GT 인덱스) 배열은 SharedMemory 한 블록에 두고 worker 는 이름으로 붙어 view 만 만든다
+(pickle 복사 없음). 각 shard 는 자기 구간만 쓰므로 결과는 실행 순서와 무관하게 단일 프로세스와 같다.
+coco 모드에서 (pred, gt, IoU) 쌍을 미리 계산해 두었으면 (match_coco_pairs) 그 쌍도 category 순으로 나눠 넘긴다.
+"""
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.coco_loader import CocoColumns
+from app.services.map import (
+    COCO_IOU_THRS, DetColumns, PRTable, coco_det_columns, match_columns, table_from_matches, table_thresholds,
+    to_columns,
+)
+
+Pairs = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# worker 당 shard 수 (category 별 비용 편차를 흡수)
+SHARDS_PER_WORKER = 4
+_ALIGN = 64
+
+
+class SharedLayout(NamedTuple):
+    name: str
+    arrays: Dict[str, Tuple[int, Tuple[int, ...], str]]   # key -> (offset, shape, dtype)
+
+
+def default_workers() -> int:
+    return settings.MAP_WORKERS or os.cpu_count() or 1
+
+
+def _share(arrays: Dict[str, np.ndarray]) -> Tuple[SharedMemory, SharedLayout]:
+    """배열들을 SharedMemory 한 블록에 복사한다 (호출 측에서 close/unlink)."""
+    layout, off = {}, 0
+    for key, arr in arrays.items():
+        layout[key] = (off, arr.shape, arr.dtype.str)
+        off += -(-arr.nbytes // _ALIGN) * _ALIGN
+    shm = SharedMemory(create=True, size=max(off, 1))
+    for key, arr in arrays.items():
+        _view(shm, layout[key])[...] = arr
+    return shm, SharedLayout(shm.name, layout)
+
+
+def _view(shm: SharedMemory, spec: Tuple[int, Tuple[int, ...], str]) -> np.ndarray:
+    off, shape, dtype = spec
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=off)
+
+
+def _match_shard(layout: SharedLayout, mode: str, thrs: np.ndarray, g0: int, g1: int, p0: int, p1: int,
+                 q0: int = 0, q1: int = 0) -> int:
+    """
+    worker: 공유 컬럼의 [g0:g1) GT / [p0:p1) Pred 구간을 매칭해 공유 결과 배열에 쓴다 (GT 인덱스는 공유 순서 기준).
+    공유 쌍 목록이 있으면 그 [q0:q1) 구간을 쓴다.
+    """
+    shm = SharedMemory(name=layout.name)
+    try:
+        a = {k: _view(shm, spec) for k, spec in layout.arrays.items()}
+        gt = DetColumns(a["g_image"][g0:g1], a["g_cat"][g0:g1], a["g_boxes"][g0:g1], a["g_score"][g0:g1],
+                        a["g_crowd"][g0:g1])
+        pr = DetColumns(a["p_image"][p0:p1], a["p_cat"][p0:p1], a["p_boxes"][p0:p1], a["p_score"][p0:p1])
+        pairs = None
+        if "pi" in a:
+            pairs = (a["pi"][q0:q1] - p0, a["gj"][q0:q1] - g0, a["ov"][q0:q1])
+        m = match_columns(gt, pr, mode, thrs, pairs)
+        a["matched"][:, p0:p1] = np.where(m >= 0, m + g0, m)
+        del a, gt, pr, pairs   # buffer 를 참조하는 view 를 모두 놓아야 close 할 수 있다
+    finally:
+        shm.close()
+    return p1 - p0
+
+
+def _shards(p_bounds: np.ndarray, n_shards: int) -> List[Tuple[int, int]]:
+    """pred 수가 비슷하도록 category 경계에서 자른 [c0, c1) 구간들."""
+    n_cat = p_bounds.size - 1
+    targets = np.linspace(0, p_bounds[-1], n_shards + 1)[1:-1]
+    cuts = np.unique(np.r_[0, np.searchsorted(p_bounds, targets, side="left"), n_cat])
+    return [(int(c0), int(c1)) for c0, c1 in zip(cuts[:-1], cuts[1:]) if c1 > c0]
+
+
+def match_columns_parallel(gt: DetColumns, pr: DetColumns, mode: str, thrs: np.ndarray,
+                           workers: int, pairs: Optional[Pairs] = None) -> np.ndarray:
+    """match_columns 와 같은 (T, P) 매칭 결과를 category shard 별로 process pool 에서 계산."""
+    n_cat = int(max(gt.cat.max(initial=-1), pr.cat.max(initial=-1))) + 1
+    g_ord = np.argsort(gt.cat, kind="stable")   # 그룹 안 입력 순서 유지 (동점 처리가 같도록)
+    p_ord = np.argsort(pr.cat, kind="stable")
+    g_bounds = np.searchsorted(gt.cat[g_ord], np.arange(n_cat + 1))
+    p_bounds = np.searchsorted(pr.cat[p_ord], np.arange(n_cat + 1))
+    shards = _shards(p_bounds, workers * SHARDS_PER_WORKER)
+    crowd = np.zeros(gt.score.size, dtype=bool) if gt.crowd is None else gt.crowd
+
+    arrays = {
+        "g_image": gt.image[g_ord], "g_cat": gt.cat[g_ord], "g_boxes": gt.boxes[g_ord], "g_score": gt.score[g_ord],
+        "g_crowd": crowd[g_ord],
+        "p_image": pr.image[p_ord], "p_cat": pr.cat[p_ord], "p_boxes": pr.boxes[p_ord], "p_score": pr.score[p_ord],
+        "matched": np.full((thrs.size, pr.score.size), -1, dtype=np.int64),
+    }
+    q_bounds = np.zeros(n_cat + 1, dtype=np.int64)
+    if pairs is not None:
+        # 쌍을 정렬된 행 번호로 옮기고 pred 순으로 세운다 (같은 그룹 쌍은 같은 category shard 에 들어간다)
+        pi, gj, ov = pairs
+        p_pos = np.empty_like(p_ord)
+        p_pos[p_ord] = np.arange(p_ord.size)
+        g_pos = np.empty_like(g_ord)
+        g_pos[g_ord] = np.arange(g_ord.size)
+        q = np.argsort(p_pos[pi], kind="stable")
+        arrays.update(pi=p_pos[pi][q], gj=g_pos[gj][q], ov=ov[q])
+        q_bounds = np.searchsorted(arrays["pi"], p_bounds)
+    shm, layout = _share(arrays)
+    del arrays
+    try:
+        # 서버 프로세스는 스레드를 쓰므로 fork 대신 spawn 으로 worker 를 띄운다
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=mp.get_context("spawn")) as pool:
+            futures = [pool.submit(_match_shard, layout, mode, thrs,
+                                   int(g_bounds[c0]), int(g_bounds[c1]), int(p_bounds[c0]), int(p_bounds[c1]),
+                                   int(q_bounds[c0]), int(q_bounds[c1]))
+                       for c0, c1 in shards]
+            for fut in futures:
+                fut.result()
+        m_sorted = _view(shm, layout.arrays["matched"])
+        matched = np.empty_like(m_sorted)
+        matched[:, p_ord] = np.where(m_sorted >= 0, g_ord[np.maximum(m_sorted, 0)], m_sorted)
+        del m_sorted
+    finally:
+        shm.close()
+        shm.unlink()
+    return matched
+
+
+def match_auto(gt: DetColumns, pr: DetColumns, mode: str, thrs: np.ndarray,
+               workers: Optional[int] = None, min_preds: Optional[int] = None,
+               pairs: Optional[Pairs] = None) -> np.ndarray:
+    """
+    match_columns. pred 가 min_preds 이상이고 worker 가 2개 이상이면 category 별로 병렬 매칭.
+    pairs (coco 모드의 match_coco_pairs 결과) 를 주면 IoU 를 다시 계산하지 않는다.
+    """
+    n_cat = int(max(gt.cat.max(initial=-1), pr.cat.max(initial=-1))) + 1
+    workers = max(1, min(workers or default_workers(), n_cat))
+    min_preds = settings.MAP_PARALLEL_MIN_PREDS if min_preds is None else min_preds
+    if workers > 1 and pr.score.size >= min_preds and gt.score.size:
+        return match_columns_parallel(gt, pr, mode, thrs, workers, pairs)
+    return match_columns(gt, pr, mode, thrs, pairs)
+
+
+def build_pr_table_parallel(gt_annotations: List[Dict], pred_annotations: List[Dict], categories: Dict,
+                            mode: str = "voc", iou_threshold: float = 0.5,
+                            iou_thrs: np.ndarray = COCO_IOU_THRS,
+                            workers: Optional[int] = None,
+                            min_preds: Optional[int] = None) -> PRTable:
+    """
+    build_pr_table 과 같은 결과. pred 가 min_preds 이상이고 worker 가 2개 이상이면 category 별로 병렬 매칭.
+    annotation 은 한 번만 훑어 컬럼으로 바꾸고 category 분할은 정렬 한 번으로 한다.
+    """
+    img_codes: Dict = {}
+    cat_codes: Dict = {}
+    gt = to_columns(gt_annotations, img_codes, cat_codes)
+    pr = to_columns(pred_annotations, img_codes, cat_codes)
+    return build_pr_table_columns(gt, pr, img_codes, cat_codes, categories, mode, iou_threshold,
+                                  iou_thrs, workers, min_preds)
+
+
+def build_pr_table_coco(gt: CocoColumns, pr: CocoColumns, mode: str = "voc", iou_threshold: float = 0.5,
+                        iou_thrs: np.ndarray = COCO_IOU_THRS, workers: Optional[int] = None,
+                        min_preds: Optional[int] = None) -> PRTable:
+    """CocoColumns (스트리밍 로더 / mmap 캐시) 에서 바로 PRTable. category 표는 GT 파일 것을 쓴다."""
+    g, p, img_codes, cat_codes = coco_det_columns(gt, pr)
+    return build_pr_table_columns(g, p, img_codes, cat_codes, gt.categories, mode, iou_threshold,
+                                  iou_thrs, workers, min_preds)
+
+
+def build_pr_table_columns(gt: DetColumns, pr: DetColumns, img_codes: Dict, cat_codes: Dict, categories: Dict,
+                           mode: str = "voc", iou_threshold: float = 0.5,
+                           iou_thrs: np.ndarray = COCO_IOU_THRS,
+                           workers: Optional[int] = None,
+                           min_preds: Optional[int] = None) -> PRTable:
+    thrs = table_thresholds(mode, iou_threshold, iou_thrs)
+    matched = match_auto(gt, pr, mode, thrs, workers, min_preds)
+    return table_from_matches(gt, pr, matched, img_codes, cat_codes, categories, mode, thrs)
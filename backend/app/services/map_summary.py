@@ -0,0 +1,146 @@
+# backend/app/services/map_summary.py
+"""
+pycocotools COCOeval.summarize() 의 12개 지표:
+AP, AP50, AP75, AP_small/medium/large (maxDets=100), AR_1/10/100 (area all), AR_small/medium/large (maxDets=100).
+
+따로 평가를 12번 돌리지 않고 한 번 계산한 매칭 결과 위의 마스크로 구한다.
+  - IoU 쌍은 한 번만 계산한다 (crowd GT 는 inter / area(pred)). PRTable 을 만들 때 계산한 쌍
+    (match_coco_pairs) 과 매칭 결과를 넘기면 그대로 쓴다: area "all" 은 PRTable 의 coco 매칭과 같다.
+  - 나머지 area range: GT 무시 여부(crowd 또는 범위 밖)만 바꿔 같은 쌍 목록으로 coco_greedy 를 다시 푼다.
+    pycocotools 는 무시 GT 를 후순위로 매칭하므로 range 마다 매칭이 달라질 수 있다.
+    범위 밖이면서 매칭되지 않은 pred 와 무시 GT 에 매칭된 pred 는 TP/FP 어느 쪽에도 세지 않는다.
+  - maxDets: (image, category) 안 score 순위 마스크. greedy 결과는 자기보다 score 가 높은 pred 에만
+    의존하므로 상위 k 개만 매칭한 결과와 같다.
+  - confidence: PRTable 과 같이 누적 순서의 꼬리 자르기.
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.coco_loader import CocoColumns
+from app.services.map import (
+    COCO_IOU_THRS, IGNORED as MATCH_IGNORED, MATCH_MAX_PAIRS, _coco_precision, _image_rank, coco_det_columns, coco_greedy,
+    match_coco_pairs, score_rank,
+)
+
+AREA_RANGES = {"all": (0.0, 1e10), "small": (0.0, 32.0 ** 2), "medium": (32.0 ** 2, 96.0 ** 2), "large": (96.0 ** 2, 1e10)}
+MAX_DETS = (1, 10, 100)
+
+# pred 상태 (area range, IoU threshold 별)
+FP, TP, IGNORED = 0, 1, 2
+
+
+class CategorySummary(NamedTuple):
+    score: np.ndarray    # 누적 순서의 score (내림차순)
+    rank: np.ndarray     # (image, category) 안 score 순위 (int32)
+    status: np.ndarray   # (A, T, nd) int8: FP / TP / IGNORED
+    num_gt: np.ndarray   # (A,) 무시하지 않는 GT 수
+
+
+class SummaryTable:
+    """category 별 pred 상태 표. evaluate(conf) 는 다시 매칭하지 않고 마스크 + 누적합만 한다."""
+
+    def __init__(self, iou_thrs: np.ndarray, per_cat: Dict[object, CategorySummary]):
+        self.iou_thrs = np.asarray(iou_thrs, dtype=np.float64)
+        self.per_cat = per_cat
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.score.nbytes + c.rank.nbytes + c.status.nbytes for c in self.per_cat.values())
+
+    def evaluate(self, confidence_threshold: float = 0.0) -> Dict[str, Optional[float]]:
+        areas = list(AREA_RANGES)
+        k50 = np.flatnonzero(np.isclose(self.iou_thrs, 0.5))
+        k75 = np.flatnonzero(np.isclose(self.iou_thrs, 0.75))
+        prec = {a: [] for a in areas}                           # category 별 (T, 101), maxDets=100
+        rec = {(a, m): [] for a in areas for m in MAX_DETS}     # category 별 (T,)
+        for c in self.per_cat.values():
+            n = int(np.searchsorted(-c.score, -confidence_threshold, side='right'))
+            st, rank = c.status[:, :, :n], c.rank[:n]
+            for i, a in enumerate(areas):
+                npig = int(c.num_gt[i])
+                if npig == 0:
+                    continue   # pycocotools 와 같이 평균에서 제외 (-1)
+                for m in MAX_DETS:
+                    if a == "all" or m == MAX_DETS[-1]:
+                        rec[(a, m)].append(((st[i] == TP) & (rank < m)).sum(axis=1) / npig)
+                keep = rank < MAX_DETS[-1]
+                tp_sum = np.cumsum((st[i] == TP) & keep, axis=1, dtype=np.float64)
+                fp_sum = np.cumsum((st[i] == FP) & keep, axis=1, dtype=np.float64)
+                prec[a].append(_coco_precision(tp_sum, npig, fp_sum))
+
+        def _mean(rows, k=None):
+            if not rows or (k is not None and k.size == 0):
+                return None
+            arr = np.stack(rows)
+            return float(arr.mean() if k is None else arr[:, k[0]].mean())
+
+        top = MAX_DETS[-1]
+        return {
+            "AP": _mean(prec["all"]),
+            "AP50": _mean(prec["all"], k50),
+            "AP75": _mean(prec["all"], k75),
+            "AP_small": _mean(prec["small"]),
+            "AP_medium": _mean(prec["medium"]),
+            "AP_large": _mean(prec["large"]),
+            **{f"AR_{m}": _mean(rec[("all", m)]) for m in MAX_DETS},
+            "AR_small": _mean(rec[("small", top)]),
+            "AR_medium": _mean(rec[("medium", top)]),
+            "AR_large": _mean(rec[("large", top)]),
+        }
+
+
+def build_summary_table(gt_cols: CocoColumns, pr_cols: CocoColumns, iou_thrs: np.ndarray = COCO_IOU_THRS,
+                        max_pairs: int = MATCH_MAX_PAIRS,
+                        pairs: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                        matched: Optional[np.ndarray] = None) -> SummaryTable:
+    """
+    GT/결과 CocoColumns 에서 SummaryTable. GT 파일에 images 가 있으면 그 밖의 이미지 pred 는 평가하지 않는다.
+    pairs (match_coco_pairs) / matched (같은 iou_thrs 의 coco 모드 match_columns 결과) 를 주면 다시 계산하지 않는다.
+    """
+    gt, pr, img_codes, cat_codes = coco_det_columns(gt_cols, pr_cols)
+    thrs = np.minimum(np.asarray(iou_thrs, dtype=np.float64), 1 - 1e-10)
+    T, P, G = thrs.size, pr.score.size, gt.score.size
+    crowd = gt.crowd
+    g_area = np.asarray(gt_cols.area, dtype=np.float64)
+    p_area = pr.boxes[:, 2] * pr.boxes[:, 3]
+    rank = score_rank(pr.score)
+    if pairs is None:
+        pairs = match_coco_pairs(gt, pr, thrs, max_pairs)
+
+    status = np.empty((len(AREA_RANGES), T, P), dtype=np.int8)
+    num_gt = np.zeros((len(AREA_RANGES), len(cat_codes)), dtype=np.int64)
+    for i, (lo, hi) in enumerate(AREA_RANGES.values()):
+        g_ig = crowd | (g_area < lo) | (g_area > hi)
+        p_out = (p_area < lo) | (p_area > hi)
+        if matched is not None and np.array_equal(g_ig, crowd):
+            # 무시 GT 가 crowd 뿐인 range (보통 "all") 는 PRTable 의 매칭과 같다
+            status[i] = np.where(matched >= 0, TP, np.where((matched == MATCH_IGNORED) | p_out, IGNORED, FP))
+        else:
+            m = coco_greedy(pairs, rank, thrs, P, G, g_ig.astype(np.int8) if g_ig.any() else None,
+                            crowd if crowd.any() else None)
+            status[i] = np.where(m >= 0, np.where(g_ig[np.maximum(m, 0)], IGNORED, TP),
+                                 np.where(p_out, IGNORED, FP))
+        num_gt[i] = np.bincount(gt.cat[~g_ig], minlength=len(cat_codes))
+    if gt_cols.images:
+        status[:, :, ~np.isin(pr_cols.image_id, list(gt_cols.images))] = IGNORED
+
+    # (image, category) 안 score 순위 (maxDets 마스크)
+    idx = np.arange(P)
+    grp = np.lexsort((idx, -pr.score, pr.cat, pr.image))
+    key = pr.image[grp] * len(cat_codes) + pr.cat[grp]
+    start = np.r_[0, np.flatnonzero(key[1:] != key[:-1]) + 1]
+    within = np.empty(P, dtype=np.int32)
+    within[grp] = idx - np.repeat(start, np.diff(np.r_[start, P]))
+
+    # 누적 순서: score 내림차순, 동점이면 image id 순, 같은 이미지 안에서는 입력 순서 (PRTable 과 같음)
+    order = np.lexsort((idx, _image_rank(img_codes)[pr.image], -pr.score, pr.cat))
+    bounds = np.searchsorted(pr.cat[order], np.arange(len(cat_codes) + 1))
+    per_cat = {}
+    for category_id in gt_cols.categories:
+        code = cat_codes.get(category_id)
+        if code is None:
+            continue   # GT 도 pred 도 없는 category
+        sel = order[bounds[code]:bounds[code + 1]]
+        per_cat[category_id] = CategorySummary(pr.score[sel], within[sel], status[:, :, sel], num_gt[:, code])
+    return SummaryTable(thrs, per_cat)
@@ -0,0 +1,280 @@
+# backend/app/services/mapcache.py
+"""
+/map 평가 결과 캐시.
+
+(gt sha, pred sha, mode, iou) 마다 한 번 매칭해서
+  - PRTable   : category 별 누적 PR 표 (메모리 LRU). confidence slider 변경은 이진 탐색 + slice.
+  - MatchTable: pred 별 매칭 결과 + image/category 인덱스. 디스크(cache/<gt>.<pred>.<mode>-<iou>.match/)에
+                저장해 재시작 후에도 mmap 으로 연다.
+를 만든다. 키가 파일 내용(sha) 기준이라 annotation 이 바뀌면 새 키가 되고, 예전 표는 LRU 로 밀려난다.
+coco 모드의 area/maxDets 지표(SummaryTable)와 오류 분석 표(ErrorTable)도 메모리 LRU 에 둔다.
+coco 모드의 (pred, gt, IoU) 쌍(CocoPairs)은 PRTable 매칭과 SummaryTable 이 같이 쓰므로 IoU 는 한 번만 계산한다.
+PATCH 로 바뀐 경우에는 apply_patch 가 바뀐 (image, category) 그룹만 다시 매칭해 새 키로 옮겨 둔다.
+"""
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.map import (
+    DetColumns, PRTable, coco_det_columns, match_coco_pairs, table_from_matches, table_thresholds,
+)
+from app.services.coco_loader import CocoColumns
+from app.services.map_errors import ErrorTable, build_error_table
+from app.services.map_incremental import diff_columns, identity_diff, update_tables
+from app.services.map_matches import MatchTable
+from app.services.map_parallel import match_auto
+from app.services.map_summary import SummaryTable, build_summary_table
+from app.services.motacache import ann_cache
+
+Key = Tuple[str, str, str, Optional[float]]
+
+
+class TableCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Key, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(gt_sha: str, pred_sha: str, mode: str, iou: float) -> Key:
+        # coco 는 IoU .50:.95 전체를 담으므로 iou 와 무관
+        return gt_sha, pred_sha, mode, None if mode == "coco" else round(float(iou), 6)
+
+    def get(self, key: Key, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            ent = self._entries.get(key)
+            if ent is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ent[0]
+            self.misses += 1
+
+        table = build()
+        if table is not None:
+            self.put(key, table)
+        return table
+
+    def put(self, key: Key, table: Any) -> None:
+        nbytes = table.nbytes
+        with self._lock:
+            if key in self._entries or nbytes > self.max_bytes:
+                return
+            self._entries[key] = (table, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, nb) = self._entries.popitem(last=False)
+                self._bytes -= nb
+                self.evictions += 1
+
+    def peek(self, key: Key) -> Any:
+        """통계/LRU 순서를 건드리지 않고 조회 (없으면 None)."""
+        with self._lock:
+            ent = self._entries.get(key)
+            return None if ent is None else ent[0]
+
+    def pop(self, key: Key) -> None:
+        with self._lock:
+            ent = self._entries.pop(key, None)
+            if ent is not None:
+                self._bytes -= ent[1]
+
+    def keys(self) -> List[Key]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+pr_tables = TableCache(settings.MAP_CACHE_MAX_BYTES)
+match_tables = TableCache(settings.MAP_CACHE_MAX_BYTES)
+summary_tables = TableCache(settings.MAP_CACHE_MAX_BYTES)
+error_tables = TableCache(settings.MAP_CACHE_MAX_BYTES)
+pair_tables = TableCache(settings.MAP_CACHE_MAX_BYTES)
+
+
+class CocoPairs(NamedTuple):
+    """match_coco_pairs 결과 (TableCache 에 넣기 위한 nbytes)."""
+    pi: np.ndarray
+    gj: np.ndarray
+    ov: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.pi.nbytes + self.gj.nbytes + self.ov.nbytes
+
+
+def _coco_pairs(key: Key, gt: DetColumns, pr: DetColumns) -> CocoPairs:
+    return pair_tables.get(key, lambda: CocoPairs(*match_coco_pairs(gt, pr)))
+
+
+def _match_dir(key: Key) -> Path:
+    gt_sha, pred_sha, mode, iou = key
+    return ann_cache.cache_dir / f"{gt_sha}.{pred_sha}.{mode}-{'all' if iou is None else iou}.match"
+
+
+def _save_matches(key: Key, matches: MatchTable) -> None:
+    dst = _match_dir(key)
+    tmp = dst.with_name(dst.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        matches.save(tmp)
+        os.replace(tmp, dst)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)   # 다른 요청이 먼저 저장했거나 디스크 오류
+
+
+def _evaluate(key: Key, gt_path: Path, pred_path: Path, mode: str, iou: float) -> Optional[Tuple[PRTable, MatchTable]]:
+    """한 번 매칭해 PRTable 과 MatchTable 을 만든다 (MatchTable 은 디스크에도 저장)."""
+    gt_cols = ann_cache.get_coco(gt_path)
+    pred_cols = ann_cache.get_coco(pred_path)
+    if gt_cols is None or pred_cols is None:
+        return None
+    gt, pr, img_codes, cat_codes = coco_det_columns(gt_cols, pred_cols)
+    thrs = table_thresholds(mode, iou)
+    pairs = _coco_pairs(key, gt, pr) if mode == "coco" else None
+    matched = match_auto(gt, pr, mode, thrs, pairs=pairs)
+    matches = MatchTable.build(gt_cols, pred_cols, gt, pr, matched, thrs, mode)
+    _save_matches(key, matches)
+    table = table_from_matches(gt, pr, matched, img_codes, cat_codes, gt_cols.categories, mode, thrs)
+    return table, matches
+
+
+def _key(gt_path: Path, pred_path: Path, mode: str, iou: float) -> Key:
+    return TableCache.key(ann_cache.sha_of(gt_path), ann_cache.sha_of(pred_path), mode, iou)
+
+
+def get_pr_table(gt_path: Path, pred_path: Path, mode: str, iou: float) -> Optional[PRTable]:
+    """COCO GT/결과 파일의 PRTable (없으면 매칭). 파싱 실패면 None."""
+    key = _key(gt_path, pred_path, mode, iou)
+
+    def build():
+        res = _evaluate(key, gt_path, pred_path, mode, iou)
+        if res is None:
+            return None
+        match_tables.put(key, res[1])
+        return res[0]
+
+    return pr_tables.get(key, build)
+
+
+def get_summary_table(gt_path: Path, pred_path: Path) -> Optional[SummaryTable]:
+    """
+    COCO GT/결과 파일의 SummaryTable (AP_small/medium/large, AR@1/10/100). 파싱 실패면 None.
+    coco 모드 PRTable 과 같은 IoU 쌍 / 매칭 결과 (area "all") 를 쓴다.
+    """
+    key = _key(gt_path, pred_path, "coco", 0.0)
+
+    def build():
+        gt_cols = ann_cache.get_coco(gt_path)
+        pred_cols = ann_cache.get_coco(pred_path)
+        matches = get_match_table(gt_path, pred_path, "coco", 0.0)
+        if gt_cols is None or pred_cols is None or matches is None:
+            return None
+        gt, pr, _, _ = coco_det_columns(gt_cols, pred_cols)
+        return build_summary_table(gt_cols, pred_cols, pairs=_coco_pairs(key, gt, pr),
+                                   matched=np.asarray(matches.a["matched"]))
+
+    return summary_tables.get(key, build)
+
+
+def get_error_table(gt_path: Path, pred_path: Path, iou: float) -> Optional[ErrorTable]:
+    """COCO GT/결과 파일의 ErrorTable (TIDE 오류 유형 + confusion matrix). 파싱 실패면 None."""
+    key = _key(gt_path, pred_path, "errors", iou)
+
+    def build():
+        gt_cols = ann_cache.get_coco(gt_path)
+        pred_cols = ann_cache.get_coco(pred_path)
+        if gt_cols is None or pred_cols is None:
+            return None
+        return build_error_table(gt_cols, pred_cols, iou)
+
+    return error_tables.get(key, build)
+
+
+def _cached_matches(key: Key) -> Optional[MatchTable]:
+    matches = match_tables.peek(key)
+    if matches is None and _match_dir(key).exists():
+        try:
+            matches = MatchTable.load(_match_dir(key))
+        except Exception:
+            matches = None
+    return matches
+
+
+def apply_patch(old_sha: str, new_sha: str, old_cols: CocoColumns, new_cols: CocoColumns) -> int:
+    """
+    annotation 파일 하나가 old_sha -> new_sha 로 바뀌었을 때, old_sha 가 들어간 캐시된 표를
+    바뀐 (image, category) 그룹만 다시 매칭해 새 키로 옮긴다. ann_cache.invalidate 전에 불러야
+    디스크의 예전 MatchTable 을 읽을 수 있다. 옮긴 표 수를 돌려준다.
+    """
+    if old_sha == new_sha:
+        return 0
+    diff = None
+    moved = 0
+    for key in pr_tables.keys():
+        gt_sha, pred_sha, mode, iou = key
+        if old_sha not in (gt_sha, pred_sha) or gt_sha == pred_sha:
+            continue
+        table, matches = pr_tables.peek(key), _cached_matches(key)
+        other = ann_cache.get_cached(pred_sha if gt_sha == old_sha else gt_sha, "coco_cols")
+        if table is None or matches is None or other is None:
+            continue
+        if diff is None:
+            diff = diff_columns(old_cols, new_cols)
+        if gt_sha == old_sha:
+            new_key = (new_sha, pred_sha, mode, iou)
+            res = update_tables(table, matches, new_cols, other, diff, identity_diff(other))
+        else:
+            new_key = (gt_sha, new_sha, mode, iou)
+            res = update_tables(table, matches, other, new_cols, identity_diff(other), diff)
+        pr_tables.pop(key)
+        match_tables.pop(key)
+        pr_tables.put(new_key, res[0])
+        match_tables.put(new_key, res[1])
+        moved += 1
+    return moved
+
+
+def get_match_table(gt_path: Path, pred_path: Path, mode: str, iou: float) -> Optional[MatchTable]:
+    """COCO GT/결과 파일의 MatchTable (메모리 -> 디스크 mmap -> 매칭 순). 파싱 실패면 None."""
+    key = _key(gt_path, pred_path, mode, iou)
+
+    def build():
+        src = _match_dir(key)
+        if src.exists():
+            try:
+                return MatchTable.load(src)
+            except Exception:
+                shutil.rmtree(src, ignore_errors=True)
+        res = _evaluate(key, gt_path, pred_path, mode, iou)
+        if res is None:
+            return None
+        pr_tables.put(key, res[0])
+        return res[1]
+
+    return match_tables.get(key, build)
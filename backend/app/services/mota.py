@@ -1,6 +1,89 @@
 # backend/app/services/mota.py
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator, Union
+
+import numpy as np
+
+from app.utils.iou import iou_matrix
+from app.services.gating import gate_matrix
+from app.services.match import hungarian_maximize_iou
+
+# evaluate_mota(..., matcher=) 에서 쓸 수 있는 프레임 매칭 방식
+MATCHERS = ("greedy", "hungarian")
+
+# MOT txt 컬럼: frame, id, x, y, w, h, conf, class, visibility (이후 컬럼은 무시)
+MOT_NUM_COLS = 9
+_COL_DEFAULTS = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, -1.0, -1.0)
+
+
+class MotTable:
+    """
+    MOT rows stored as contiguous column arrays, sorted by frame once.
+
+    frames[k] 의 행은 [offsets[k], offsets[k+1]) 구간에 있다.
+    """
+    __slots__ = ("frame", "ids", "boxes", "conf", "cls", "vis", "frames", "offsets")
+
+    def __init__(self, frame: np.ndarray, ids: np.ndarray, boxes: np.ndarray,
+                 conf: np.ndarray, cls: np.ndarray, vis: np.ndarray):
+        frame = np.asarray(frame, dtype=np.int64)
+        if frame.size > 1 and np.any(frame[1:] < frame[:-1]):
+            # stable: 같은 프레임 안에서는 파일 순서 유지 (매칭 tie-break 동일)
+            order = np.argsort(frame, kind="stable")
+            frame, ids, boxes = frame[order], ids[order], boxes[order]
+            conf, cls, vis = conf[order], cls[order], vis[order]
+        self.frame = frame
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float64)
+        self.cls = np.asarray(cls, dtype=np.int32)
+        self.vis = np.asarray(vis, dtype=np.float32)
+        self.frames, starts = np.unique(frame, return_index=True)
+        self.offsets = np.append(starts, frame.size).astype(np.int64)
+
+    @classmethod
+    def from_index(cls, frame, ids, boxes, conf, cls_col, vis, frames, offsets) -> "MotTable":
+        """이미 frame 정렬된 컬럼 + 저장해 둔 offset index 로 바로 구성 (정렬/unique 생략, mmap 배열 가능)."""
+        t = cls.__new__(cls)
+        t.frame, t.ids, t.boxes, t.conf, t.cls, t.vis = frame, ids, boxes, conf, cls_col, vis
+        t.frames, t.offsets = frames, offsets
+        return t
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "MotTable":
+        """rows: (N, MOT_NUM_COLS) float array."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, MOT_NUM_COLS)
+        return cls(rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64),
+                   rows[:, 2:6], rows[:, 6], rows[:, 7].astype(np.int32), rows[:, 8])
+
+    def __len__(self) -> int:
+        return int(self.frame.size)
+
+    def span(self, f: int) -> Tuple[int, int]:
+        """frame f 의 [start, end) 행 구간. 없으면 빈 구간."""
+        k = int(np.searchsorted(self.frames, f))
+        if k < self.frames.size and self.frames[k] == f:
+            return int(self.offsets[k]), int(self.offsets[k + 1])
+        return 0, 0
+
+    def range_span(self, f0: int, f1: int) -> Tuple[int, int]:
+        """frame f0..f1 (양끝 포함) 의 [start, end) 행 구간."""
+        k0 = int(np.searchsorted(self.frames, f0, side="left"))
+        k1 = int(np.searchsorted(self.frames, f1, side="right"))
+        return int(self.offsets[k0]), int(self.offsets[max(k0, k1)])
+
+    def spans(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """여러 프레임의 [start, end) 를 한 번에 조회 (없는 프레임은 빈 구간)."""
+        frames = np.asarray(frames, dtype=np.int64)
+        k = np.searchsorted(self.frames, frames)
+        present = k < self.frames.size
+        present[present] = self.frames[k[present]] == frames[present]
+        starts = np.zeros(frames.size, dtype=np.int64)
+        ends = np.zeros(frames.size, dtype=np.int64)
+        starts[present] = self.offsets[k[present]]
+        ends[present] = self.offsets[k[present] + 1]
+        return starts, ends
+
 
 def parse_line(line: str):
     parts = [p.strip() for p in line.strip().split(",")]
@@ -11,93 +94,184 @@ def parse_line(line: str):
         i = int(float(parts[1]))
         x = float(parts[2]); y = float(parts[3])
         w = float(parts[4]); h = float(parts[5])
-        return (f, i, x, y, w, h)
     except Exception:
         return None
+    row = [f, i, x, y, w, h, 1.0, -1.0, -1.0]
+    # 선택 컬럼(conf, class, visibility): 비어있거나 이상하면 기본값
+    for c in range(6, min(len(parts), MOT_NUM_COLS)):
+        if parts[c]:
+            try:
+                row[c] = float(parts[c])
+            except Exception:
+                pass
+    return row
 
-def load_mot(path: Path) -> Dict[int, List[Tuple[int,float,float,float,float,float]]]:
-    # Returns frames: { frame_id: [ (track_id, x, y, w, h, conf), ... ] }
-    frames: Dict[int, List[Tuple[int,float,float,float,float,float]]] = {}
-    text = path.read_text(encoding="utf-8", errors="ignore")
+
+def _parse_rows_slow(text: str) -> np.ndarray:
+    rows = []
     for raw in text.splitlines():
         if not raw or raw.lstrip().startswith("#"):
             continue
         rec = parse_line(raw)
-        if rec is None:
-            continue
-        # parse_line returns (f, id, x, y, w, h) -- but the MOT row may include
-        # additional columns (confidence at index 6). We treat confidence as optional
-        # and default to 1.0 for GT entries.
-        f, i, x, y, w, h = rec
-        conf = 1.0
-        parts = [p.strip() for p in raw.strip().split(',')]
-        if len(parts) > 6 and parts[6] not in ("", None):
-            try:
-                conf = float(parts[6])
-            except Exception:
-                conf = 1.0
-        frames.setdefault(f, []).append((i, x, y, w, h, conf))
-    return frames
-
-def iou(a, b) -> float:
-    ax, ay, aw, ah = a
-    bx, by, bw, bh = b
-    ax2, ay2 = ax + aw, ay + ah
-    bx2, by2 = bx + bw, by + bh
-    inter_w = max(0.0, min(ax2, bx2) - max(ax, bx))
-    inter_h = max(0.0, min(ay2, by2) - max(ay, by))
-    inter = inter_w * inter_h
-    if inter <= 0: return 0.0
-    union = aw*ah + bw*bh - inter
-    if union <= 0: return 0.0
-    return inter / union
-
-def match_greedy(preds: List[Tuple[int,float,float,float,float,float]],
-                 gts: List[Tuple[int,float,float,float,float,float]],
-                 thr: float):
-    matches = []
+        if rec is not None:
+            rows.append(rec)
+    if not rows:
+        return np.empty((0, MOT_NUM_COLS), dtype=np.float64)
+    return np.asarray(rows, dtype=np.float64)
+
+
+def _parse_rows(path: Path) -> np.ndarray:
+    # 빠른 경로: 컬럼 수가 균일한 일반적인 MOT 파일은 numpy C 파서로 한 번에 읽는다.
+    try:
+        data = np.loadtxt(path, delimiter=",", comments="#", ndmin=2,
+                          dtype=np.float64, encoding="utf-8")
+    except (ValueError, UnicodeDecodeError):
+        # 컬럼 수가 들쭉날쭉하거나 빈 필드가 있으면 행 단위 파서로
+        return _parse_rows_slow(path.read_text(encoding="utf-8", errors="ignore"))
+    return _normalize_rows(data)
+
+
+def parse_lines(lines: List[str]) -> np.ndarray:
+    """MOT txt 줄 묶음 -> (N, MOT_NUM_COLS) 배열 (블록 단위 스트리밍 파싱용)."""
+    try:
+        data = np.loadtxt(lines, delimiter=",", comments="#", ndmin=2, dtype=np.float64)
+    except ValueError:
+        return _parse_rows_slow("".join(lines))
+    return _normalize_rows(data)
+
+
+def _normalize_rows(data: np.ndarray) -> np.ndarray:
+    if data.shape[0] == 0 or data.shape[1] < 6:
+        return np.empty((0, MOT_NUM_COLS), dtype=np.float64)
+    rows = np.empty((data.shape[0], MOT_NUM_COLS), dtype=np.float64)
+    ncol = min(data.shape[1], MOT_NUM_COLS)
+    rows[:, :ncol] = data[:, :ncol]
+    for c in range(ncol, MOT_NUM_COLS):
+        rows[:, c] = _COL_DEFAULTS[c]
+    rows[:, 0] = np.trunc(rows[:, 0])
+    rows[:, 1] = np.trunc(rows[:, 1])
+    return rows
+
+
+def load_mot(path: Path) -> MotTable:
+    """MOT txt -> MotTable (frame 정렬 + frame offset index). confidence 가 없으면 1.0."""
+    return MotTable.from_rows(_parse_rows(path))
+
+MotSource = Union[Path, MotTable]
+
+def _as_table(src: MotSource) -> MotTable:
+    """평가 함수는 경로나 (캐시에서 꺼낸) MotTable 을 모두 받는다."""
+    return src if isinstance(src, MotTable) else load_mot(src)
+
+
+def match_greedy_matrix(M: np.ndarray, thr: float) -> List[Tuple[int, int]]:
+    """
+    미리 계산된 IoU 행렬 M (G x P) 에 대한 IoU 내림차순 greedy 매칭.
+    반환: [(gt_index, pred_index), ...]
+    """
+    gi, pi = np.nonzero(M >= thr)          # gt-major 순서 → 동점이면 앞선 gt/pred 우선
+    if gi.size == 0:
+        return []
+    order = np.argsort(-M[gi, pi], kind="stable")
     used_p = set()
     used_g = set()
-    pairs = []
-    for gi, gt in enumerate(gts):
-        gid, gx, gy, gw, gh = gt[0], gt[1], gt[2], gt[3], gt[4]
-        for pi, pr in enumerate(preds):
-            pid, px, py, pw, ph = pr[0], pr[1], pr[2], pr[3], pr[4]
-            ov = iou((gx,gy,gw,gh), (px,py,pw,ph))
-            if ov >= thr:
-                pairs.append((ov, gi, pi))
-    pairs.sort(reverse=True, key=lambda t: t[0])
-    for ov, gi, pi in pairs:
-        if gi in used_g or pi in used_p:
+    matches = []
+    for g, p in zip(gi[order].tolist(), pi[order].tolist()):
+        if g in used_g or p in used_p:
             continue
-        used_g.add(gi); used_p.add(pi)
-        matches.append((gts[gi][0], preds[pi][0]))  # (gt_id, pred_id)
-    unmatched_g = [gts[i][0] for i in range(len(gts)) if i not in used_g]
-    unmatched_p = [preds[i][0] for i in range(len(preds)) if i not in used_p]
-    return matches, unmatched_g, unmatched_p
+        used_g.add(g); used_p.add(p)
+        matches.append((g, p))
+    return matches
+
+def match_greedy(gt_boxes: np.ndarray, pr_boxes: np.ndarray, thr: float) -> List[Tuple[int, int]]:
+    """
+    IoU 내림차순 greedy 매칭.
+    gt_boxes/pr_boxes: (N,4) xywh 배열. 반환: [(gt_index, pred_index), ...]
+    """
+    return match_greedy_matrix(iou_matrix(gt_boxes, pr_boxes), thr)
+
+def match_hungarian_matrix(M: np.ndarray, thr: float, gt_ids: np.ndarray, pr_ids: np.ndarray,
+                           assign: Dict[int, int]) -> List[Tuple[int, int]]:
+    """
+    CLEAR-MOT 매칭: 직전까지의 대응(assign: gt id -> pred id)이 이번 프레임에서도
+    IoU >= thr 이면 그대로 유지하고, 남은 GT/Pred 는 gated IoU 행렬 위에서 Hungarian 으로 푼다.
+    반환: [(gt_index, pred_index), ...]
+    """
+    G, P = M.shape
+    matches: List[Tuple[int, int]] = []
+    used_g = np.zeros(G, dtype=bool)
+    used_p = np.zeros(P, dtype=bool)
+    if assign and G and P:
+        pid_to_idx: Dict[int, int] = {}
+        for pi, pid in enumerate(pr_ids.tolist()):
+            pid_to_idx.setdefault(pid, pi)
+        for gi, gid in enumerate(gt_ids.tolist()):
+            pi = pid_to_idx.get(assign.get(gid))
+            if pi is not None and not used_p[pi] and M[gi, pi] >= thr:
+                matches.append((gi, pi))
+                used_g[gi] = used_p[pi] = True
 
-def evaluate_mota(gt_path: Path, pred_path: Path, iou_thr: float, conf_thr: float = 0.0):
-    gt_frames = load_mot(gt_path)
-    pr_frames = load_mot(pred_path)
+    rg = np.nonzero(~used_g)[0]
+    rp = np.nonzero(~used_p)[0]
+    if rg.size and rp.size:
+        sub = gate_matrix(M[np.ix_(rg, rp)], thr)
+        valid = sub >= 0
+        # 후보가 하나도 없는 행/열은 빼서 assignment 문제 크기를 줄인다
+        rows = np.nonzero(valid.any(axis=1))[0]
+        cols = np.nonzero(valid.any(axis=0))[0]
+        if rows.size and cols.size:
+            for r, c, _ in hungarian_maximize_iou(sub[np.ix_(rows, cols)]):
+                matches.append((int(rg[rows[r]]), int(rp[cols[c]])))
+    return matches
+
+def match_frame(gt_boxes: np.ndarray, pr_boxes: np.ndarray, thr: float, matcher: str = "greedy",
+                gt_ids: np.ndarray = None, pr_ids: np.ndarray = None,
+                assign: Dict[int, int] = None) -> List[Tuple[int, int]]:
+    """한 프레임 매칭. matcher="hungarian" 이면 gt_ids/pr_ids/assign 이 필요하다."""
+    M = iou_matrix(gt_boxes, pr_boxes)
+    if matcher == "hungarian":
+        return match_hungarian_matrix(M, thr, gt_ids, pr_ids, assign or {})
+    return match_greedy_matrix(M, thr)
+
+def check_matcher(matcher: str) -> None:
+    if matcher not in MATCHERS:
+        raise ValueError(f"unknown matcher: {matcher} (expected one of {', '.join(MATCHERS)})")
+
+def _iter_frames(gt: MotTable, pr: MotTable, conf_thr: float) -> Iterator[Tuple[int, slice, np.ndarray]]:
+    """
+    GT/Pred 의 모든 프레임을 순서대로 돈다.
+    yield (frame, gt 행 slice, conf 필터를 통과한 pred 행 인덱스)
+    """
+    all_frames = np.union1d(gt.frames, pr.frames)
+    gs, ge = gt.spans(all_frames)
+    ps, pe = pr.spans(all_frames)
+    keep = pr.conf >= conf_thr
+    for f, g0, g1, p0, p1 in zip(all_frames.tolist(), gs.tolist(), ge.tolist(), ps.tolist(), pe.tolist()):
+        p_idx = np.arange(p0, p1)[keep[p0:p1]]
+        yield f, slice(g0, g1), p_idx
+
+def evaluate_mota(gt_path: MotSource, pred_path: MotSource, iou_thr: float, conf_thr: float = 0.0,
+                  matcher: str = "greedy"):
+    check_matcher(matcher)
+    gt = _as_table(gt_path)
+    pr = _as_table(pred_path)
 
-    all_frames = sorted(set(gt_frames.keys()) | set(pr_frames.keys()))
     TP = FP = FN = IDSW = 0
     total_gt = 0
     assign = {}  # gt id -> last matched pred id
 
-    for f in all_frames:
-        gts = gt_frames.get(f, [])
-        prs_all = pr_frames.get(f, [])
-        # apply confidence threshold filter (pred entries may include conf at index 5)
-        prs = [p for p in prs_all if float(p[5]) >= conf_thr]
-        total_gt += len(gts)
+    for f, gsl, p_idx in _iter_frames(gt, pr, conf_thr):
+        g_ids = gt.ids[gsl]
+        total_gt += g_ids.size
 
-        matches, un_g, un_p = match_greedy(prs, gts, iou_thr)
+        matches = match_frame(gt.boxes[gsl], pr.boxes[p_idx], iou_thr, matcher,
+                              g_ids, pr.ids[p_idx], assign)
         TP += len(matches)
-        FN += len(un_g)
-        FP += len(un_p)
+        FN += g_ids.size - len(matches)
+        FP += p_idx.size - len(matches)
 
-        for (gt_id, pred_id) in matches:
+        for gi, pi in matches:
+            gt_id = int(g_ids[gi]); pred_id = int(pr.ids[p_idx[pi]])
             if gt_id in assign and assign[gt_id] != pred_id:
                 IDSW += 1
             assign[gt_id] = pred_id
@@ -108,15 +282,16 @@ def evaluate_mota(gt_path: Path, pred_path: Path, iou_thr: float, conf_thr: floa
     return mota, {"TP": TP, "FP": FP, "FN": FN, "IDSW": IDSW}
 
 def evaluate_mota_detailed(
-    gt_path: Path,
-    pred_path: Path,
+    gt_path: MotSource,
+    pred_path: MotSource,
     iou_thr: float,
-    conf_thr: float = 0.0
+    conf_thr: float = 0.0,
+    matcher: str = "greedy",
 ):
-    gt_frames = load_mot(gt_path)
-    pr_frames = load_mot(pred_path)
+    check_matcher(matcher)
+    gt = _as_table(gt_path)
+    pr = _as_table(pred_path)
 
-    all_frames = sorted(set(gt_frames.keys()) | set(pr_frames.keys()))
     TP = FP = FN = IDSW = 0
     total_gt = 0
     assign: Dict[int, int] = {}     # gt id -> last matched pred id
@@ -124,25 +299,23 @@ def evaluate_mota_detailed(
 
     per_frame: List[Dict] = []      # ← 프레임별 요약 저장
 
-    for f in all_frames:
-        gts = gt_frames.get(f, [])
-        prs_all = pr_frames.get(f, [])
-        # conf 필터
-        prs = [p for p in prs_all if float(p[5]) >= conf_thr]
+    for f, gsl, p_idx in _iter_frames(gt, pr, conf_thr):
+        g_ids = gt.ids[gsl]
+        total_gt += g_ids.size
 
-        total_gt += len(gts)
-
-        matches, un_g, un_p = match_greedy(prs, gts, iou_thr)
+        matches = match_frame(gt.boxes[gsl], pr.boxes[p_idx], iou_thr, matcher,
+                              g_ids, pr.ids[p_idx], assign)
         tp = len(matches)
-        fn = len(un_g)
-        fp = len(un_p)
+        fn = g_ids.size - tp
+        fp = p_idx.size - tp
 
         TP += tp; FN += fn; FP += fp
 
         # IDSW 판정
         changed = False
         cur_map: Dict[int,int] = {}
-        for (gt_id, pred_id) in matches:
+        for gi, pi in matches:
+            gt_id = int(g_ids[gi]); pred_id = int(pr.ids[p_idx[pi]])
             cur_map[gt_id] = pred_id
             if gt_id in assign and assign[gt_id] != pred_id:
                 IDSW += 1
@@ -157,10 +330,90 @@ def evaluate_mota_detailed(
             "fp": fp,
             "fn": fn,
             "idsw": changed,
-            "gt": len(gts),
-            "pred": len(prs),
+            "gt": int(g_ids.size),
+            "pred": int(p_idx.size),
         })
 
     mota = 1.0 if total_gt == 0 else (1.0 - (FN + FP + IDSW) / float(total_gt))
     stats = {"TP": TP, "FP": FP, "FN": FN, "IDSW": IDSW, "total_gt": total_gt}
-    return mota, stats, idsw_frames, per_frame
\ No newline at end of file
+    return mota, stats, idsw_frames, per_frame
+
+def sweep_mota(
+    gt_path: MotSource,
+    pred_path: MotSource,
+    iou_thrs: List[float],
+    conf_thrs: List[float],
+    matcher: str = "greedy",
+):
+    """
+    IoU x conf 격자 전체를 한 번의 프레임 루프로 평가한다.
+    파일 로드와 프레임별 IoU 행렬 계산은 한 번만 하고, 격자 칸마다 매칭/IDSW 상태만 따로 둔다.
+    반환: (total_gt, grid) — grid[i][j] 는 iou_thrs[i], conf_thrs[j] 칸의
+          {"iou","conf","mota","tp","fp","fn","idsw"}
+    """
+    check_matcher(matcher)
+    gt = _as_table(gt_path)
+    pr = _as_table(pred_path)
+
+    ious = [float(t) for t in iou_thrs]
+    confs = [float(c) for c in conf_thrs]
+    n_i, n_c = len(ious), len(confs)
+    counts = np.zeros((n_i, n_c, 4), dtype=np.int64)     # TP, FP, FN, IDSW
+    assigns = [[{} for _ in range(n_c)] for _ in range(n_i)]
+    total_gt = 0
+    min_thr = min(ious) if ious else 0.0
+
+    # conf 필터는 칸마다 다르므로 _iter_frames 에는 전부 통과시키고 여기서 마스크로 거른다
+    for f, gsl, p_idx in _iter_frames(gt, pr, -np.inf):
+        g_ids = gt.ids[gsl]
+        p_ids = pr.ids[p_idx]
+        p_conf = pr.conf[p_idx]
+        n_g = g_ids.size
+        total_gt += n_g
+        M = iou_matrix(gt.boxes[gsl], pr.boxes[p_idx])
+
+        if matcher == "greedy":
+            # 가장 낮은 IoU 임계값 기준 후보쌍을 IoU 내림차순으로 한 번만 정렬
+            gi, pi = np.nonzero(M >= min_thr)
+            order = np.argsort(-M[gi, pi], kind="stable")
+            gi, pi = gi[order], pi[order]
+            ov = M[gi, pi]
+            pair_conf = p_conf[pi]
+
+        for j, c in enumerate(confs):
+            keep = p_conf >= c
+            n_p = int(keep.sum())
+            if matcher == "hungarian":
+                kept = np.nonzero(keep)[0]
+                Mc = M[:, kept]
+            for i, t in enumerate(ious):
+                assign = assigns[i][j]
+                if matcher == "greedy":
+                    sel = (ov >= t) & (pair_conf >= c)
+                    used_g = set(); used_p = set(); matches = []
+                    for g, p in zip(gi[sel].tolist(), pi[sel].tolist()):
+                        if g in used_g or p in used_p:
+                            continue
+                        used_g.add(g); used_p.add(p)
+                        matches.append((g, p))
+                else:
+                    matches = [(g, int(kept[p])) for g, p in
+                               match_hungarian_matrix(Mc, t, g_ids, p_ids[kept], assign)]
+                tp = len(matches)
+                idsw = 0
+                for g, p in matches:
+                    gt_id = int(g_ids[g]); pred_id = int(p_ids[p])
+                    if gt_id in assign and assign[gt_id] != pred_id:
+                        idsw += 1
+                    assign[gt_id] = pred_id
+                counts[i, j] += (tp, n_p - tp, n_g - tp, idsw)
+
+    grid = []
+    for i, t in enumerate(ious):
+        row = []
+        for j, c in enumerate(confs):
+            TP, FP, FN, IDSW = (int(v) for v in counts[i, j])
+            mota = 1.0 if total_gt == 0 else (1.0 - (FN + FP + IDSW) / float(total_gt))
+            row.append({"iou": t, "conf": c, "mota": mota, "tp": TP, "fp": FP, "fn": FN, "idsw": IDSW})
+        grid.append(row)
+    return total_gt, grid
@@ -0,0 +1,345 @@
+# backend/app/services/mota_session.py
+"""
+Incremental MOTA state for one /ws/preview connection.
+
+세션을 만들 때 프레임별 IoU>0 후보쌍(pair)을 한 번 계산해 두고, 이후 메시지마다
+임계값/박스 수정으로 결과가 바뀔 수 있는 프레임(dirty)만 다시 매칭한 뒤
+IDSW 체인은 첫 dirty 프레임부터만 다시 따라간다.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.mota import MotTable, check_matcher, iou_matrix, match_hungarian_matrix, evaluate_mota_detailed
+from app.services.track_metrics import HOTA_KEYS, evaluate_extended, extended_metrics
+
+
+class PreviewSession:
+    def __init__(self, gt: MotTable, pr: MotTable, matcher: str = "greedy"):
+        check_matcher(matcher)
+        self.matcher = matcher
+        self.gt = gt
+        self.frames = np.union1d(gt.frames, pr.frames)
+        self.F = int(self.frames.size)
+        self.g_fidx = np.searchsorted(self.frames, gt.frame)
+        self.g_off = self._offsets(self.g_fidx)
+        self.n_gt = np.diff(self.g_off)
+        # GT 행을 (id, frame) 순으로 — IDSW 체인을 정렬 없이 따라가기 위한 고정 순서
+        self.g_byid = np.lexsort((gt.frame, gt.ids))
+        self.ids_byid = gt.ids[self.g_byid]
+        grp_start = np.flatnonzero(np.r_[True, self.ids_byid[1:] != self.ids_byid[:-1]]) if len(gt) else np.empty(0, np.int64)
+        self.grp_start = grp_start
+        self.grp_end = np.r_[grp_start[1:], len(gt)].astype(np.int64)
+        self.g_grp = np.empty(len(gt), dtype=np.int64)         # gt 행 -> id 그룹 번호
+        self.g_grp[self.g_byid] = np.repeat(np.arange(grp_start.size), self.grp_end - grp_start)
+        self._set_pred(pr.frame, pr.ids, pr.boxes, pr.conf)
+
+        # 후보쌍: frame 순, 프레임 안에서는 gt-major (greedy 동점 처리 순서와 동일)
+        parts = [self._frame_pairs(k) for k in range(self.F)
+                 if self.n_gt[k] and self.p_off[k + 1] > self.p_off[k]]
+        self._set_pairs(*self._concat_pairs(parts))
+
+        self.iou_thr: Optional[float] = None
+        self.conf_thr: Optional[float] = None
+        self.pred_of = np.full(len(gt), -1, dtype=np.int64)  # gt 행 -> 매칭된 pred 행 (-1: FN)
+        self.sw_row = np.zeros(len(gt), dtype=bool)           # gt 행의 매칭이 IDSW 인지
+        self.n_pred = np.zeros(self.F, dtype=np.int64)
+        self._sig: List[Optional[tuple]] = [None] * self.F    # hungarian: 프레임별 이전 대응 입력
+        self._dense = None                                    # iou<=0 일 때의 전체 평가 결과
+        self._hota = None                                     # (conf_thr, HOTA 값): iou 와 무관
+
+    # ---- 내부 배열 관리 ----
+    def _offsets(self, fidx: np.ndarray) -> np.ndarray:
+        return np.searchsorted(fidx, np.arange(self.F + 1)).astype(np.int64)
+
+    def _set_pred(self, frame, ids, boxes, conf) -> np.ndarray:
+        order = np.argsort(np.asarray(frame, dtype=np.int64), kind="stable")
+        self.p_frame = np.asarray(frame, dtype=np.int64)[order]
+        self.p_ids = np.asarray(ids, dtype=np.int64)[order]
+        self.p_boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)[order]
+        self.p_conf = np.asarray(conf, dtype=np.float64)[order]
+        self.p_fidx = np.searchsorted(self.frames, self.p_frame)
+        self.p_off = self._offsets(self.p_fidx)
+        return order
+
+    def _frame_pairs(self, k: int):
+        g0, g1 = self.g_off[k], self.g_off[k + 1]
+        p0, p1 = self.p_off[k], self.p_off[k + 1]
+        M = iou_matrix(self.gt.boxes[g0:g1], self.p_boxes[p0:p1])
+        gi, pi = np.nonzero(M > 0)
+        return np.full(gi.size, k, dtype=np.int64), gi + g0, pi + p0, M[gi, pi]
+
+    @staticmethod
+    def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """[starts[i], ends[i]) 구간들을 이어 붙인 인덱스 배열."""
+        lens = ends - starts
+        total = int(lens.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        shift = np.repeat(starts - np.r_[0, np.cumsum(lens)[:-1]], lens)
+        return np.arange(total, dtype=np.int64) + shift
+
+    @staticmethod
+    def _concat_pairs(parts):
+        if not parts:
+            e = np.empty(0, dtype=np.int64)
+            return e, e, e, np.empty(0, dtype=np.float64)
+        return tuple(np.concatenate(col) for col in zip(*parts))
+
+    def _set_pairs(self, f, g, p, ov):
+        self.pair_f, self.pair_g, self.pair_p, self.pair_ov = f, g, p, ov
+        self.pair_off = self._offsets(f)
+
+    # ---- 박스 수정 ----
+    def _apply_edits(self, edits: List[Dict]) -> Optional[np.ndarray]:
+        """
+        pred 박스 수정/추가 (export 의 OverrideRecord 와 같은 필드: frame,id,x,y,w,h,conf).
+        수정된 프레임 마스크를 반환. 세션에 없던 프레임이 생기면 None (→ 세션 재구성).
+        """
+        # 먼저 전부 검증 (잘못된 항목이 있으면 아무것도 바꾸지 않는다)
+        parsed = [(int(e["frame"]), int(e["id"]),
+                   [float(e["x"]), float(e["y"]), float(e["w"]), float(e["h"])],
+                   float(e.get("conf", 1.0))) for e in edits]
+        # 같은 (frame, id) 가 여러 번 오면 마지막 것만 (새 행이 두 번 추가되지 않게)
+        parsed = list({(f, tid): (f, tid, box, c) for f, tid, box, c in parsed}.values())
+        add_f, add_i, add_b, add_c = [], [], [], []
+        touched = set()
+        for f, tid, box, c in parsed:
+            touched.add(f)
+            s = int(np.searchsorted(self.p_frame, f, side="left"))
+            t = int(np.searchsorted(self.p_frame, f, side="right"))
+            hit = np.nonzero(self.p_ids[s:t] == tid)[0]
+            if hit.size:
+                self.p_boxes[s + hit[0]] = box; self.p_conf[s + hit[0]] = c
+            else:
+                add_f.append(f); add_i.append(tid); add_b.append(box); add_c.append(c)
+
+        t_frames = np.array(sorted(touched), dtype=np.int64)
+        k = np.searchsorted(self.frames, t_frames)
+        if np.any(k >= self.F) or np.any(self.frames[np.minimum(k, self.F - 1)] != t_frames):
+            self._pending = (np.concatenate([self.p_frame, add_f]), np.concatenate([self.p_ids, add_i]),
+                             np.vstack([self.p_boxes] + ([add_b] if add_b else [])),
+                             np.concatenate([self.p_conf, add_c]))
+            return None
+
+        if add_f:
+            # 새 행은 frame 정렬을 유지하도록 끼워 넣고 기존 pred 행 번호를 옮긴다 (O(N), 정렬 없음)
+            order = np.argsort(add_f, kind="stable")
+            add_f = np.asarray(add_f, dtype=np.int64)[order]
+            pos = np.searchsorted(self.p_frame, add_f, side="right")
+            n_old = self.p_frame.size
+            inv = np.arange(n_old) + np.searchsorted(pos, np.arange(n_old), side="right")
+            self.p_frame = np.insert(self.p_frame, pos, add_f)
+            self.p_ids = np.insert(self.p_ids, pos, np.asarray(add_i, dtype=np.int64)[order])
+            self.p_boxes = np.insert(self.p_boxes, pos, np.asarray(add_b, dtype=np.float64)[order], axis=0)
+            self.p_conf = np.insert(self.p_conf, pos, np.asarray(add_c, dtype=np.float64)[order])
+            self.p_fidx = np.insert(self.p_fidx, pos, np.searchsorted(self.frames, add_f))
+            self.p_off = self._offsets(self.p_fidx)
+            self.pair_p = inv[self.pair_p]
+            m = self.pred_of >= 0
+            self.pred_of[m] = inv[self.pred_of[m]]
+
+        # 수정된 프레임의 후보쌍만 잘라 내고 새로 계산한 것을 그 자리에 넣는다
+        pieces = []
+        prev = 0
+        for kk in k.tolist():
+            a, b = int(self.pair_off[kk]), int(self.pair_off[kk + 1])
+            pieces.append(tuple(col[prev:a] for col in (self.pair_f, self.pair_g, self.pair_p, self.pair_ov)))
+            if self.n_gt[kk]:
+                pieces.append(self._frame_pairs(kk))
+            prev = b
+        pieces.append(tuple(col[prev:] for col in (self.pair_f, self.pair_g, self.pair_p, self.pair_ov)))
+        self._set_pairs(*self._concat_pairs(pieces))
+
+        self._hota = None
+        dirty = np.zeros(self.F, dtype=bool)
+        dirty[k] = True
+        return dirty
+
+    # ---- 재계산 ----
+    def update(self, iou_thr: float, conf_thr: float, edits: Optional[List[Dict]] = None) -> Dict:
+        """임계값/박스 수정 반영 후 현재 결과. "recomputed" 는 다시 매칭한 프레임 수."""
+        dirty = np.zeros(self.F, dtype=bool)
+        if edits:
+            d = self._apply_edits(edits)
+            if d is None:
+                frame, ids, boxes, conf = self._pending
+                table = MotTable(frame, ids, boxes, conf,
+                                 np.full(frame.size, -1, np.int32), np.full(frame.size, -1.0, np.float32))
+                self.__init__(self.gt, table, self.matcher)
+                # 프레임 수(F)가 바뀌었으므로 새 크기로 전부 다시 매칭
+                dirty = np.ones(self.F, dtype=bool)
+            else:
+                dirty |= d
+
+        if self.iou_thr is None or self._dense is not None:
+            dirty[:] = True
+        else:
+            if conf_thr != self.conf_thr:
+                lo, hi = sorted((self.conf_thr, conf_thr))
+                rows = (self.p_conf >= lo) & (self.p_conf < hi)
+                dirty[self.p_fidx[rows]] = True
+            if iou_thr != self.iou_thr:
+                lo, hi = sorted((self.iou_thr, iou_thr))
+                sel = (self.pair_ov >= lo) & (self.pair_ov < hi)
+                dirty[self.pair_f[sel]] = True
+        self.iou_thr, self.conf_thr = float(iou_thr), float(conf_thr)
+
+        if self.iou_thr <= 0:
+            # IoU 0 인 쌍까지 매칭 후보가 되므로 후보쌍 캐시를 쓸 수 없다 → 전체 평가
+            self._dense = self._evaluate_dense()
+            return dict(self._dense, recomputed=self.F)
+        self._dense = None
+
+        n_dirty = int(dirty.sum())
+        if n_dirty:
+            keep = self.p_conf >= self.conf_thr
+            self.n_pred = np.bincount(self.p_fidx[keep], minlength=self.F)
+            k0 = int(np.argmax(dirty))
+            if n_dirty == self.F:
+                dirty_rows = None   # 전부
+            else:
+                dk = np.nonzero(dirty)[0]
+                dirty_rows = self._ranges(self.g_off[dk], self.g_off[dk + 1])
+            if self.matcher == "greedy":
+                self._rematch_greedy(dirty, dirty_rows, keep)
+            else:
+                self._rematch_hungarian(k0, dirty, keep)
+            self._rewalk_idsw(k0, dirty_rows)
+        return dict(self.result(), recomputed=n_dirty)
+
+    def _rematch_greedy(self, dirty: np.ndarray, dirty_rows: Optional[np.ndarray], keep: np.ndarray) -> None:
+        if dirty_rows is None:
+            sel = (self.pair_ov >= self.iou_thr) & keep[self.pair_p]
+        else:
+            dk = np.nonzero(dirty)[0]
+            cand = self._ranges(self.pair_off[dk], self.pair_off[dk + 1])
+            sel = np.zeros(self.pair_f.size, dtype=bool)
+            sel[cand[(self.pair_ov[cand] >= self.iou_thr) & keep[self.pair_p[cand]]]] = True
+        idx = np.nonzero(sel)[0]
+        g = self.pair_g[idx]; p = self.pair_p[idx]
+        # 양쪽 끝점이 후보쌍 하나에만 속하면 greedy 순서와 무관하게 매칭된다 → 벡터화.
+        # 나머지(경합하는 쌍)만 IoU 내림차순으로 정렬해 순서대로 배정
+        deg_g = np.bincount(g, minlength=len(self.gt))
+        deg_p = np.bincount(p, minlength=self.p_frame.size)
+        iso = (deg_g[g] == 1) & (deg_p[p] == 1)
+        amb = idx[~iso]
+        amb = amb[np.argsort(-self.pair_ov[amb], kind="stable")]
+        used_g = set(); used_p = set(); wg = []; wp = []
+        for gg, pp in zip(self.pair_g[amb].tolist(), self.pair_p[amb].tolist()):
+            if gg in used_g or pp in used_p:
+                continue
+            used_g.add(gg); used_p.add(pp)
+            wg.append(gg); wp.append(pp)
+
+        if dirty_rows is None:
+            self.pred_of[:] = -1
+        else:
+            self.pred_of[dirty_rows] = -1
+        self.pred_of[g[iso]] = p[iso]
+        self.pred_of[np.asarray(wg, dtype=np.int64)] = np.asarray(wp, dtype=np.int64)
+
+    def _assign_before(self, k0: int) -> Dict[int, int]:
+        """프레임 k0 직전까지의 gt id -> 마지막으로 매칭된 pred id."""
+        lo = int(self.g_off[k0])
+        seq = self.g_byid[(self.pred_of[self.g_byid] >= 0) & (self.g_byid < lo)]
+        if seq.size == 0:
+            return {}
+        gids = self.gt.ids[seq]
+        last = np.ones(seq.size, dtype=bool)
+        last[:-1] = gids[1:] != gids[:-1]
+        return dict(zip(gids[last].tolist(), self.p_ids[self.pred_of[seq[last]]].tolist()))
+
+    def _rematch_hungarian(self, k0: int, dirty: np.ndarray, keep: np.ndarray) -> None:
+        assign = self._assign_before(k0)
+        for k in range(k0, self.F):
+            g0, g1 = int(self.g_off[k]), int(self.g_off[k + 1])
+            if g0 == g1:
+                continue
+            gids = self.gt.ids[g0:g1]
+            sig = tuple(assign.get(x) for x in gids.tolist())
+            if dirty[k] or self._sig[k] != sig:
+                p0, p1 = int(self.p_off[k]), int(self.p_off[k + 1])
+                M = np.zeros((g1 - g0, p1 - p0))
+                a, b = int(self.pair_off[k]), int(self.pair_off[k + 1])
+                M[self.pair_g[a:b] - g0, self.pair_p[a:b] - p0] = self.pair_ov[a:b]
+                kept = np.nonzero(keep[p0:p1])[0]
+                self.pred_of[g0:g1] = -1
+                for gi, pi in match_hungarian_matrix(M[:, kept], self.iou_thr, gids, self.p_ids[p0 + kept], assign):
+                    self.pred_of[g0 + gi] = p0 + kept[pi]
+                self._sig[k] = sig
+            rows = np.nonzero(self.pred_of[g0:g1] >= 0)[0] + g0
+            for gid, pid in zip(self.gt.ids[rows].tolist(), self.p_ids[self.pred_of[rows]].tolist()):
+                assign[gid] = pid
+
+    def _rewalk_idsw(self, k0: int, dirty_rows: Optional[np.ndarray]) -> None:
+        """
+        IDSW 판정을 첫 dirty 프레임부터 다시 한다. 이전 프레임의 판정과
+        dirty 프레임에 한 번도 나오지 않은 gt id 의 판정은 바뀌지 않으므로 그대로 둔다.
+        """
+        lo = int(self.g_off[k0])
+        if dirty_rows is None:
+            pos = None                                         # (id, frame) 순서 전체
+            rows = self.g_byid
+            gids = self.ids_byid
+        else:
+            touched = np.zeros(self.grp_start.size, dtype=bool)
+            touched[self.g_grp[dirty_rows]] = True
+            grp = np.nonzero(touched)[0]
+            if grp.size * 2 > self.grp_start.size:
+                pos = None                                     # 대부분의 id 가 바뀜 → 전체가 더 싸다
+                rows = self.g_byid
+                gids = self.ids_byid
+            else:
+                pos = self._ranges(self.grp_start[grp], self.grp_end[grp])
+                rows = self.g_byid[pos]
+                gids = self.ids_byid[pos]
+        pm = self.pred_of[rows]
+        m = pm >= 0
+        rows, gids = rows[m], gids[m]
+        pids = self.p_ids[pm[m]]
+        flag = (gids[1:] == gids[:-1]) & (pids[1:] != pids[:-1])
+        nxt = rows[1:]
+        if pos is None:
+            self.sw_row[lo:] = False
+        else:
+            r = self.g_byid[pos]
+            self.sw_row[r[r >= lo]] = False
+        self.sw_row[nxt[flag & (nxt >= lo)]] = True
+
+    def _evaluate_dense(self) -> Dict:
+        mota, stats, idsw_frames, _ = evaluate_mota_detailed(self.gt, self._pred_table(), self.iou_thr,
+                                                             self.conf_thr, self.matcher)
+        return {"mota": mota, "stats": stats, "idsw_frames": idsw_frames}
+
+    def _pred_table(self) -> MotTable:
+        return MotTable(self.p_frame, self.p_ids, self.p_boxes, self.p_conf,
+                        np.full(self.p_frame.size, -1, np.int32), np.full(self.p_frame.size, -1.0, np.float32))
+
+    def extended(self) -> Dict:
+        """현재 매칭 상태로 MOTP/IDF1/MT/PT/ML/Frag/HOTA (세션의 후보쌍을 그대로 재사용)."""
+        if self._dense is not None:
+            res = evaluate_extended(self.gt, self._pred_table(), self.iou_thr, self.conf_thr, self.matcher)
+            for k in ("MOTA", "TP", "FP", "FN", "IDSW", "total_gt"):
+                res.pop(k)
+            return res
+        keep = self.p_conf >= self.conf_thr
+        hota = self._hota[1] if self._hota and self._hota[0] == self.conf_thr else None
+        res = extended_metrics(self.gt.ids, self.p_ids, keep, self.pair_f, self.pair_g, self.pair_p,
+                               self.pair_ov, self.pred_of, self.iou_thr, self.g_byid, hota)
+        self._hota = (self.conf_thr, {k: res[k] for k in HOTA_KEYS})
+        return res
+
+    def result(self) -> Dict:
+        if self._dense is not None:
+            return self._dense
+        TP = int(np.count_nonzero(self.pred_of >= 0))
+        total_gt = len(self.gt)
+        FN = total_gt - TP
+        FP = int(self.n_pred.sum()) - TP
+        IDSW = int(np.count_nonzero(self.sw_row))
+        mota = 1.0 if total_gt == 0 else (1.0 - (FN + FP + IDSW) / float(total_gt))
+        sw_f = self.g_fidx[self.sw_row]                        # gt 행이 frame 순이므로 이미 정렬됨
+        idsw_frames = self.frames[sw_f[np.r_[True, sw_f[1:] != sw_f[:-1]]] if sw_f.size else sw_f].tolist()
+        stats = {"TP": TP, "FP": FP, "FN": FN, "IDSW": IDSW, "total_gt": total_gt}
+        return {"mota": mota, "stats": stats, "idsw_frames": idsw_frames}
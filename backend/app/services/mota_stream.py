@@ -0,0 +1,182 @@
+# backend/app/services/mota_stream.py
+"""
+Bounded-memory MOTA for very long sequences.
+
+frame 정렬된 GT/Pred 파일을 블록 단위로 읽어 프레임별로 merge-join 한다.
+메모리에 남는 것은 읽기 블록 + 현재 프레임 + assign(gt id -> pred id) + 카운터뿐이라
+시퀀스 길이와 무관하다. 정렬되지 않은 파일은 external sort
+(run_rows 행씩 정렬해 임시 .npy run 으로 쓰고 k-way merge) 로 처리한다.
+결과는 evaluate_mota 와 같다 (같은 프레임 안에서는 파일 순서 유지).
+"""
+import heapq
+import tempfile
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.mota import MOT_NUM_COLS, check_matcher, match_frame, parse_lines
+
+DEFAULT_BLOCK_ROWS = 65536
+DEFAULT_RUN_ROWS = 1_000_000
+
+Frame = Tuple[int, np.ndarray]   # (frame, 해당 프레임 행들 (n, MOT_NUM_COLS))
+
+_EMPTY = np.empty((0, MOT_NUM_COLS), dtype=np.float64)
+
+
+class UnsortedInput(ValueError):
+    def __init__(self, path: Path):
+        super().__init__(f"{path} is not sorted by frame")
+        self.path = path
+
+
+def _iter_blocks(path: Path, block_rows: int) -> Iterator[np.ndarray]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            lines = list(islice(f, block_rows))
+            if not lines:
+                return
+            rows = parse_lines(lines)
+            if rows.shape[0]:
+                yield rows
+
+
+def _group_frames(path: Path, blocks: Iterable[np.ndarray]) -> Iterator[Frame]:
+    """블록 스트림 -> 프레임 단위. 프레임 번호가 줄어들면 UnsortedInput."""
+    carry: Optional[np.ndarray] = None   # 블록 끝에 걸친 (아직 끝나지 않았을 수 있는) 프레임
+    last = None
+    for rows in blocks:
+        if carry is not None:
+            rows = np.concatenate([carry, rows])
+        fr = rows[:, 0]
+        if np.any(fr[1:] < fr[:-1]) or (last is not None and fr[0] <= last):
+            raise UnsortedInput(path)
+        starts = np.concatenate([[0], np.flatnonzero(fr[1:] != fr[:-1]) + 1])
+        for s, e in zip(starts[:-1].tolist(), starts[1:].tolist()):
+            yield int(fr[s]), rows[s:e]
+        carry = rows[starts[-1]:]
+        last = fr[starts[-1] - 1] if starts[-1] > 0 else last
+    if carry is not None:
+        yield int(carry[0, 0]), carry
+
+
+def _write_runs(path: Path, run_rows: int, tmpdir: Path) -> List[Path]:
+    runs = []
+    for k, rows in enumerate(_iter_blocks(path, run_rows)):
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+        run = tmpdir / f"run{k:05d}.npy"
+        np.save(run, rows)
+        runs.append(run)
+    return runs
+
+
+def _iter_run(run: Path) -> Iterator[Frame]:
+    rows = np.load(run, mmap_mode="r")
+    frames, starts = np.unique(rows[:, 0], return_index=True)
+    ends = np.append(starts[1:], rows.shape[0])
+    for f, s, e in zip(frames.tolist(), starts.tolist(), ends.tolist()):
+        yield int(f), np.asarray(rows[s:e])
+
+
+def _external_sorted_frames(path: Path, run_rows: int) -> Iterator[Frame]:
+    with tempfile.TemporaryDirectory(prefix="motsort-") as tmp:
+        runs = _write_runs(path, run_rows, Path(tmp))
+        # heapq.merge 는 같은 key 면 앞선 run 을 먼저 내보내므로 파일 순서가 유지된다
+        merged = heapq.merge(*(_iter_run(r) for r in runs), key=itemgetter(0))
+        for f, group in groupby(merged, key=itemgetter(0)):
+            parts = [rows for _, rows in group]
+            yield f, parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def iter_mot_frames(path: Path, external_sort: bool = False,
+                    block_rows: int = DEFAULT_BLOCK_ROWS, run_rows: int = DEFAULT_RUN_ROWS) -> Iterator[Frame]:
+    """
+    MOT txt 를 프레임 순서대로 (frame, rows) 로 내보낸다.
+    external_sort=False 면 정렬된 입력을 가정하고, 아니면 UnsortedInput 을 던진다.
+    """
+    path = Path(path)
+    if external_sort:
+        return _external_sorted_frames(path, run_rows)
+    return _group_frames(path, _iter_blocks(path, block_rows))
+
+
+def _merge_join(gt: Iterator[Frame], pr: Iterator[Frame]) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    g = next(gt, None)
+    p = next(pr, None)
+    while g is not None or p is not None:
+        if p is None or (g is not None and g[0] < p[0]):
+            yield g[0], g[1], _EMPTY
+            g = next(gt, None)
+        elif g is None or p[0] < g[0]:
+            yield p[0], _EMPTY, p[1]
+            p = next(pr, None)
+        else:
+            yield g[0], g[1], p[1]
+            g = next(gt, None)
+            p = next(pr, None)
+
+
+def _evaluate(gt: Iterator[Frame], pr: Iterator[Frame], iou_thr: float, conf_thr: float, matcher: str):
+    TP = FP = FN = IDSW = 0
+    total_gt = 0
+    assign = {}  # gt id -> last matched pred id
+
+    for _, g_rows, p_rows in _merge_join(gt, pr):
+        p_rows = p_rows[p_rows[:, 6] >= conf_thr]
+        n_g, n_p = g_rows.shape[0], p_rows.shape[0]
+        total_gt += n_g
+        if n_g == 0 or n_p == 0:
+            FN += n_g
+            FP += n_p
+            continue
+
+        g_ids = g_rows[:, 1].astype(np.int64)
+        p_ids = p_rows[:, 1].astype(np.int64)
+        matches = match_frame(g_rows[:, 2:6], p_rows[:, 2:6], iou_thr, matcher, g_ids, p_ids, assign)
+        TP += len(matches)
+        FN += n_g - len(matches)
+        FP += n_p - len(matches)
+
+        for gi, pi in matches:
+            gt_id = int(g_ids[gi]); pred_id = int(p_ids[pi])
+            if gt_id in assign and assign[gt_id] != pred_id:
+                IDSW += 1
+            assign[gt_id] = pred_id
+
+    mota = 1.0
+    if total_gt > 0:
+        mota = 1.0 - (FN + FP + IDSW) / float(total_gt)
+    return mota, {"TP": TP, "FP": FP, "FN": FN, "IDSW": IDSW}
+
+
+def evaluate_mota_stream(
+    gt_path: Path,
+    pred_path: Path,
+    iou_thr: float,
+    conf_thr: float = 0.0,
+    matcher: str = "greedy",
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+    run_rows: int = DEFAULT_RUN_ROWS,
+):
+    """
+    evaluate_mota 의 스트리밍 버전 (경로만 받는다). 반환도 동일: (mota, {TP, FP, FN, IDSW}).
+    정렬 안 된 파일을 만나면 그 파일만 external sort 로 바꿔 처음부터 다시 평가한다.
+    """
+    check_matcher(matcher)
+    gt_path, pred_path = Path(gt_path), Path(pred_path)
+    external = set()
+    while True:
+        gt = iter_mot_frames(gt_path, gt_path in external, block_rows, run_rows)
+        pr = iter_mot_frames(pred_path, pred_path in external, block_rows, run_rows)
+        try:
+            return _evaluate(gt, pr, iou_thr, conf_thr, matcher)
+        except UnsortedInput as e:
+            if e.path in external:
+                raise
+            external.add(e.path)
+        finally:
+            gt.close()
+            pr.close()
@@ -1 +1,256 @@
-# Placeholder for per-run cached structures to speed up realtime preview.
\ No newline at end of file
+# backend/app/services/motacache.py
+"""
+Parsed-annotation cache keyed by file content (sha256).
+
+메모리: (sha, kind) -> 파싱 결과, 바이트 예산을 넘으면 LRU 순으로 제거.
+디스크: appdata/cache/<sha>.<kind>.* 에 compact binary 로 저장해 재시작 후에도 재파싱하지 않는다.
+  MOT 테이블과 COCO 컬럼(coco_cols)은 컬럼별 .npy 디렉터리로 두고 mmap 으로 열어서,
+  파일 크기와 무관하게 열기 비용이 일정하고 구간 조회는 필요한 페이지만 읽는다.
+반환 객체는 여러 요청이 공유하므로 호출 측에서 수정하면 안 된다.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.mota import MotTable, load_mot
+from app.services.coco_loader import COCO_ARRAY_FIELDS, CocoColumns, load_coco_columns
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ---- kind 별 (parse, save, load, size) -------------------------------------------
+
+def _save_mot(table: MotTable, dst: Path) -> None:
+    dst.mkdir(parents=True, exist_ok=True)
+    for name in MotTable.__slots__:
+        np.save(dst / f"{name}.npy", np.ascontiguousarray(getattr(table, name)))
+
+def _load_mot(src: Path) -> MotTable:
+    cols = {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in MotTable.__slots__}
+    return MotTable.from_index(cols["frame"], cols["ids"], cols["boxes"], cols["conf"],
+                               cols["cls"], cols["vis"], cols["frames"], cols["offsets"])
+
+def _mot_nbytes(table: MotTable) -> int:
+    return sum(getattr(table, k).nbytes for k in MotTable.__slots__)
+
+def _save_coco_cols(cols: CocoColumns, dst: Path) -> None:
+    dst.mkdir(parents=True, exist_ok=True)
+    for name in COCO_ARRAY_FIELDS:
+        np.save(dst / f"{name}.npy", np.ascontiguousarray(getattr(cols, name)))
+    # JSON key 는 문자열이 되므로 [id, info] 목록으로 저장
+    with open(dst / "tables.json", "w", encoding="utf-8") as f:
+        json.dump({"images": list(cols.images.items()), "categories": list(cols.categories.items())}, f)
+
+def _load_coco_cols(src: Path) -> CocoColumns:
+    arrays = {name: np.load(src / f"{name}.npy", mmap_mode="r") for name in COCO_ARRAY_FIELDS}
+    with open(src / "tables.json", "r", encoding="utf-8") as f:
+        tables = json.load(f)
+    return CocoColumns(**arrays, images=dict((k, v) for k, v in tables["images"]),
+                       categories=dict((k, v) for k, v in tables["categories"]))
+
+def _coco_cols_nbytes(cols: CocoColumns) -> int:
+    # lookup 표는 대략 JSON 크기로
+    tables = len(json.dumps(list(cols.images.values()))) + len(json.dumps(list(cols.categories.values())))
+    return sum(getattr(cols, k).nbytes for k in COCO_ARRAY_FIELDS) + tables
+
+_KINDS: Dict[str, Tuple[Callable, Callable, Callable, Callable, str, Callable]] = {
+    # kind: (parse, save, load, nbytes, ext, is_valid)
+    "mot": (load_mot, _save_mot, _load_mot, _mot_nbytes, "cols", lambda r: r is not None),
+    # GT/결과 파일 공통 컬럼 형태 (스트리밍 파싱, 디스크에서는 mmap)
+    "coco_cols": (load_coco_columns, _save_coco_cols, _load_coco_cols, _coco_cols_nbytes, "cols",
+                  lambda r: r is not None),
+}
+
+
+def _discard(p: Path) -> None:
+    try:
+        if p.is_dir():
+            shutil.rmtree(p)
+        else:
+            p.unlink()
+    except OSError:
+        pass
+
+
+class AnnotationCache:
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        # path -> (mtime_ns, size, sha): 파일이 안 바뀌었으면 다시 해시하지 않는다 (재시작 후에도 유지)
+        self._sha_index = self.cache_dir / "sha_index.json"
+        self._shas: Dict[str, Tuple[int, int, str]] = self._read_sha_index()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    # ---- sha 관리 ----
+    def _read_sha_index(self) -> Dict[str, Tuple[int, int, str]]:
+        try:
+            with open(self._sha_index, "r", encoding="utf-8") as f:
+                return {k: tuple(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_sha_index(self) -> None:
+        tmp = self._sha_index.with_name(f"{self._sha_index.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(dict(self._shas), f)
+            os.replace(tmp, self._sha_index)
+        except OSError:
+            _discard(tmp)
+
+    def sha_of(self, path: Path) -> str:
+        st = os.stat(path)
+        key = str(path)
+        memo = self._shas.get(key)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+        sha = sha256_file(path)
+        self._shas[key] = (st.st_mtime_ns, st.st_size, sha)
+        self._write_sha_index()
+        return sha
+
+    def remember(self, path: Path, sha: str) -> None:
+        """업로드 시 이미 계산한 sha 를 기록해 첫 조회 때 다시 해시하지 않게 한다."""
+        st = os.stat(path)
+        self._shas[str(path)] = (st.st_mtime_ns, st.st_size, sha)
+        self._write_sha_index()
+
+    def invalidate(self, path: Path) -> None:
+        """파일이 다시 쓰였을 때: 예전 내용의 메모리/디스크 항목을 버린다."""
+        memo = self._shas.pop(str(path), None)
+        if memo is None:
+            return
+        self._write_sha_index()
+        old_sha = memo[2]
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == old_sha]:
+                _, nbytes = self._entries.pop(key)
+                self._bytes -= nbytes
+        if any(m[2] == old_sha for m in self._shas.values()):
+            return  # 같은 내용의 다른 파일이 아직 있다
+        # <sha>.<kind>.* 와 mAP 매칭 표 <gt sha>.<pred sha>.*.match
+        for p in [*self.cache_dir.glob(f"{old_sha}.*"), *self.cache_dir.glob(f"*.{old_sha}.*")]:
+            _discard(p)
+
+    # ---- 조회 ----
+    def get(self, path: Path, kind: str) -> Any:
+        if kind not in _KINDS:
+            raise ValueError(f"unknown cache kind: {kind}")
+        parse, save, load, nbytes_of, ext, is_valid = _KINDS[kind]
+        path = Path(path)
+        sha = self.sha_of(path)
+        key = (sha, kind)
+        with self._lock:
+            ent = self._entries.get(key)
+            if ent is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ent[0]
+            self.misses += 1
+
+        disk = self.cache_dir / f"{sha}.{kind}.{ext}"
+        obj = None
+        if disk.exists():
+            try:
+                obj = load(disk)
+                self.disk_hits += 1
+            except Exception:
+                obj = None
+        if obj is None:
+            obj = parse(path)
+            if not is_valid(obj):
+                return obj  # 파싱 실패는 캐시하지 않는다
+            tmp = disk.with_name(disk.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                save(obj, tmp)
+                os.replace(tmp, disk)
+            except OSError:
+                _discard(tmp)   # 다른 요청이 먼저 저장했거나 디스크 오류 → 메모리 캐시만 사용
+
+        self._put(key, obj, nbytes_of(obj))
+        return obj
+
+    def get_cached(self, sha: str, kind: str) -> Any:
+        """이미 파싱해 둔 항목을 sha 로 조회 (메모리 -> 디스크). 없으면 파싱하지 않고 None."""
+        _, _, load, nbytes_of, ext, _ = _KINDS[kind]
+        with self._lock:
+            ent = self._entries.get((sha, kind))
+            if ent is not None:
+                return ent[0]
+        disk = self.cache_dir / f"{sha}.{kind}.{ext}"
+        if not disk.exists():
+            return None
+        try:
+            obj = load(disk)
+        except Exception:
+            return None
+        self._put((sha, kind), obj, nbytes_of(obj))
+        return obj
+
+    def seed(self, sha: str, kind: str, obj: Any) -> None:
+        """이미 메모리에 있는 파싱 결과(PATCH 본문 등)를 sha 로 등록해 다음 get 이 다시 파싱하지 않게 한다."""
+        self._put((sha, kind), obj, _KINDS[kind][3](obj))
+
+    def get_mot(self, path: Path) -> MotTable:
+        return self.get(path, "mot")
+
+    def get_coco(self, path: Path) -> CocoColumns:
+        return self.get(path, "coco_cols")
+
+    def _put(self, key: Tuple[str, str], obj: Any, nbytes: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                return
+            if nbytes > self.max_bytes:
+                return  # 예산보다 큰 항목은 메모리에 두지 않는다 (디스크 캐시는 유효)
+            self._entries[key] = (obj, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, nb) = self._entries.popitem(last=False)
+                self._bytes -= nb
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+ann_cache = AnnotationCache(settings.DATA_ROOT / "cache", settings.ANN_CACHE_MAX_BYTES)
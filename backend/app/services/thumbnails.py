@@ -0,0 +1,184 @@
+# backend/app/services/thumbnails.py
+"""
+이미지 축소본 (thumb / medium) 생성과 캐시.
+
+캐시: DATA_ROOT/cache/thumbs/<sha[:2]>/<sha>.<size>.jpg  (원본 내용 sha256 기준이라 폴더가 달라도 공유)
+생성: 원본을 한 번 decode 해서 큰 크기부터 차례로 INTER_AREA 축소 (medium -> thumb, 피라미드).
+  - 업로드 때 schedule() 로 background process pool 에 CHUNK 개씩 넘긴다 (요청 경로와 무관).
+  - 요청한 크기가 아직 없으면 get_variant() 가 thread pool 에서 바로 만든다 (cv2 는 GIL 을 놓는다).
+    background 작업이 나중에 같은 이미지를 만나면 이미 있는 크기는 건너뛴다.
+decode 할 수 없는 파일 (gif 등) 은 None -> 호출 측은 원본을 준다.
+"""
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import cv2
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# 크기 이름 -> 긴 변 최대 px (큰 것부터)
+SIZES: Dict[str, int] = {"medium": 1024, "thumb": 256}
+JPEG_QUALITY = 85
+# background 작업 하나에 넣는 이미지 수 (IPC 비용 분산)
+CHUNK = 16
+
+THUMB_DIR = settings.DATA_ROOT / "cache" / "thumbs"
+
+
+def variant_path(sha: str, size: str, root: Path = THUMB_DIR) -> Path:
+    return root / sha[:2] / f"{sha}.{size}.jpg"
+
+
+def render_variants(src: str, sha: str, sizes: Sequence[str] = tuple(SIZES),
+                    root: str = str(THUMB_DIR)) -> Optional[List[str]]:
+    """
+    없는 크기만 만들어 캐시에 쓴다 (tmp -> rename). 만든 크기 목록, cv2 가 decode 하지 못하면 None.
+    쓰기 실패 (OSError 등) 는 그대로 올린다. worker 프로세스/스레드 어디서 불러도 된다.
+    """
+    targets = [s for s in SIZES if s in sizes and not variant_path(sha, s, Path(root)).exists()]
+    if not targets:
+        return []
+    img = cv2.imread(src, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    out = []
+    for size in targets:
+        h, w = img.shape[:2]
+        scale = SIZES[size] / max(h, w)
+        if scale < 1.0:
+            img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            continue
+        dst = variant_path(sha, size, Path(root))
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}.part")
+        try:
+            tmp.write_bytes(buf.tobytes())
+            os.replace(tmp, dst)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        out.append(size)
+    return out
+
+
+def _render_chunk(items: List[Tuple[str, str]], root: str) -> int:
+    done, failed = 0, []
+    for src, sha in items:
+        try:
+            done += bool(render_variants(src, sha, tuple(SIZES), root))
+        except Exception as e:   # 파일 하나 때문에 chunk 전체를 버리지 않는다
+            failed.append((src, e))
+    if failed:   # chunk 당 한 줄 (디스크가 가득 차면 모든 파일이 실패한다)
+        print(f"Error generating thumbnails for {len(failed)}/{len(items)} images (first {failed[0][0]}: {failed[0][1]})")
+    return done
+
+
+def _init_worker() -> None:
+    # worker 여러 개가 각자 cv2 스레드를 띄우면 코어를 초과 구독한다
+    cv2.setNumThreads(1)
+
+
+# ---- background pool ---------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: Dict[str, Future] = {}   # sha -> 그 이미지를 담은 chunk 의 future
+_guard = threading.Lock()
+# cv2 가 decode 하지 못한 sha (요청마다 다시 decode 하지 않는다. 디스크 오류 등 일시적 실패는 넣지 않는다)
+_undecodable: Set[str] = set()
+# 만들다 실패한 sha -> 다시 시도할 시각. 그 전까지는 요청마다 다시 만들거나 로그를 찍지 않고 원본을 준다
+RETRY_AFTER = 60.0
+_retry_at: Dict[str, float] = {}
+
+
+def default_workers() -> int:
+    return settings.THUMB_WORKERS or max(1, (os.cpu_count() or 2) // 2)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 서버 프로세스는 스레드를 쓰므로 fork 대신 spawn
+        _pool = ProcessPoolExecutor(max_workers=default_workers(), mp_context=mp.get_context("spawn"),
+                                    initializer=_init_worker)
+    return _pool
+
+
+def schedule(entries: Iterable[Dict]) -> int:
+    """업로드된 이미지 ({path, sha256}) 의 축소본을 background 로 만든다. 넘긴 이미지 수."""
+    items, seen = [], set()
+    with _guard:
+        for e in entries:
+            sha = e.get("sha256")
+            if not sha or sha in seen or sha in _pending:
+                continue
+            if all(variant_path(sha, s).exists() for s in SIZES):
+                continue
+            seen.add(sha)
+            items.append((e["path"], sha))
+        if not items:
+            return 0
+        pool = _get_pool()
+        for i in range(0, len(items), CHUNK):
+            chunk = items[i:i + CHUNK]
+            fut = pool.submit(_render_chunk, chunk, str(THUMB_DIR))
+            for _, sha in chunk:
+                _pending[sha] = fut
+            fut.add_done_callback(lambda f, shas=[sha for _, sha in chunk]: _finish(f, shas))
+    return len(items)
+
+
+def _finish(fut: Future, shas: List[str]) -> None:
+    with _guard:
+        for sha in shas:
+            if _pending.get(sha) is fut:
+                del _pending[sha]
+
+
+def pending() -> int:
+    with _guard:
+        return len(_pending)
+
+
+def shutdown() -> None:
+    """앱 종료: 아직 시작 안 한 작업은 버린다 (없는 크기는 다음 요청 때 on-demand 로 만든다)."""
+    global _pool
+    with _guard:
+        pool, _pool = _pool, None
+        _pending.clear()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ---- 요청 경로 ----------------------------------------------------------------------
+
+async def get_variant(src: Path, sha: str, size: str) -> Optional[Path]:
+    """
+    캐시된 축소본 경로. 없으면 (background 를 기다리지 않고) thread pool 에서 바로 만든다.
+    만들 수 없으면 None (호출 측은 원본을 준다).
+    """
+    dst = variant_path(sha, size)
+    if dst.exists():
+        return dst
+    if sha in _undecodable or _retry_at.get(sha, 0.0) > time.monotonic():
+        return None
+    try:
+        made = await run_in_threadpool(render_variants, str(src), sha)
+    except Exception as e:
+        if sha not in _retry_at:   # 같은 이미지는 처음 실패할 때만 찍는다
+            print(f"Error generating thumbnails for {src}: {e}")
+        _retry_at[sha] = time.monotonic() + RETRY_AFTER
+        return None
+    _retry_at.pop(sha, None)
+    if dst.exists():
+        return dst
+    if made is None:
+        _undecodable.add(sha)
+    return None
@@ -0,0 +1,255 @@
+# backend/app/services/track_metrics.py
+"""
+Extended tracking metrics (MOTP, IDF1, MT/PT/ML, Frag, HOTA) in one pass.
+
+프레임 루프는 한 번만 돌며 CLEAR 매칭을 하고, 그때 계산한 IoU 행렬의 IoU>0 항목을
+희소 후보쌍 (gt 행, pred 행, IoU) 으로 모아 둔다. IDF1/HOTA 는 이 후보쌍만으로 벡터화해 계산한다.
+PreviewSession 도 같은 형태의 후보쌍/매칭을 갖고 있어서 extended_metrics 를 바로 부를 수 있다.
+
+정의는 TrackEval 을 따른다:
+  MOTP  = CLEAR 매칭 IoU 평균
+  MT/ML = GT 트랙이 매칭된 비율 > 0.8 / < 0.2, PT = 나머지
+  Frag  = GT 트랙이 (존재하는 프레임 기준) 매칭 구간으로 나뉜 수 - 1 의 합
+  IDF1  = 전역 gt id <-> pred id 이분 매칭 (IoU >= iou_thr 인 프레임 수 최대화)
+  HOTA  = alpha = 0.05..0.95 에서 sqrt(DetA * AssA) 의 평균
+"""
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from app.services.mota import MotSource, _as_table, _iter_frames, check_matcher, iou_matrix, \
+    match_greedy_matrix, match_hungarian_matrix
+
+HOTA_ALPHAS = np.arange(0.05, 0.96, 0.05)
+HOTA_KEYS = ("HOTA", "DetA", "AssA", "LocA")
+MT_RATIO = 0.8
+ML_RATIO = 0.2
+
+
+def _id_index(ids: np.ndarray):
+    """id 값 -> 0..K-1 번호."""
+    uniq, inv = np.unique(ids, return_inverse=True)
+    return uniq.size, inv.astype(np.int64)
+
+
+def _pair_keys(a: np.ndarray, b: np.ndarray, nb: int):
+    """(a, b) 쌍 -> 고유 key 번호 (희소 누적용)."""
+    keys, inv = np.unique(a * nb + b, return_inverse=True)
+    return keys, inv.astype(np.int64)
+
+
+def _track_stats(gt_ids: np.ndarray, matched: np.ndarray, byid: Optional[np.ndarray]) -> Dict:
+    n = gt_ids.size
+    if n == 0:
+        return {"GT_tracks": 0, "MT": 0, "PT": 0, "ML": 0, "Frag": 0}
+    if byid is None:
+        byid = np.argsort(gt_ids, kind="stable")   # gt 행은 frame 순 → (id, frame) 순
+    ids = gt_ids[byid]
+    m = matched[byid]
+    first = np.r_[True, ids[1:] != ids[:-1]]
+    grp = np.cumsum(first) - 1
+    n_trk = int(grp[-1]) + 1
+    length = np.bincount(grp, minlength=n_trk)
+    ratio = np.bincount(grp, weights=m, minlength=n_trk) / length
+    # 매칭 구간의 시작 = 매칭됐고 (같은 id 의) 직전 행은 매칭 안 됨
+    seg_start = m & (first | ~np.r_[False, m[:-1]])
+    segs = np.bincount(grp, weights=seg_start, minlength=n_trk).astype(np.int64)
+    mt = int(np.count_nonzero(ratio > MT_RATIO))
+    ml = int(np.count_nonzero(ratio < ML_RATIO))
+    return {"GT_tracks": n_trk, "MT": mt, "PT": n_trk - mt - ml, "ML": ml,
+            "Frag": int(np.maximum(segs - 1, 0).sum())}
+
+
+def _identity(g_id: np.ndarray, p_id: np.ndarray, ng: int, np_: int, n_gt: int, n_pred: int) -> Dict:
+    """g_id/p_id: IoU >= iou_thr 인 후보쌍의 gt/pred id 번호."""
+    idtp = 0
+    if g_id.size:
+        keys, inv = _pair_keys(g_id, p_id, np_)
+        cnt = np.bincount(inv)
+        rows, ri = np.unique(keys // np_, return_inverse=True)
+        cols, ci = np.unique(keys % np_, return_inverse=True)
+        W = np.zeros((rows.size, cols.size))
+        W[ri, ci] = cnt
+        r, c = linear_sum_assignment(W, maximize=True)
+        idtp = int(W[r, c].sum())
+    idfn = n_gt - idtp
+    idfp = n_pred - idtp
+    return {
+        "IDF1": 2.0 * idtp / (n_gt + n_pred) if (n_gt + n_pred) else 1.0,
+        "IDP": idtp / n_pred if n_pred else 1.0,
+        "IDR": idtp / n_gt if n_gt else 1.0,
+        "IDTP": idtp, "IDFP": idfp, "IDFN": idfn,
+    }
+
+
+def _hota(pair_f, pair_g, pair_p, pair_ov, g_id, p_id, gcnt, pcnt, n_gt: int, n_pred: int) -> Dict:
+    np_ = pcnt.size
+    A = HOTA_ALPHAS.size
+    if pair_g.size == 0:
+        return {"HOTA": 0.0, "DetA": 0.0, "AssA": 0.0, "LocA": 1.0}
+
+    # 1) 전역 정렬 점수: 프레임 안에서 정규화한 유사도를 (gt id, pred id) 별로 누적
+    g_sum = np.bincount(pair_g, weights=pair_ov)
+    p_sum = np.bincount(pair_p, weights=pair_ov)
+    sim_norm = pair_ov / (g_sum[pair_g] + p_sum[pair_p] - pair_ov)
+    keys, kinv = _pair_keys(g_id, p_id, np_)
+    pot = np.bincount(kinv, weights=sim_norm)
+    kg, kp = keys // np_, keys % np_
+    ga = pot / (gcnt[kg] + pcnt[kp] - pot)
+    score = ga[kinv] * pair_ov
+
+    # 2) 프레임별 score 최대 매칭. 양쪽 끝점이 후보쌍 하나뿐이면 그대로 매칭 (경합 쌍만 LSA)
+    deg_g = np.bincount(pair_g)
+    deg_p = np.bincount(pair_p)
+    iso = (deg_g[pair_g] == 1) & (deg_p[pair_p] == 1)
+    sel = [np.nonzero(iso)[0]]
+    amb = np.nonzero(~iso)[0]
+    if amb.size:
+        fr = pair_f[amb]
+        bounds = np.flatnonzero(np.r_[True, fr[1:] != fr[:-1], True])
+        starts = bounds[:-1]
+        # 한 프레임의 gt/pred 행은 연속 구간이므로 프레임 최소 행 번호를 빼면 지역 인덱스가 된다
+        ag, ap = pair_g[amb], pair_p[amb]
+        g_lo = np.minimum.reduceat(ag, starts); g_hi = np.maximum.reduceat(ag, starts)
+        p_lo = np.minimum.reduceat(ap, starts); p_hi = np.maximum.reduceat(ap, starts)
+        seg = np.repeat(np.arange(starts.size), np.diff(bounds))
+        lg = ag - g_lo[seg]
+        lp = ap - p_lo[seg]
+        a_score = score[amb]
+        for j, (s, e) in enumerate(zip(starts.tolist(), bounds[1:].tolist())):
+            S = np.zeros((int(g_hi[j] - g_lo[j]) + 1, int(p_hi[j] - p_lo[j]) + 1))
+            P = np.zeros(S.shape, dtype=np.int64)
+            S[lg[s:e], lp[s:e]] = a_score[s:e]
+            P[lg[s:e], lp[s:e]] = np.arange(s, e) + 1
+            r, c = linear_sum_assignment(S, maximize=True)
+            hit = P[r, c]
+            sel.append(amb[hit[hit > 0] - 1])
+    m = np.concatenate(sel)
+
+    # 3) alpha 별 DetA / AssA / LocA
+    m_ov = pair_ov[m]
+    m_key = kinv[m]
+    ok = m_ov[None, :] >= (HOTA_ALPHAS[:, None] - np.finfo(float).eps)   # (A, M)
+    tp = ok.sum(axis=1).astype(np.float64)
+    fn = n_gt - tp
+    fp = n_pred - tp
+    det_a = tp / np.maximum(1.0, tp + fn + fp)
+    loc_a = np.where(tp > 0, (ok * m_ov).sum(axis=1) / np.maximum(1.0, tp), 1.0)
+    ass_a = np.zeros(A)
+    for a in range(A):
+        mc = np.bincount(m_key[ok[a]], minlength=keys.size).astype(np.float64)
+        nz = mc > 0
+        ass = mc[nz] / (gcnt[kg[nz]] + pcnt[kp[nz]] - mc[nz])
+        ass_a[a] = (mc[nz] * ass).sum() / max(1.0, tp[a])
+    hota = np.sqrt(det_a * ass_a)
+    return {"HOTA": float(hota.mean()), "DetA": float(det_a.mean()),
+            "AssA": float(ass_a.mean()), "LocA": float(loc_a.mean())}
+
+
+def extended_metrics(
+    gt_ids: np.ndarray,
+    pr_ids: np.ndarray,
+    pr_keep: np.ndarray,
+    pair_f: np.ndarray,
+    pair_g: np.ndarray,
+    pair_p: np.ndarray,
+    pair_ov: np.ndarray,
+    pred_of: np.ndarray,
+    iou_thr: float,
+    gt_byid: Optional[np.ndarray] = None,
+    hota: Optional[Dict] = None,
+) -> Dict:
+    """
+    희소 후보쌍과 CLEAR 매칭 결과로 확장 지표를 계산한다.
+      gt_ids   : gt 행별 id (행은 frame 순)
+      pr_ids   : pred 행별 id, pr_keep: conf 필터를 통과한 pred 행
+      pair_*   : IoU>0 후보쌍 (frame 번호, gt 행, pred 행, IoU), frame 순
+      pred_of  : gt 행 -> CLEAR 매칭된 pred 행 (-1: 미매칭)
+      gt_byid  : gt 행의 (id, frame) 순서 (있으면 정렬 생략)
+      hota     : 이미 계산한 HOTA_KEYS 값. HOTA 는 iou_thr/CLEAR 매칭과 무관해서
+                 pred 집합(conf)이 같으면 재사용할 수 있다.
+    """
+    gt_ids = np.asarray(gt_ids, dtype=np.int64)
+    pr_ids = np.asarray(pr_ids, dtype=np.int64)
+    k = pr_keep[pair_p]
+    pair_f, pair_g, pair_p, pair_ov = pair_f[k], pair_g[k], pair_p[k], pair_ov[k]
+    n_gt = int(gt_ids.size)
+    n_pred = int(np.count_nonzero(pr_keep))
+
+    matched = pred_of >= 0
+    tp = int(np.count_nonzero(matched))
+    on_match = pred_of[pair_g] == pair_p
+    motp = float(pair_ov[on_match].sum() / tp) if tp else 0.0
+
+    ng, g_idx = _id_index(gt_ids)
+    np_, p_idx = _id_index(pr_ids[pr_keep])
+    p_idx_all = np.full(pr_ids.size, -1, dtype=np.int64)
+    p_idx_all[pr_keep] = p_idx
+    gcnt = np.bincount(g_idx, minlength=ng).astype(np.float64)
+    pcnt = np.bincount(p_idx, minlength=np_).astype(np.float64)
+    g_id = g_idx[pair_g]
+    p_id = p_idx_all[pair_p]
+
+    out = {"MOTP": motp}
+    out.update(_track_stats(gt_ids, matched, gt_byid))
+    hit = pair_ov >= iou_thr
+    out.update(_identity(g_id[hit], p_id[hit], ng, np_, n_gt, n_pred))
+    if hota is None:
+        hota = _hota(pair_f, pair_g, pair_p, pair_ov, g_id, p_id, gcnt, pcnt, n_gt, n_pred)
+    out.update(hota)
+    return out
+
+
+def evaluate_extended(
+    gt_path: MotSource,
+    pred_path: MotSource,
+    iou_thr: float,
+    conf_thr: float = 0.0,
+    matcher: str = "greedy",
+) -> Dict:
+    """
+    CLEAR(MOTA/MOTP/IDSW/MT/PT/ML/Frag) + Identity(IDF1) + HOTA 를 한 번의 프레임 루프로 계산.
+    MOTA/TP/FP/FN/IDSW 는 evaluate_mota_detailed 와 같다.
+    """
+    check_matcher(matcher)
+    gt = _as_table(gt_path)
+    pr = _as_table(pred_path)
+
+    pred_of = np.full(len(gt), -1, dtype=np.int64)
+    IDSW = 0
+    assign: Dict[int, int] = {}
+    parts = []
+    for k, (f, gsl, p_idx) in enumerate(_iter_frames(gt, pr, conf_thr)):
+        g_ids = gt.ids[gsl]
+        if g_ids.size == 0 or p_idx.size == 0:
+            continue
+        M = iou_matrix(gt.boxes[gsl], pr.boxes[p_idx])
+        if matcher == "hungarian":
+            matches = match_hungarian_matrix(M, iou_thr, g_ids, pr.ids[p_idx], assign)
+        else:
+            matches = match_greedy_matrix(M, iou_thr)
+        for gi, pi in matches:
+            gt_id = int(g_ids[gi]); pred_id = int(pr.ids[p_idx[pi]])
+            if gt_id in assign and assign[gt_id] != pred_id:
+                IDSW += 1
+            assign[gt_id] = pred_id
+            pred_of[gsl.start + gi] = p_idx[pi]
+        gi, pi = np.nonzero(M > 0)
+        parts.append((np.full(gi.size, k, dtype=np.int64), gi + gsl.start, p_idx[pi], M[gi, pi]))
+
+    if parts:
+        pair_f, pair_g, pair_p, pair_ov = (np.concatenate(c) for c in zip(*parts))
+    else:
+        pair_f = pair_g = pair_p = np.empty(0, dtype=np.int64)
+        pair_ov = np.empty(0, dtype=np.float64)
+
+    keep = pr.conf >= conf_thr
+    total_gt = len(gt)
+    TP = int(np.count_nonzero(pred_of >= 0))
+    FN = total_gt - TP
+    FP = int(np.count_nonzero(keep)) - TP
+    mota = 1.0 if total_gt == 0 else (1.0 - (FN + FP + IDSW) / float(total_gt))
+    out = {"MOTA": mota, "TP": TP, "FP": FP, "FN": FN, "IDSW": IDSW, "total_gt": total_gt}
+    out.update(extended_metrics(gt.ids, pr.ids, keep, pair_f, pair_g, pair_p, pair_ov, pred_of, iou_thr))
+    return out
@@ -0,0 +1,73 @@
+# backend/app/tests/unit/test_map_coco.py
+"""crowd GT 가 있는 coco 모드 mAP 가 pycocotools (COCOeval bbox) 결과와 같은지. 기대값은 pycocotools 로 미리 구해 둔 것."""
+import numpy as np
+import pytest
+
+from app.services.coco_loader import coco_columns_from_doc
+from app.services.map import COCO_IOU_THRS, calculate_map_coco, coco_det_columns, match_coco_pairs, match_columns
+from app.services.map_parallel import build_pr_table_coco, match_auto
+from app.services.map_summary import build_summary_table
+
+
+def _box(i, img, cat, b, crowd=0):
+    return {"id": i, "image_id": img, "category_id": cat, "bbox": b, "area": b[2] * b[3], "iscrowd": crowd}
+
+
+def _det(img, cat, b, s):
+    return {"image_id": img, "category_id": cat, "bbox": b, "score": s}
+
+
+GT = [
+    _box(1, 1, 1, [10, 10, 50, 100]), _box(2, 1, 1, [100, 0, 200, 150], 1), _box(3, 1, 2, [300, 300, 80, 40]),
+    _box(4, 2, 1, [0, 0, 40, 80]), _box(5, 2, 1, [60, 0, 40, 80]), _box(6, 2, 2, [200, 200, 300, 200], 1),
+    _box(7, 3, 2, [10, 10, 60, 30]), _box(8, 3, 1, [100, 100, 30, 60]),
+]
+# crowd 영역 안의 pred (1, 2번째 image) 는 pycocotools 에서 무시되고 FP 로 세지 않는다
+DT = [
+    _det(1, 1, [12, 11, 50, 98], .95), _det(1, 1, [120, 20, 40, 80], .9), _det(1, 1, [150, 50, 30, 60], .6),
+    _det(1, 1, [400, 400, 20, 20], .3), _det(1, 2, [302, 305, 78, 40], .8), _det(1, 2, [250, 250, 40, 40], .7),
+    _det(2, 1, [2, 1, 40, 78], .85), _det(2, 1, [65, 5, 40, 80], .5), _det(2, 1, [61, 0, 38, 82], .4),
+    _det(2, 2, [220, 220, 100, 60], .75), _det(2, 2, [0, 300, 50, 50], .65),
+    _det(3, 2, [12, 14, 55, 30], .55), _det(3, 1, [102, 98, 30, 60], .45), _det(3, 1, [90, 90, 60, 90], .35),
+]
+CATEGORIES = {1: {"id": 1, "name": "person"}, 2: {"id": 2, "name": "car"}}
+DOC = {"images": [{"id": i} for i in (1, 2, 3)], "annotations": GT, "categories": list(CATEGORIES.values())}
+
+# pycocotools 2.0 COCOeval(bbox).stats (-1 은 해당 GT 없음)
+COCO_STATS = [0.599009900990099, 0.8762376237623762, 0.7029702970297029, -1.0, 0.599009900990099, -1.0,
+              0.575, 0.6875, 0.6875, -1.0, 0.6875, -1.0]
+SUMMARY_KEYS = ["AP", "AP50", "AP75", "AP_small", "AP_medium", "AP_large",
+                "AR_1", "AR_10", "AR_100", "AR_small", "AR_medium", "AR_large"]
+
+
+def test_calculate_map_coco_ignores_crowd():
+    mean_ap, detail = calculate_map_coco(GT, DT, CATEGORIES)
+    assert mean_ap == pytest.approx(COCO_STATS[0], abs=1e-12)
+    assert detail["AP50"] == pytest.approx(COCO_STATS[1], abs=1e-12)
+    assert detail["AP75"] == pytest.approx(COCO_STATS[2], abs=1e-12)
+    assert detail["pr_curves"][1]["num_gt"] == 4   # crowd GT 는 세지 않는다
+
+
+def test_pr_table_and_summary_agree_with_pycocotools():
+    gt_cols, pr_cols = coco_columns_from_doc(DOC), coco_columns_from_doc(DT)
+    _, detail = build_pr_table_coco(gt_cols, pr_cols, "coco", workers=1).evaluate(0.0)
+
+    gt, pr, _, _ = coco_det_columns(gt_cols, pr_cols)
+    pairs = match_coco_pairs(gt, pr)
+    matched = match_columns(gt, pr, "coco", COCO_IOU_THRS, pairs)
+    shared = build_summary_table(gt_cols, pr_cols, pairs=pairs, matched=matched).evaluate(0.0)
+    alone = build_summary_table(gt_cols, pr_cols).evaluate(0.0)
+
+    assert shared == alone
+    got = [-1.0 if shared[k] is None else shared[k] for k in SUMMARY_KEYS]
+    np.testing.assert_allclose(got, COCO_STATS, atol=1e-12)
+    assert detail["AP"] == pytest.approx(shared["AP"], abs=1e-12)
+    assert (detail["AP50"], detail["AP75"]) == pytest.approx((shared["AP50"], shared["AP75"]), abs=1e-12)
+
+
+def test_parallel_match_with_shared_pairs():
+    gt, pr, _, _ = coco_det_columns(coco_columns_from_doc(DOC), coco_columns_from_doc(DT))
+    pairs = match_coco_pairs(gt, pr)
+    serial = match_columns(gt, pr, "coco", COCO_IOU_THRS)
+    parallel = match_auto(gt, pr, "coco", COCO_IOU_THRS, workers=2, min_preds=0, pairs=pairs)
+    np.testing.assert_array_equal(parallel, serial)
@@ -0,0 +1,73 @@
+# backend/app/tests/unit/test_mota_session.py
+"""PreviewSession (증분 MOTA) 결과가 매번 전체 평가 evaluate_mota_detailed 와 같은지."""
+import numpy as np
+import pytest
+
+from app.services.mota import MotTable, evaluate_mota_detailed
+from app.services.mota_session import PreviewSession
+
+
+def _table(rows):
+    """rows: [(frame, id, [x, y, w, h], conf)] -> MotTable (입력 순서 유지)."""
+    n = len(rows)
+    return MotTable(np.array([r[0] for r in rows], dtype=np.int64), np.array([r[1] for r in rows], dtype=np.int64),
+                    np.array([r[2] for r in rows], dtype=np.float64).reshape(-1, 4),
+                    np.array([r[3] for r in rows], dtype=np.float64),
+                    np.full(n, -1, np.int32), np.full(n, -1.0, np.float32))
+
+
+def _random_tracks(rng, frames, n_ids, jitter):
+    rows = []
+    for tid in range(n_ids):
+        x, y = rng.uniform(0, 200, 2)
+        for f in frames:
+            if rng.random() < 0.85:
+                rows.append((int(f), tid, [x + rng.normal(0, jitter), y + rng.normal(0, jitter), 30.0, 40.0],
+                             float(rng.uniform(0.1, 1.0))))
+    return rows
+
+
+def _check(session, gt, pred, iou, conf, matcher, edits):
+    res = session.update(iou, conf, edits)
+    mota, stats, idsw_frames, _ = evaluate_mota_detailed(gt, _table(list(pred.values())), iou, conf, matcher)
+    assert res["stats"] == stats
+    assert res["idsw_frames"] == idsw_frames
+    assert res["mota"] == pytest.approx(mota)
+
+
+@pytest.mark.parametrize("matcher", ["greedy", "hungarian"])
+@pytest.mark.parametrize("seed", range(8))
+def test_session_matches_full_evaluation_with_new_frame_edits(matcher, seed):
+    rng = np.random.default_rng(seed)
+    gt_rows = _random_tracks(rng, range(1, 13), 5, 0.0)
+    # pred 는 일부 프레임에만 있다 → 편집이 세션에 없던 프레임을 만든다
+    pr_rows = _random_tracks(rng, range(1, 13, 2), 6, 4.0)
+    gt = _table(gt_rows)
+    pred = {(f, tid): (f, tid, box, c) for f, tid, box, c in pr_rows}
+    session = PreviewSession(gt, _table(pr_rows), matcher)
+    _check(session, gt, pred, 0.5, 0.0, matcher, None)
+
+    for _ in range(25):
+        edits = []
+        for _ in range(int(rng.integers(1, 4))):
+            f = int(rng.integers(1, 16))             # 13..15 는 GT 에도 없는 프레임
+            tid = int(rng.integers(0, 8))
+            box = rng.uniform(0, 200, 2).tolist() + [30.0, 40.0]
+            edits.append({"frame": f, "id": tid, "x": box[0], "y": box[1], "w": box[2], "h": box[3],
+                          "conf": float(rng.uniform(0.1, 1.0))})
+        if rng.random() < 0.3:
+            edits.append(dict(edits[0], x=edits[0]["x"] + 1.0))   # 같은 (frame, id) 를 한 batch 에 두 번
+        for e in edits:
+            pred[(e["frame"], e["id"])] = (e["frame"], e["id"], [e["x"], e["y"], e["w"], e["h"]], e["conf"])
+        iou = float(rng.choice([0.3, 0.5, 0.7]))
+        conf = float(rng.choice([0.0, 0.3, 0.6]))
+        _check(session, gt, pred, iou, conf, matcher, edits)
+
+
+def test_duplicate_edit_for_new_row_adds_one_row():
+    gt = _table([(1, 0, [0.0, 0.0, 10.0, 10.0], 1.0)])
+    session = PreviewSession(gt, _table([(1, 5, [50.0, 50.0, 10.0, 10.0], 1.0)]), "greedy")
+    edit = {"frame": 1, "id": 7, "x": 0.0, "y": 0.0, "w": 10.0, "h": 10.0}
+    res = session.update(0.5, 0.0, [edit, dict(edit, x=1.0)])
+    assert session.p_frame.size == 2
+    assert res["stats"]["TP"] == 1 and res["stats"]["FP"] == 1
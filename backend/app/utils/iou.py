@@ -1,3 +1,12 @@
+# backend/app/utils/iou.py
+import numpy as np
+
+# iou_matrix 가 한 번에 만드는 중간 배열 크기 상한 (bytes). 넘으면 행 단위로 나눠 계산한다.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# 행 블록마다 동시에 살아있는 (rows, M) 임시 배열 수 (iw, ih, union)
+_TMP_ARRAYS = 3
+
+
 def iou(a,b):
     ax1, ay1, ax2, ay2 = a[0],a[1],a[0]+a[2],a[1]+a[3]
     bx1, by1, bx2, by2 = b[0],b[1],b[0]+b[2],b[1]+b[3]
@@ -5,4 +14,59 @@ def iou(a,b):
     ih = max(0, min(ay2,by2)-max(ay1,by1))
     inter = iw*ih
     union = a[2]*a[3]+b[2]*b[3]-inter
-    return inter/union if union>0 else 0.0
\ No newline at end of file
+    return inter/union if union>0 else 0.0
+
+
+def iou_matrix(boxes_a, boxes_b, dtype=np.float64, max_bytes: int = DEFAULT_MAX_BYTES) -> np.ndarray:
+    """
+    xywh 박스 N개 x M개의 IoU 행렬을 broadcasting 으로 계산한다.
+
+    dtype=np.float32 이면 메모리/대역폭이 절반. 임시 배열이 max_bytes 를 넘지 않도록
+    A 쪽 행을 블록으로 나눠 처리한다 (결과 행렬 자체는 항상 (N, M)).
+    """
+    a = np.asarray(boxes_a, dtype=dtype).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=dtype).reshape(-1, 4)
+    n, m = a.shape[0], b.shape[0]
+    out = np.zeros((n, m), dtype=dtype)
+    if n == 0 or m == 0:
+        return out
+
+    ax1 = a[:, 0:1]; ay1 = a[:, 1:2]
+    ax2 = ax1 + a[:, 2:3]; ay2 = ay1 + a[:, 3:4]
+    area_a = a[:, 2:3] * a[:, 3:4]
+    bx1 = b[:, 0]; by1 = b[:, 1]
+    bx2 = bx1 + b[:, 2]; by2 = by1 + b[:, 3]
+    area_b = b[:, 2] * b[:, 3]
+
+    rows = max(1, int(max_bytes) // (_TMP_ARRAYS * m * out.itemsize))
+    for s in range(0, n, rows):
+        e = min(n, s + rows)
+        iw = np.minimum(ax2[s:e], bx2)
+        iw -= np.maximum(ax1[s:e], bx1)
+        np.maximum(iw, 0, out=iw)
+        ih = np.minimum(ay2[s:e], by2)
+        ih -= np.maximum(ay1[s:e], by1)
+        np.maximum(ih, 0, out=ih)
+        iw *= ih                      # inter
+        union = area_a[s:e] + area_b
+        union -= iw
+        np.divide(iw, union, out=out[s:e], where=union > 0)
+    return out
+
+
+def iou_pairs(boxes_a, boxes_b, crowd=None) -> np.ndarray:
+    """
+    xywh 박스 쌍 (a[i], b[i]) 별 IoU (길이 N 벡터). 그룹별 IoU 행렬을 쌍 목록으로 펼쳐 한 번에 계산할 때 사용.
+    crowd[i] 이면 b[i] 를 crowd 영역으로 보고 inter / area(a[i]) (pycocotools iscrowd 와 같음).
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    iw = np.minimum(a[:, 0] + a[:, 2], b[:, 0] + b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    ih = np.minimum(a[:, 1] + a[:, 3], b[:, 1] + b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    inter = np.maximum(iw, 0) * np.maximum(ih, 0)
+    union = a[:, 2] * a[:, 3] + b[:, 2] * b[:, 3] - inter
+    if crowd is not None:
+        union = np.where(crowd, a[:, 2] * a[:, 3], union)
+    out = np.zeros(inter.size)
+    np.divide(inter, union, out=out, where=union > 0)
+    return out
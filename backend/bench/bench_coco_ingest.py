@@ -0,0 +1,62 @@
+# backend/bench/bench_coco_ingest.py
+"""
+COCO 결과 파일 적재: json.load + dict (load_predictions) vs 스트리밍 컬럼 (load_coco_columns)
+vs 캐시된 컬럼 mmap 열기. 메모리는 tracemalloc peak.
+
+    cd backend && python -m bench.bench_coco_ingest
+"""
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from app.services.coco_loader import load_coco_columns, load_predictions
+from app.services.motacache import AnnotationCache
+
+SIZES = (100_000, 400_000)
+
+
+def _write_results(path: Path, n: int, rng: np.random.Generator) -> None:
+    img = rng.integers(0, 5000, n)
+    cat = rng.integers(1, 81, n)
+    box = np.round(rng.uniform(0, 600, (n, 4)), 2)
+    score = np.round(rng.uniform(0, 1, n), 5)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"image_id": int(i), "category_id": int(c), "bbox": b, "score": float(s)}
+                   for i, c, b, s in zip(img, cat, box.tolist(), score)], f)
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, dt, peak / 2**20
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'preds':>8} {'file MB':>8} {'dict MB':>8} {'dict s':>7} {'cols MB':>8} {'cols s':>7} {'mmap ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        cache = AnnotationCache(tmp / "cache", max_bytes=0)   # 메모리 캐시 없이 디스크(mmap)만
+        for n in SIZES:
+            path = tmp / f"res{n}.json"
+            _write_results(path, n, rng)
+            _, t_dict, m_dict = _measure(lambda: load_predictions(path))
+            _, t_cols, m_cols = _measure(lambda: load_coco_columns(path))
+            cache.get(path, "coco_cols")                       # 파싱 + 저장
+            t0 = time.perf_counter()
+            cache.get(path, "coco_cols")                       # mmap 열기
+            t_mmap = (time.perf_counter() - t0) * 1000
+            print(f"{n:>8d} {path.stat().st_size / 2**20:>8.1f} {m_dict:>8.1f} {t_dict:>7.2f} "
+                  f"{m_cols:>8.1f} {t_cols:>7.2f} {t_mmap:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
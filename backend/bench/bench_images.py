@@ -0,0 +1,96 @@
+# backend/bench/bench_images.py
+"""
+/images/{folder_id}/{image_id} 처리량 (requests/sec), 10k 이미지 폴더.
+in-process ASGI (httpx.ASGITransport) 라 네트워크는 빠진 앱 자체의 비용이다.
+  indexed  : 메모리 폴더 인덱스 + FileResponse (200)
+  304      : If-None-Match 재검증 (본문 없음)
+  legacy   : 예전 방식 (요청마다 images.json 을 읽고 선형 탐색)
+
+    cd backend && python -m bench.bench_images
+"""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+N_IMAGES = 10_000
+REQUESTS = 2_000
+CONCURRENCY = 32
+IMAGE_BYTES = 16 * 1024
+
+
+def _make_folder(root: str) -> str:
+    from app.services.image_folders import append_entries, commit_folder, create_folder, folder_dir
+    folder_id = create_folder()
+    d = folder_dir(folder_id)
+    payload = os.urandom(IMAGE_BYTES)
+    entries = []
+    for i in range(N_IMAGES):
+        name = f"{i:012d}.jpg"
+        (d / name).write_bytes(payload)
+        entries.append({'id': i + 1, 'file_name': name, 'path': str(d / name)})
+    append_entries(folder_id, d, entries)
+    commit_folder(folder_id, d)
+    return folder_id
+
+
+def _legacy_app():
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import FileResponse
+    from pathlib import Path
+    from app.core.config import settings
+    app = FastAPI()
+
+    @app.get("/images/{folder_id}/{image_id}")
+    async def get_image(folder_id: str, image_id: str):
+        folder_dir = settings.DATA_ROOT / "images" / folder_id
+        with (folder_dir / "images.json").open("r") as f:
+            for img in json.load(f):
+                if str(img['id']) == image_id or img['file_name'] == image_id:
+                    return FileResponse(Path(img['path']))
+        raise HTTPException(status_code=404, detail="Image not found")
+    return app
+
+
+async def _run(app, urls, headers=None):
+    import httpx
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        queue = list(urls)
+        statuses = {}
+
+        async def worker():
+            while queue:
+                url = queue.pop()
+                r = await client.get(url, headers=headers(url) if headers else None)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        return len(urls) / (time.perf_counter() - t0), statuses
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        os.environ["DATA_ROOT"] = root
+        from app.main import app
+        folder_id = _make_folder(root)
+        urls = [f"/images/{folder_id}/{random.randint(1, N_IMAGES)}" for _ in range(REQUESTS)]
+
+        asyncio.run(_run(app, urls[:100]))   # 인덱스 적재 + warm-up
+        rps, st = asyncio.run(_run(app, urls))
+        print(f"{'indexed 200':>14}: {rps:8.0f} req/s  {st}")
+
+        from app.services.image_folders import cached_index
+        index = cached_index(folder_id)
+        etags = {u: index.lookup(u.rsplit('/', 1)[1]).etag for u in urls}
+        rps, st = asyncio.run(_run(app, urls, headers=lambda u: {"If-None-Match": etags[u]}))
+        print(f"{'indexed 304':>14}: {rps:8.0f} req/s  {st}")
+
+        k = REQUESTS // 10   # 느려서 일부만
+        rps, st = asyncio.run(_run(_legacy_app(), urls[:k]))
+        print(f"{'legacy scan':>14}: {rps:8.0f} req/s  {st}")
+
+
+if __name__ == "__main__":
+    main()
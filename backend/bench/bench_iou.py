@@ -0,0 +1,43 @@
+# backend/bench/bench_iou.py
+"""
+Scalar double-loop IoU vs. batched iou_matrix.
+
+    cd backend && python -m bench.bench_iou
+"""
+import time
+
+import numpy as np
+
+from app.utils.iou import iou, iou_matrix
+
+
+def _boxes(n: int, rng: np.random.Generator) -> np.ndarray:
+    xy = rng.uniform(0, 1920, size=(n, 2))
+    wh = rng.uniform(10, 200, size=(n, 2))
+    return np.hstack([xy, wh])
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} {'scalar ms':>11} {'f64 ms':>9} {'f32 ms':>9} {'speedup':>8}")
+    for n in (10, 100, 1000):
+        a = _boxes(n, rng); b = _boxes(n, rng)
+        al, bl = a.tolist(), b.tolist()
+        repeat = 3 if n >= 1000 else 20
+        t_scalar = _best_of(lambda: [[iou(x, y) for y in bl] for x in al], repeat)
+        t_f64 = _best_of(lambda: iou_matrix(a, b), repeat)
+        t_f32 = _best_of(lambda: iou_matrix(a, b, dtype=np.float32), repeat)
+        print(f"{n:>6} {t_scalar*1e3:>11.3f} {t_f64*1e3:>9.3f} {t_f32*1e3:>9.3f} {t_scalar/t_f64:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# backend/bench/bench_map.py
+"""
+calculate_map (VOC, one IoU) vs calculate_map_coco (COCO, IoU .50:.95 in one pass)
+on a COCO val-sized synthetic set (5k images, 80 classes), plus confidence changes
+answered from a cached PRTable (no re-matching).
+
+    cd backend && python -m bench.bench_map
+"""
+import time
+
+import numpy as np
+
+from app.services.map import build_pr_table, calculate_map, calculate_map_coco
+
+N_IMAGES = 5000
+N_CATS = 80
+GT_PER_IMAGE = 7
+PRED_PER_IMAGE = 20
+
+
+def _dataset(rng: np.random.Generator):
+    gt, pr = [], []
+    for img in range(N_IMAGES):
+        n = rng.integers(1, 2 * GT_PER_IMAGE)
+        xy = rng.uniform(0, 600, size=(n, 2)); wh = rng.uniform(10, 200, size=(n, 2))
+        cats = rng.integers(1, N_CATS + 1, size=n)
+        for b, c in zip(np.hstack([xy, wh]).tolist(), cats.tolist()):
+            gt.append({"image_id": img, "category_id": c, "bbox": b})
+        # 절반은 GT 근처, 나머지는 무작위 오검출
+        k = min(n, PRED_PER_IMAGE // 2)
+        near = np.hstack([xy[:k], wh[:k]]) + rng.normal(0, 6, size=(k, 4))
+        m = PRED_PER_IMAGE - k
+        far = np.hstack([rng.uniform(0, 600, size=(m, 2)), rng.uniform(10, 200, size=(m, 2))])
+        pcats = np.r_[cats[:k], rng.integers(1, N_CATS + 1, size=m)]
+        for b, c, s in zip(np.vstack([near, far]).tolist(), pcats.tolist(), rng.uniform(0, 1, PRED_PER_IMAGE).tolist()):
+            pr.append({"image_id": img, "category_id": c, "bbox": b, "score": s})
+    cats = {c: {"id": c, "name": f"class_{c}"} for c in range(1, N_CATS + 1)}
+    return gt, pr, cats
+
+
+def main():
+    rng = np.random.default_rng(0)
+    gt, pr, cats = _dataset(rng)
+    print(f"images={N_IMAGES} gt={len(gt)} preds={len(pr)} classes={N_CATS}")
+    for iou in (0.5, 0.75):
+        t0 = time.perf_counter()
+        m, _ = calculate_map(gt, pr, cats, iou)
+        print(f"voc  iou={iou}: mAP={m:.4f}  {time.perf_counter() - t0:.2f}s")
+    t0 = time.perf_counter()
+    m, d = calculate_map_coco(gt, pr, cats)
+    print(f"coco AP={m:.4f} AP50={d['AP50']:.4f} AP75={d['AP75']:.4f}  {time.perf_counter() - t0:.2f}s")
+    for mode in ("voc", "coco"):
+        table = build_pr_table(gt, pr, cats, mode, 0.5)
+        for conf in (0.3, 0.6):
+            t0 = time.perf_counter()
+            m, _ = table.evaluate(conf)
+            print(f"{mode:4s} cached conf={conf}: mAP={m:.4f}  {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
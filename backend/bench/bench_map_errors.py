@@ -0,0 +1,33 @@
+# backend/bench/bench_map_errors.py
+"""
+오류 분석 (TIDE 유형 + confusion matrix) 을 COCO val 크기 합성 데이터 (5k images, 80 classes) 에서.
+표는 한 번 만들고, confidence 변경은 집계만 다시 한다.
+
+    cd backend && python -m bench.bench_map_errors
+"""
+import time
+
+import numpy as np
+
+from app.services.coco_loader import coco_columns_from_doc
+from app.services.map_errors import build_error_table
+from bench.bench_map import N_CATS, N_IMAGES, _dataset
+
+
+def main():
+    gt, pr, cats = _dataset(np.random.default_rng(0))
+    gt_cols = coco_columns_from_doc({"annotations": gt, "categories": list(cats.values())})
+    pr_cols = coco_columns_from_doc(pr)
+    print(f"images={N_IMAGES} gt={len(gt)} preds={len(pr)} classes={N_CATS}")
+    t0 = time.perf_counter()
+    table = build_error_table(gt_cols, pr_cols, 0.5)
+    print(f"build: {time.perf_counter() - t0:.2f}s  ({table.nbytes / 1e6:.1f} MB)")
+    for conf in (0.0, 0.3, 0.6):
+        t0 = time.perf_counter()
+        res = table.evaluate(conf)
+        print(f"conf={conf}: tp={res['tp']} fp={res['fp']} fn={res['fn']}  "
+              f"{(time.perf_counter() - t0) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# backend/bench/bench_map_parallel.py
+"""
+build_pr_table (single process) vs build_pr_table_parallel (category shards on a process pool)
+on an LVIS-sized synthetic set (1203 classes).
+
+    cd backend && python -m bench.bench_map_parallel
+"""
+import os
+import time
+
+import numpy as np
+
+from app.services.map import build_pr_table
+from app.services.map_parallel import build_pr_table_parallel
+
+N_IMAGES = 20000
+N_CATS = 1203
+GT_PER_IMAGE = 6
+PRED_PER_IMAGE = 20
+
+
+def _dataset(rng: np.random.Generator):
+    gt, pr = [], []
+    for img in range(N_IMAGES):
+        n = rng.integers(1, 2 * GT_PER_IMAGE)
+        xy = rng.uniform(0, 600, size=(n, 2)); wh = rng.uniform(10, 200, size=(n, 2))
+        cats = rng.integers(1, N_CATS + 1, size=n)
+        for b, c in zip(np.hstack([xy, wh]).tolist(), cats.tolist()):
+            gt.append({"image_id": img, "category_id": c, "bbox": b})
+        # GT 근처 (같은 class 여러 개) + 같은 class 의 무작위 오검출
+        near = np.repeat(np.hstack([xy, wh]), 2, axis=0) + rng.normal(0, 6, size=(2 * n, 4))
+        m = max(PRED_PER_IMAGE - 2 * n, 0)
+        far = np.hstack([rng.uniform(0, 600, size=(m, 2)), rng.uniform(10, 200, size=(m, 2))])
+        pcats = np.r_[np.repeat(cats, 2), rng.choice(cats, size=m)]
+        boxes = np.vstack([near, far])
+        for b, c, s in zip(boxes.tolist(), pcats.tolist(), rng.uniform(0, 1, boxes.shape[0]).tolist()):
+            pr.append({"image_id": img, "category_id": c, "bbox": b, "score": s})
+    cats = {c: {"id": c, "name": f"class_{c}"} for c in range(1, N_CATS + 1)}
+    return gt, pr, cats
+
+
+def main():
+    rng = np.random.default_rng(0)
+    gt, pr, cats = _dataset(rng)
+    print(f"images={N_IMAGES} gt={len(gt)} preds={len(pr)} classes={N_CATS} cpus={os.cpu_count()}")
+    for mode in ("voc", "coco"):
+        t0 = time.perf_counter()
+        ref = build_pr_table(gt, pr, cats, mode, 0.5).evaluate(0.0)[0]
+        t1 = time.perf_counter()
+        print(f"{mode:4s} single      : mAP={ref:.4f}  {t1 - t0:.2f}s")
+        for workers in (2, 4, 8):
+            t0 = time.perf_counter()
+            m = build_pr_table_parallel(gt, pr, cats, mode, 0.5, workers=workers, min_preds=0).evaluate(0.0)[0]
+            print(f"{mode:4s} workers={workers:<3d} : mAP={m:.4f}  {time.perf_counter() - t0:.2f}s"
+                  f"{'' if m == ref else '  MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# backend/bench/bench_repos.py
+"""
+AnnotationsRepo (SQLite, WAL) 조회/등록 시간 vs 레코드 수.
+비교용으로 예전 SimpleKV 방식 (db/*.json 전체 읽기 + 선형 탐색) 조회도 잰다.
+
+    cd backend && python -m bench.bench_repos
+"""
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.repos.ann_repo import AnnotationsRepo
+from app.repos.database import new_id
+
+SIZES = (1_000, 10_000, 100_000)
+LOOKUPS = 500
+
+
+def _json_lookup(path: str, sha: str):
+    with open(path, "r") as f:
+        data = json.load(f)
+    for k, v in data.items():
+        if v.get("sha") == sha:
+            return k
+    return None
+
+
+def main():
+    print(f"{'records':>8} {'sqlite get us':>14} {'sqlite register us':>19} {'json get us':>12}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as root:
+            repo = AnnotationsRepo(root)
+            rows = {new_id(): {"kind": "pred", "sha": f"{i:064x}", "src": f"/data/{i}.json"} for i in range(n)}
+            with repo.db.tx() as c:
+                c.executemany("INSERT INTO annotations (id, kind, sha, src) VALUES (?, ?, ?, ?)",
+                              [(k, v["kind"], v["sha"], v["src"]) for k, v in rows.items()])
+            shas = [f"{random.randrange(n):064x}" for _ in range(LOOKUPS)]
+
+            t0 = time.perf_counter()
+            for sha in shas:
+                repo.get_id_by_sha(sha)
+            get_us = (time.perf_counter() - t0) / LOOKUPS * 1e6
+            t0 = time.perf_counter()
+            for i in range(LOOKUPS):
+                repo.register("pred", f"new-{i}", "/data/new.json")
+            reg_us = (time.perf_counter() - t0) / LOOKUPS * 1e6
+
+            json_path = os.path.join(root, "legacy.json")
+            with open(json_path, "w") as f:
+                json.dump(rows, f)
+            k = max(1, LOOKUPS // 50)   # 느려서 일부만
+            t0 = time.perf_counter()
+            for sha in shas[:k]:
+                _json_lookup(json_path, sha)
+            json_us = (time.perf_counter() - t0) / k * 1e6
+            print(f"{n:>8} {get_us:>14.1f} {reg_us:>19.1f} {json_us:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
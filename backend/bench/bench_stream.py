@@ -0,0 +1,65 @@
+# backend/bench/bench_stream.py
+"""
+Peak memory: evaluate_mota (전체 로드) vs. evaluate_mota_stream (프레임 merge-join).
+
+    cd backend && python -m bench.bench_stream
+
+tracemalloc 으로 Python/numpy 할당 peak 을 잰다. 스트리밍 쪽은 시퀀스 길이와 무관해야 한다.
+"""
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from app.services.mota import evaluate_mota
+from app.services.mota_stream import evaluate_mota_stream
+
+OBJECTS = 20
+
+
+def _write_pair(tmp: Path, n_frames: int, rng: np.random.Generator, shuffle: bool):
+    frame = np.repeat(np.arange(1, n_frames + 1), OBJECTS)
+    ids = np.tile(np.arange(OBJECTS), n_frames)
+    n = frame.size
+    base = np.column_stack([rng.uniform(0, 1800, size=(n, 2)), np.full((n, 2), 60.0)])
+    gt = np.column_stack([frame, ids, base, np.ones(n), -np.ones((n, 3))])
+    pr = np.column_stack([frame, ids, base + rng.normal(0, 8, size=(n, 4)), rng.uniform(0, 1, n),
+                          -np.ones((n, 3))])
+    if shuffle:
+        pr = pr[rng.permutation(n)]
+    fmt = ["%d", "%d", "%.2f", "%.2f", "%.2f", "%.2f", "%.3f", "%d", "%d", "%d"]
+    g, p = tmp / f"gt_{n_frames}.txt", tmp / f"pr_{n_frames}_{int(shuffle)}.txt"
+    np.savetxt(g, gt, fmt=fmt, delimiter=",")
+    np.savetxt(p, pr, fmt=fmt, delimiter=",")
+    return g, p
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, peak / 2**20, dt
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'frames':>7} {'sorted':>6} {'load MB':>8} {'load s':>7} {'stream MB':>10} {'stream s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n_frames in (2_000, 8_000, 32_000):
+            for shuffle in (False, True):
+                g, p = _write_pair(tmp, n_frames, rng, shuffle)
+                ref, m_load, t_load = _measure(lambda: evaluate_mota(g, p, 0.5))
+                # run_rows 를 작게 잡아 external sort 경로의 메모리도 길이와 무관함을 보인다
+                res, m_stream, t_stream = _measure(lambda: evaluate_mota_stream(g, p, 0.5, run_rows=50_000))
+                assert res == ref, (res, ref)
+                print(f"{n_frames:>7} {str(not shuffle):>6} {m_load:>8.1f} {t_load:>7.2f} {m_stream:>10.1f} {t_stream:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/bench/bench_tracks.py
+"""
+/tracks 단일 프레임 조회 지연: 매 요청 전체 파싱 vs. 캐시된 frame offset index.
+
+    cd backend && python -m bench.bench_tracks
+
+"restart" 는 새 AnnotationCache 인스턴스(메모리 비어 있음)로 디스크 index 를 mmap 으로 여는 경우.
+"""
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.api.tracks import _tracks_from_table
+from app.services.mota import load_mot
+from app.services.motacache import AnnotationCache
+
+BOXES_PER_FRAME = 20
+_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def _write_mot(path: Path, n_frames: int, rng: np.random.Generator) -> None:
+    n = n_frames * BOXES_PER_FRAME
+    frame = np.repeat(np.arange(1, n_frames + 1), BOXES_PER_FRAME)
+    ids = np.tile(np.arange(BOXES_PER_FRAME), n_frames)
+    xy = rng.uniform(0, 1800, size=(n, 2))
+    wh = rng.uniform(20, 120, size=(n, 2))
+    conf = rng.uniform(0, 1, size=n)
+    rows = np.column_stack([frame, ids, xy, wh, conf, -np.ones((n, 3))])
+    np.savetxt(path, rows, fmt=["%d", "%d", "%.2f", "%.2f", "%.2f", "%.2f", "%.3f", "%d", "%d", "%d"],
+               delimiter=",")
+
+
+def _median_ms(fn, frames, repeat: int) -> float:
+    ts = []
+    for f in frames[:repeat]:
+        t0 = time.perf_counter()
+        fn(int(f))
+        ts.append(time.perf_counter() - t0)
+    return statistics.median(ts) * 1e3
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'frames':>8} {'rows':>9} {'full parse ms':>14} {'warm ms':>9} {'restart ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n_frames in (1_000, 10_000, 100_000):
+            src = tmp / f"mot_{n_frames}.txt"
+            _write_mot(src, n_frames, rng)
+            frames = rng.integers(1, n_frames + 1, size=200)
+
+            t_parse = _median_ms(lambda f: _tracks_from_table(load_mot(src), f, f), frames, 3)
+
+            cache_dir = tmp / f"cache_{n_frames}"
+            cache = AnnotationCache(cache_dir, _CACHE_BYTES)
+            cache.get_mot(src)   # index 생성 (1회)
+            t_warm = _median_ms(lambda f: _tracks_from_table(cache.get_mot(src), f, f), frames, 200)
+
+            def _restart(f):
+                fresh = AnnotationCache(cache_dir, _CACHE_BYTES)
+                return _tracks_from_table(fresh.get_mot(src), f, f)
+            t_restart = _median_ms(_restart, frames, 50)
+
+            print(f"{n_frames:>8} {n_frames * BOXES_PER_FRAME:>9} {t_parse:>14.2f} {t_warm:>9.3f} {t_restart:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
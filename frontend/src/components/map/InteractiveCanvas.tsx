@@ -5,6 +5,8 @@ import { getCategoryIdByName, getCategoryNameById } from '../../constants/cocoCa
 
 interface InteractiveCanvasProps {
   imageUrl: string | null;
+  // 원본 크기. imageUrl 이 축소본 (size=medium) 이면 원본 좌표계로 늘려 그린다
+  imageSize?: { width: number; height: number };
   gtAnnotations: Annotation[];
   predAnnotations: Annotation[];
   visibleCategories: Set<number>;
@@ -55,6 +57,7 @@ const CATEGORY_COLORS = [
 
 export default function InteractiveCanvas({
   imageUrl,
+  imageSize,
   gtAnnotations,
   predAnnotations,
   visibleCategories,
@@ -70,6 +73,7 @@ export default function InteractiveCanvas({
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const containerRef = useRef<HTMLDivElement>(null);
   const imageRef = useRef<HTMLImageElement | null>(null);
+  const imageSizeRef = useRef({ width: 0, height: 0 });
   const [dragState, setDragState] = useState<DragState>({
     active: false,
     annotation: null,
@@ -116,7 +120,7 @@ export default function InteractiveCanvas({
     ctx.save();
     ctx.translate(offset.x, offset.y);
     ctx.scale(scale, scale);
-    ctx.drawImage(img, 0, 0);
+    ctx.drawImage(img, 0, 0, imageSizeRef.current.width, imageSizeRef.current.height);
     ctx.restore();
 
     // If dragging, replace the annotation being dragged with the updated version from dragState
@@ -227,6 +231,9 @@ export default function InteractiveCanvas({
     img.onload = () => {
       console.log('InteractiveCanvas: Image loaded successfully', img.width, 'x', img.height);
       imageRef.current = img;
+      const width = imageSize?.width || img.width;
+      const height = imageSize?.height || img.height;
+      imageSizeRef.current = { width, height };
       const canvas = canvasRef.current;
       const container = containerRef.current;
       
@@ -235,22 +242,22 @@ export default function InteractiveCanvas({
         canvas.height = container.clientHeight;
         
         // Fit image to canvas
-        const scaleX = canvas.width / img.width;
-        const scaleY = canvas.height / img.height;
+        const scaleX = canvas.width / width;
+        const scaleY = canvas.height / height;
         const newScale = Math.min(scaleX, scaleY) * 0.9;
         setScale(newScale);
         setOffset({
-          x: (canvas.width - img.width * newScale) / 2,
-          y: (canvas.height - img.height * newScale) / 2
+          x: (canvas.width - width * newScale) / 2,
+          y: (canvas.height - height * newScale) / 2
         });
-        console.log('InteractiveCanvas: Canvas setup complete', { scale: newScale, offset: { x: (canvas.width - img.width * newScale) / 2, y: (canvas.height - img.height * newScale) / 2 } });
+        console.log('InteractiveCanvas: Canvas setup complete', { scale: newScale, offset: { x: (canvas.width - width * newScale) / 2, y: (canvas.height - height * newScale) / 2 } });
       }
     };
     img.onerror = (err) => {
       console.error('InteractiveCanvas: Image loading failed', err);
     };
     img.src = imageUrl;
-  }, [imageUrl]);
+  }, [imageUrl, imageSize?.width, imageSize?.height]);
 
   useEffect(() => {
     drawAnnotations();
@@ -270,7 +270,7 @@ export default function MapImageList({ folderId, currentImageId, onImageSelect }
           >
             {visibleImages.map((image, relativeIdx) => {
               const idx = startIndex + relativeIdx;
-              const thumbnailUrl = getImageUrl(idx);
+              const thumbnailUrl = getImageUrl(idx, 'thumb');
               const gtCount = gtAnnotations.filter(a => a.image_id === image.id).length;
               const predCount = predAnnotations.filter(a => a.image_id === image.id).length;
               
@@ -7,7 +7,7 @@ import { useMapStore } from '../../store/mapStore';
 
 export default function MapPage() {
   const { projectId, imageId, setImageId, folderId, setFolderId, gtId, setGtId, predId, setPredId } = useMapContext();
-  const { setCurrentImageIndex, undo, redo, canUndo, canRedo, gtAnnotations, predAnnotations, categories, images, currentImageIndex, updateAnnotation } = useMapStore();
+  const { setCurrentImageIndex, undo, redo, canUndo, canRedo, gtAnnotations, predAnnotations, categories, images, currentImageIndex, updateAnnotation, imageSizes } = useMapStore();
   const [annotationIdList, setAnnotationIdList] = useState<string[]>([]);
   const annotationId = imageId ? String(imageId) : null;
 
@@ -50,8 +50,12 @@ export default function MapPage() {
   }, [setImageId, setCurrentImageIndex, images]);
 
   const currentImage = images[currentImageIndex] || null;
-  const imageUrl = currentImage ? (currentImage.url || URL.createObjectURL(currentImage.file)) : null;
   const currentImageId = currentImage?.id;
+  // 서버 이미지는 medium 축소본을 GT 의 원본 크기로 늘려 그린다 (원본 크기를 모르면 박스 좌표가 맞지 않으므로 원본)
+  const imageSize = currentImageId != null ? imageSizes[currentImageId] : undefined;
+  const imageUrl = currentImage
+    ? (currentImage.url ? (imageSize ? `${currentImage.url}?size=medium` : currentImage.url) : URL.createObjectURL(currentImage.file))
+    : null;
   
   // Filter by current image only - don't apply confidence/IoU filtering here
   // Let InteractiveCanvas handle that based on slider values
@@ -72,6 +76,7 @@ export default function MapPage() {
       <div className="min-h-0 min-w-0 flex flex-col">
         <InteractiveCanvas
           imageUrl={imageUrl}
+          imageSize={imageSize}
           gtAnnotations={filteredGt}
           predAnnotations={filteredPred}
           visibleCategories={new Set()}
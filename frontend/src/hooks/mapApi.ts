@@ -30,16 +30,22 @@ export function useImageAnnotations(annotationId: string | null | undefined) {
 }
 
 // Get mAP metrics with optional manual triggering
-export function useMapMetrics(gtId: string, predId: string, conf: number, iou: number, enabled: boolean = false) {
+// mode 'coco': AP@[.5:.95] + AP50/AP75, 101-point PR curves (iou is ignored), plus
+// summary: AP_small/medium/large and AR_1/10/100 (pycocotools summarize)
+// curve 'grid': PR curves resampled to a 101-point recall grid, 'rle': plateau points dropped (+ index)
+export function useMapMetrics(gtId: string, predId: string, conf: number, iou: number, enabled: boolean = false,
+                              mode: 'voc' | 'coco' = 'voc', curve: 'full' | 'grid' | 'rle' = 'full') {
   return useQuery({ 
-    queryKey: ['map-metrics', gtId, predId, conf, iou], 
+    queryKey: ['map-metrics', gtId, predId, conf, iou, mode, curve], 
     queryFn: async () => {
       if (!gtId || !predId) return null;
       const params = new URLSearchParams({
         gt_id: gtId,
         pred_id: predId,
         conf: String(conf),
-        iou: String(iou)
+        iou: String(iou),
+        mode,
+        curve
       });
       const res = await fetch(`${API_BASE}/map/calculate?${params.toString()}`);
       if (!res.ok) throw new Error('Failed to calculate mAP');
@@ -51,6 +57,73 @@ export function useMapMetrics(gtId: string, predId: string, conf: number, iou: n
   });
 }
 
+// TP/FP/FN boxes for one image (served from the server-side match table; conf changes don't re-match)
+export function useMapImageMatches(gtId: string, predId: string, imageId: number | null | undefined, conf: number,
+                                   iou: number, mode: 'voc' | 'coco' = 'voc') {
+  return useQuery({
+    queryKey: ['map-image-matches', gtId, predId, imageId, conf, iou, mode],
+    queryFn: async () => {
+      const params = new URLSearchParams({
+        gt_id: gtId,
+        pred_id: predId,
+        image_id: String(imageId),
+        conf: String(conf),
+        iou: String(iou),
+        mode
+      });
+      const res = await fetch(`${API_BASE}/map/image?${params.toString()}`);
+      if (!res.ok) throw new Error('Failed to fetch image matches');
+      return res.json();
+    },
+    enabled: !!gtId && !!predId && imageId != null,
+  });
+}
+
+// TP/FP/FN boxes for one category, paged (offset/limit per list)
+export function useMapCategoryMatches(gtId: string, predId: string, categoryId: number | null | undefined,
+                                      conf: number, iou: number, mode: 'voc' | 'coco' = 'voc',
+                                      offset: number = 0, limit: number = 100) {
+  return useQuery({
+    queryKey: ['map-category-matches', gtId, predId, categoryId, conf, iou, mode, offset, limit],
+    queryFn: async () => {
+      const params = new URLSearchParams({
+        gt_id: gtId,
+        pred_id: predId,
+        category_id: String(categoryId),
+        conf: String(conf),
+        iou: String(iou),
+        mode,
+        offset: String(offset),
+        limit: String(limit)
+      });
+      const res = await fetch(`${API_BASE}/map/category?${params.toString()}`);
+      if (!res.ok) throw new Error('Failed to fetch category matches');
+      return res.json();
+    },
+    enabled: !!gtId && !!predId && categoryId != null,
+  });
+}
+
+// Error analysis: TIDE-style FP/FN error types + class confusion matrix (rows GT, cols pred, last = background)
+export function useMapErrorAnalysis(gtId: string, predId: string, conf: number, iou: number = 0.5,
+                                    enabled: boolean = true) {
+  return useQuery({
+    queryKey: ['map-analysis', gtId, predId, conf, iou],
+    queryFn: async () => {
+      const params = new URLSearchParams({
+        gt_id: gtId,
+        pred_id: predId,
+        conf: String(conf),
+        iou: String(iou)
+      });
+      const res = await fetch(`${API_BASE}/map/analysis?${params.toString()}`);
+      if (!res.ok) throw new Error('Failed to fetch error analysis');
+      return res.json();
+    },
+    enabled: !!gtId && !!predId && enabled,
+  });
+}
+
 // Update annotation
 export function useUpdateAnnotation() {
   const qc = useQueryClient();
@@ -68,6 +141,9 @@ export function useUpdateAnnotation() {
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ['map-image-annotations'] });
       qc.invalidateQueries({ queryKey: ['map-metrics'] });
+      qc.invalidateQueries({ queryKey: ['map-image-matches'] });
+      qc.invalidateQueries({ queryKey: ['map-category-matches'] });
+      qc.invalidateQueries({ queryKey: ['map-analysis'] });
     }
   });
 }
\ No newline at end of file
@@ -38,4 +38,90 @@ export async function fetchFrameBoxes(annotationId: string, f: number){
 export async function fetchTracksWindow(annotationId: string, f0: number, f1: number){
   const data = await getJSON<{tracks: {id:any, frames:{f:number, bbox:number[], conf?:number}[]}[]}>(`${API_BASE}/tracks?annotation_id=${annotationId}&f0=${f0}&f1=${f1}`);
   return data;
-}
\ No newline at end of file
+}
+// IoU × conf 임계값 격자 전체의 MOTA (슬라이더 히트맵 / 최적 지점 선택용, 요청 1회)
+export type SweepCell = { iou: number, conf: number, mota: number, tp: number, fp: number, fn: number, idsw: number };
+export async function fetchMotaSweep(
+  gtId: string, predId: string, ious: number[], confs: number[], matcher: 'greedy'|'hungarian' = 'greedy'
+){
+  const params = new URLSearchParams({ gt_id: gtId, pred_id: predId, matcher });
+  ious.forEach(v => params.append('ious', String(v)));
+  confs.forEach(v => params.append('confs', String(v)));
+  return getJSON<{ious: number[], confs: number[], total_gt: number, grid: SweepCell[][], best: SweepCell}>(
+    `${API_BASE}/analysis/sweep?${params.toString()}`
+  );
+}
+// 여러 시퀀스 일괄 평가: 시퀀스가 끝날 때마다 onProgress, 마지막에 합산 결과 반환 (NDJSON 스트림)
+export type BatchCounts = { mota: number, TP: number, FP: number, FN: number, IDSW: number, total_gt: number };
+export type BatchSequenceResult = { sequence: string, done: number, total: number, error?: string, seconds?: number } & Partial<BatchCounts>;
+export async function runMotaBatch(
+  items: { sequence: string, gt_id: string, pred_id: string }[],
+  opts: { iou?: number, conf?: number, matcher?: 'greedy'|'hungarian', workers?: number } = {},
+  onProgress?: (r: BatchSequenceResult) => void,
+){
+  const r = await fetch(`${API_BASE}/analysis/batch`, {
+    method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ items, ...opts }),
+  });
+  if(!r.ok || !r.body) throw new Error(`HTTP ${r.status}`);
+  const reader = r.body.getReader();
+  const dec = new TextDecoder();
+  let buf = '';
+  let summary: (BatchCounts & { sequences: number, failed: number }) | null = null;
+  for(;;){
+    const { value, done } = await reader.read();
+    if(done) break;
+    buf += dec.decode(value, { stream: true });
+    let nl;
+    while((nl = buf.indexOf('\n')) >= 0){
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if(!line) continue;
+      const msg = JSON.parse(line);
+      if(msg.type === 'summary') summary = msg;
+      else onProgress?.(msg);
+    }
+  }
+  return summary;
+}
+// 이미지 폴더 업로드: create -> batch 여러 개 동시 -> commit. folderId 를 주면 status 로 받은 파일은 빼고 이어서 올린다
+export async function uploadImageFolder(
+  files: File[],
+  opts: { folderId?: string, batchSize?: number, concurrency?: number } = {},
+  onProgress?: (done: number, total: number) => void,
+){
+  const batchSize = opts.batchSize ?? 200, concurrency = opts.concurrency ?? 4;
+  let folderId = opts.folderId;
+  let have = new Set<string>();
+  if(folderId){
+    const st = await getJSON<{files: string[]}>(`${API_BASE}/images/folders/${folderId}/status`);
+    have = new Set(st.files);
+  } else {
+    const r = await fetch(`${API_BASE}/images/folders`, { method: 'POST' });
+    if(!r.ok) throw new Error(await r.text());
+    folderId = (await r.json()).folder_id as string;
+  }
+  const name = (f: File) => ((f as any).webkitRelativePath || f.name).replace(/[\\/]/g, '_');
+  const batches: number[] = [];
+  for(let i = 0; i < files.length; i += batchSize){
+    if(files.slice(i, i + batchSize).some(f => !have.has(name(f)))) batches.push(i);
+  }
+  let done = files.length - batches.reduce((n, i) => n + Math.min(batchSize, files.length - i), 0);
+  const failed: { file_name: string, error: string }[] = [];
+  const worker = async () => {
+    for(let start = batches.shift(); start !== undefined; start = batches.shift()){
+      const part = files.slice(start, start + batchSize);
+      const fd = new FormData();
+      fd.append('offset', String(start));
+      part.forEach(f => fd.append('images', f, name(f)));
+      const r = await fetch(`${API_BASE}/images/folders/${folderId}/batch`, { method: 'POST', body: fd });
+      if(!r.ok) throw new Error(await r.text());
+      failed.push(...(await r.json()).failed);
+      done += part.length;
+      onProgress?.(done, files.length);
+    }
+  };
+  await Promise.all(Array.from({ length: concurrency }, worker));
+  const r = await fetch(`${API_BASE}/images/folders/${folderId}/commit`, { method: 'POST' });
+  if(!r.ok) throw new Error(await r.text());
+  return { ...(await r.json()) as { folder_id: string, count: number, images: { id: number, file_name: string }[] }, failed };
+}
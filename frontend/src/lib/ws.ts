@@ -1,11 +1,23 @@
 // frontend/src/lib/ws.ts
-export type PreviewRequest = { gt_id: string; pred_id: string; iou: number, conf: number }
+export type PreviewEdit = { frame: number; id: number; x: number; y: number; w: number; h: number; conf?: number }
+export type PreviewRequest = {
+  gt_id: string; pred_id: string; iou: number, conf: number;
+  matcher?: 'greedy'|'hungarian';
+  edits?: PreviewEdit[];   // 서버 세션에 누적되는 pred 박스 수정 (바뀐 프레임만 재계산)
+  extended?: boolean;      // true 면 응답에 MOTP/IDF1/HOTA 등 확장 지표 포함
+}
+export type ExtendedMetrics = {
+  MOTP: number; GT_tracks: number; MT: number; PT: number; ML: number; Frag: number;
+  IDF1: number; IDP: number; IDR: number; IDTP: number; IDFP: number; IDFN: number;
+  HOTA: number; DetA: number; AssA: number; LocA: number;
+}
 export type PreviewResponse = {
   MOTA?: number; mota?: number;
   TP?: number; tp?: number;
   FP?: number; fp?: number;
   FN?: number; fn?: number;
   IDSW?: number; idsw?: number;
+  extended?: ExtendedMetrics;
   error?: string;
 }
 
@@ -18,6 +30,7 @@ function normalize(resp: PreviewResponse) {
     fp:   pick(resp.FP,   (resp as any).fp),
     fn:   pick(resp.FN,   (resp as any).fn),
     idsw: pick(resp.IDSW, (resp as any).idsw),
+    extended: resp.extended,
     error: resp.error,
   };
 }
@@ -1,8 +1,10 @@
 import { create } from 'zustand';
 import type { Annotation } from '../types/annotation';
-import { API_BASE } from '../lib/api';
+import { API_BASE, uploadImageFolder } from '../lib/api';
 
+// url: 서버에 올라간 이미지 (/images/{folder}/{id}). size 를 붙이면 축소본 (thumb 256 / medium 1024)
 export type MapImage = { id: number; name: string; file: File; url?: string };
+export type MapImageSize = 'full' | 'medium' | 'thumb';
 
 interface MapState {
   // Image storage (like MOTA's frames)
@@ -13,6 +15,7 @@ interface MapState {
   predAnnotations: Annotation[];
   originalPredAnnotations: Annotation[];  // Store original pred annotations for reset
   categories?: { [id: number]: string };
+  imageSizes: { [id: number]: { width: number; height: number } };  // GT images 의 원본 크기
   undoStack: Annotation[][];
   redoStack: Annotation[][];
   editHistory: Array<{ type: 'gt' | 'pred'; annotations: Annotation[] }>;
@@ -35,7 +38,7 @@ interface MapState {
   setImages: (images: MapImage[]) => void;
   setCurrentImageIndex: (index: number) => void;
   getCurrentImage: () => MapImage | null;
-  getImageUrl: (index: number) => string | null;
+  getImageUrl: (index: number, size?: MapImageSize) => string | null;
   
   setGT: (anns: Annotation[]) => void;
   setPred: (anns: Annotation[]) => void;
@@ -120,6 +123,7 @@ export const useMapStore = create<MapState>((set, get) => ({
   predAnnotations: [],
   originalPredAnnotations: [],
   categories: undefined,
+  imageSizes: {},
   undoStack: [],
   redoStack: [],
   editHistory: [],
@@ -151,10 +155,11 @@ export const useMapStore = create<MapState>((set, get) => ({
     return state.images[state.currentImageIndex] || null;
   },
   
-  getImageUrl: (index) => {
+  getImageUrl: (index, size = 'full') => {
     const state = get();
     const image = state.images[index];
     if (!image) return null;
+    if (image.url) return size === 'full' ? image.url : `${image.url}?size=${size}`;
     return getOrCreateImageUrl(image, index);
   },
   
@@ -324,7 +329,7 @@ export const useMapStore = create<MapState>((set, get) => ({
     input.msdirectory = true;
     input.multiple = true;
     input.accept = 'image/*';
-    input.onchange = (e: any) => {
+    input.onchange = async (e: any) => {
       const fileList = Array.from(input.files || []) as File[];
       if (fileList.length === 0) return;
       
@@ -372,9 +377,26 @@ export const useMapStore = create<MapState>((set, get) => ({
           file: file,
         };
       });
+      // 서버에 chunked 업로드 (create -> batch -> commit). 서버 id 는 정렬된 순서의 idx+1
+      let folderId: string;
+      try {
+        const res = await uploadImageFolder(imageFiles, {}, (done, total) => {
+          console.log(`[openMapFolder] uploaded ${done}/${total}`);
+        });
+        folderId = res.folder_id;
+        const stored = new Set(res.images.map(img => img.id));
+        mapImages.forEach((img, idx) => {
+          if (stored.has(idx + 1)) img.url = `${API_BASE}/images/${folderId}/${idx + 1}`;
+        });
+        const failed = res.failed.length ? `\n업로드 실패 ${res.failed.length}개: ${res.failed.map(f => f.file_name).join(', ')}` : '';
+        alert(`이미지 폴더 업로드 성공: ${res.count}개 이미지${failed}`);
+      } catch (err) {
+        // 업로드가 안 되면 로컬 파일로만 본다
+        console.error('[openMapFolder] upload failed:', err);
+        folderId = `local_${Date.now()}`;
+        alert(`이미지 폴더 업로드 실패 (로컬로 로드: ${imageFiles.length}개 이미지): ${err}`);
+      }
       get().setImages(mapImages);
-      const folderId = `local_${Date.now()}`;
-      alert(`이미지 폴더 로드 성공: ${imageFiles.length}개 이미지`);
       if (cb) cb(folderId);
     };
     input.click();
@@ -412,7 +434,14 @@ export const useMapStore = create<MapState>((set, get) => ({
             });
           });
         }
+        const imageSizes: { [id: number]: { width: number; height: number } } = {};
+        if (cocoData.images && Array.isArray(cocoData.images)) {
+          cocoData.images.forEach((img: any) => {
+            if (img.width > 0 && img.height > 0) imageSizes[img.id] = { width: img.width, height: img.height };
+          });
+        }
         get().setGT(annotations);
+        set({ imageSizes });
         if (categories) set({ categories });
         
         // Upload to backend